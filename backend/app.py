@@ -1,46 +1,118 @@
-from flask import Flask, request, send_from_directory
+from flask import Flask
 from flask_cors import CORS
-import os
-from models import db
+from models import db, User
 from flask_migrate import Migrate
 import logging
 
+import click
+
 from config import Config
 from routes.ai import bp as ai_bp
 from routes.auth import bp as auth_bp
+from routes.events import bp as events_bp
 from routes.goals import bp as goals_bp
+from routes.search import bp as search_bp
 from routes.tasks import bp as tasks_bp
+from services.ai_service import plan_coalescer
+from services.auth_cache import user_cache
+from services.changefeed import change_feed
+from services.database import init_database
+from services.deletion import goal_purger, purge_deleted_goals
+from services.json_provider import init_json
+from services.llm_router import llm_router
+from services.metrics import metrics
+from services.ordering import rebalancer
+from services.passwords import password_hasher
+from services.plan_cache import plan_cache
+from services.plan_jobs import plan_jobs
+from services.rollups import check_rollups, rebuild_rollups
+from services.search import rebuild_search_index
+from services.static_files import compress_static_files, static_files
+from services.transfer import export_lines, import_goals, read_lines
+from services.versioning import response_cache
 from utils.decorators import login_required
 
-logging.basicConfig(level=logging.DEBUG)
+logging.basicConfig(level=Config.LOG_LEVEL)
 logger = logging.getLogger(__name__)
 
-app = Flask(__name__, static_folder="../frontend/build", static_url_path='/')
+app = Flask(__name__, static_folder=None)
 app.config.from_object(Config)
+init_json(app)
 app.register_blueprint(ai_bp)
 app.register_blueprint(auth_bp)
+app.register_blueprint(events_bp)
 app.register_blueprint(goals_bp)
+app.register_blueprint(search_bp)
 app.register_blueprint(tasks_bp)
 
 CORS(app, supports_credentials=True, origins=app.config['CORS_ORIGINS'])
 
-db.init_app(app)
+init_database(app, db)
 migrate = Migrate(app, db)
+goal_purger.init_app(app)
+llm_router.init_app(app)
+plan_coalescer.init_app(app)
+plan_cache.init_app(app)
+plan_jobs.init_app(app)
+rebalancer.init_app(app)
+response_cache.init_app(app)
+user_cache.init_app(app)
+change_feed.init_app(app)
+password_hasher.init_app(app)
+metrics.init_app(app)
+static_files.init_app(app)
+
+@app.cli.command("purge-goals")
+def purge_goals_command():
+    """Delete the tasks of soft-deleted goals."""
+    print(f"Purged {purge_deleted_goals()} tasks")
+
+@app.cli.command("rebuild-rollups")
+@click.option("--check", is_flag=True, help="Only report rows with wrong counts.")
+def rebuild_rollups_command(check):
+    """Recompute the goal and task progress counts."""
+    if check:
+        wrong = check_rollups()
+        for model, row_id, _, stored, expected in wrong:
+            print(f"{model.__tablename__} {row_id}: stored {stored}, expected {expected}")
+        print(f"{len(wrong)} rows with wrong counts")
+        raise SystemExit(1 if wrong else 0)
+    print(f"Fixed {rebuild_rollups()} rows")
+
+@app.cli.command("rebuild-search")
+def rebuild_search_command():
+    """Rebuild the full-text search index from the goal and task rows."""
+    print(f"Indexed {rebuild_search_index()} goals and tasks")
+
+def user_id_for(username):
+    user = User.query.filter_by(username=username).first()
+    if user is None:
+        raise click.ClickException(f"No user named {username!r}")
+    return user.id
 
-@app.before_request
-def log_request_info():
-    logger.debug("REQUEST: %s %s", request.method, request.path)
+@app.cli.command("export-goals")
+@click.argument("username")
+@click.option("--output", "-o", type=click.File("w"), default="-", help="File to write (default stdout).")
+def export_goals_command(username, output):
+    """Write a user's goals and task trees as NDJSON."""
+    for chunk in export_lines(user_id_for(username)):
+        output.write(chunk)
 
-@app.route("/")
-def serve():
-    return send_from_directory(app.static_folder, "index.html")
+@app.cli.command("import-goals")
+@click.argument("username")
+@click.argument("source", type=click.File("rb"), default="-")
+def import_goals_command(username, source):
+    """Add the goals of an NDJSON export to a user's goals."""
+    try:
+        result = import_goals(user_id_for(username), read_lines(source))
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    print(f"Imported {len(result['goal_ids'])} goals with {result['tasks']} tasks")
 
-@app.route("/<path:path>")
-def serve_static_file(path):
-    if os.path.exists(os.path.join(app.static_folder, path)):
-        return send_from_directory(app.static_folder, path)
-    else:
-        return send_from_directory(app.static_folder, "index.html")
+@app.cli.command("compress-static")
+def compress_static_command():
+    """Write gzip (and brotli, if installed) copies of the frontend build."""
+    print(f"Wrote {compress_static_files(app.config['STATIC_FOLDER'])} compressed files")
 
 if __name__ == "__main__":
     app.run(debug=app.config.get("DEBUG", False), host="0.0.0.0", port=5000)
\ No newline at end of file
@@ -0,0 +1,67 @@
+"""
+Compare POST /api/tasks/batch-update with the old per-item get_or_404 loop
+for 10, 100 and 1000-item batches. Each path updates its own freshly seeded
+goal, so both really change every status, and the bulk run must leave the
+goal's rollup counts matching its tasks.
+"""
+import time
+
+from benchmarks.common import app, db, reset_db, login_client, create_goal, count_queries
+from models import Goal, Task
+from services.rollups import check_rollups, fill_rollups
+
+
+def legacy_batch_update(updates):
+    """The pre-bulk implementation: one SELECT and one dirty object per item."""
+    for entry in updates:
+        task = db.get_or_404(Task, entry["id"])
+        if "status" in entry:
+            task.status = entry["status"]
+        if "title" in entry:
+            task.title = entry["title"]
+    db.session.commit()
+
+
+def seed_tasks(goal_id, count):
+    with app.app_context():
+        tasks = [Task(title=f"Task {i}", goal_id=goal_id, order_idx=i) for i in range(count)]
+        db.session.add_all(tasks)
+        db.session.flush()
+        fill_rollups([goal_id])
+        db.session.commit()
+        return [t.id for t in tasks]
+
+
+def run(sizes=(10, 100, 1000)):
+    for size in sizes:
+        reset_db()
+        client, user_id = login_client()
+        legacy_ids = seed_tasks(create_goal(user_id, "Legacy goal"), size)
+        goal_id = create_goal(user_id)
+        task_ids = seed_tasks(goal_id, size)
+
+        # rename every task and tick it off, as a bulk edit would
+        def updates(ids):
+            return [{"id": task_id, "status": "done", "title": f"Renamed {i}"} for i, task_id in enumerate(ids)]
+
+        with app.test_request_context(), count_queries() as legacy_queries:
+            start = time.perf_counter()
+            legacy_batch_update(updates(legacy_ids))
+            legacy_time = time.perf_counter() - start
+
+        with count_queries() as bulk_queries:
+            start = time.perf_counter()
+            response = client.post("/api/tasks/batch-update", json={"updates": updates(task_ids)})
+            bulk_time = time.perf_counter() - start
+        assert response.status_code == 200 and response.json["updated_count"] == size, response.json
+        with app.app_context():
+            goal = db.session.get(Goal, goal_id)
+            assert (goal.total_count, goal.done_count) == (size, size), (goal.total_count, goal.done_count)
+            assert not check_rollups([goal_id]), "rollup counts out of date after the batch"
+
+        print(f"items={size:<5} legacy={legacy_time * 1000:8.1f}ms ({legacy_queries['count']} queries)  "
+              f"bulk={bulk_time * 1000:8.1f}ms ({bulk_queries['count']} queries)")
+
+
+if __name__ == "__main__":
+    run()
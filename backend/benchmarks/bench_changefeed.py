@@ -0,0 +1,169 @@
+"""
+Fan-out of the change feed to many idle subscribers.
+
+Starts `--subscribers` threads, each consuming change_feed.stream() the
+way the /api/events route does, lets them sit idle for `--idle` seconds
+(measuring the CPU they burn on heartbeats alone), then publishes
+`--events` events and reports how long publish() took and how long each
+event took to reach every subscriber. Runs twice: with every subscriber
+on the same user (one publish wakes them all, e.g. many open tabs) and
+with one user per subscriber (a publish wakes a single one).
+
+Then checks the thread budget on a real gunicorn (gthread) worker: with
+`--threads` threads and CHANGEFEED_MAX_STREAMS=`--max-streams`, opens more
+/api/events streams than allowed and fails unless the excess gets 503 and
+an API request still answers within API_DEADLINE while the rest stay open.
+
+    python -m benchmarks.bench_changefeed --subscribers 1000 --events 50
+"""
+import argparse
+import json
+import os
+import resource
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+
+os.environ.setdefault("CHANGEFEED_BACKEND", "memory")
+os.environ.setdefault("CHANGEFEED_HEARTBEAT", "15")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/changefeed.db")
+
+import requests
+
+from benchmarks.common import app, reset_db
+from benchmarks.suite import GunicornTarget, child_pids
+from services.changefeed import change, change_feed
+
+threading.stack_size(256 * 1024)
+
+API_DEADLINE = 2.0  # seconds
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run(subscribers, events, idle, shared_user):
+    user_ids = [0] * subscribers if shared_user else list(range(subscribers))
+    latencies = []
+    lock = threading.Lock()
+    ready = threading.Barrier(subscribers + 1)
+
+    def subscriber(user_id, expected):
+        frames = change_feed.stream(user_id)
+        next(frames)  # ": connected", the cursor is set from here on
+        ready.wait()
+        received = 0
+        for frame in frames:
+            now = time.perf_counter()
+            for line in frame.splitlines():
+                if line.startswith("data: "):
+                    sent = json.loads(line[6:])["sent"]
+                    with lock:
+                        latencies.append(now - sent)
+                    received += 1
+            if received >= expected:
+                frames.close()
+                return
+
+    # spread: event e goes to subscriber e % subscribers
+    expected = [events if shared_user else len(range(n, events, subscribers)) for n in range(subscribers)]
+    threads = [
+        threading.Thread(target=subscriber, args=(user_id, expected[n]), daemon=True)
+        for n, user_id in enumerate(user_ids)
+    ]
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    for t in threads:
+        t.start()
+    ready.wait()
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    cpu_before = time.process_time()
+    time.sleep(idle)
+    idle_cpu = time.process_time() - cpu_before
+
+    publish_times = []
+    with app.app_context():
+        for e in range(events):
+            user_id = user_ids[0] if shared_user else user_ids[e % subscribers]
+            start = time.perf_counter()
+            change_feed.publish(user_id, change("task.updated", goal_id=1, id=e, changes={"status": "done"}, sent=start))
+            publish_times.append(time.perf_counter() - start)
+            time.sleep(0.01)
+
+    for t in threads:
+        t.join(timeout=30)
+    return {
+        "subscribers": subscribers,
+        "shared_user": shared_user,
+        "delivered": len(latencies),
+        "expected": sum(expected),
+        "idle_cpu_ms_per_s": round(idle_cpu / idle * 1000, 2),
+        "rss_kb_per_subscriber": round((rss_after - rss_before) / subscribers, 1),
+        "publish_p50_ms": round(percentile(publish_times, 0.5) * 1000, 3),
+        "publish_p99_ms": round(percentile(publish_times, 0.99) * 1000, 3),
+        "delivery_p50_ms": round(percentile(latencies, 0.5) * 1000, 3) if latencies else None,
+        "delivery_p99_ms": round(percentile(latencies, 0.99) * 1000, 3) if latencies else None,
+    }
+
+
+def server_budget(threads, max_streams):
+    reset_db()
+    os.environ["CHANGEFEED_MAX_STREAMS"] = str(max_streams)
+    target = GunicornTarget("http://127.0.0.1:9", threads=threads)
+    streams = []
+    try:
+        http = requests.Session()
+        http.post(f"{target.base_url}/api/signup", json={"username": "feed", "password": "feed"})
+        statuses = {}
+        for _ in range(max_streams + 4):
+            response = http.get(f"{target.base_url}/api/events", stream=True, timeout=10)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if response.status_code == 200:
+                next(response.iter_lines())  # ": connected", the stream now holds a thread
+                streams.append(response)
+            else:
+                response.close()
+        start = time.perf_counter()
+        api_status = http.get(f"{target.base_url}/api/goals", timeout=API_DEADLINE * 5).status_code
+        api_seconds = time.perf_counter() - start
+    finally:
+        for response in streams:
+            response.close()
+        # a graceful stop waits on streams that have not noticed the closed socket yet
+        target.process.terminate()
+        try:
+            target.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            pids = [target.process.pid]
+            for pid in pids:
+                pids.extend(child_pids(pid))  # workers and their password-hash pools
+            for pid in pids:
+                os.kill(pid, signal.SIGKILL)
+            target.process.wait()
+    result = {"threads": threads, "max_streams": max_streams, "streams": statuses,
+              "api_status": api_status, "api_ms": round(api_seconds * 1000, 1)}
+    print(json.dumps(result))
+    assert statuses == {200: max_streams, 503: 4}, f"stream cap not applied: {statuses}"
+    assert api_status == 200 and api_seconds < API_DEADLINE, "API starved by open streams"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--subscribers", type=int, default=1000)
+    parser.add_argument("--events", type=int, default=50)
+    parser.add_argument("--idle", type=float, default=3, help="seconds of idle time measured before publishing")
+    parser.add_argument("--threads", type=int, default=8, help="gunicorn threads for the budget check")
+    parser.add_argument("--max-streams", type=int, default=4, help="CHANGEFEED_MAX_STREAMS for the budget check")
+    args = parser.parse_args()
+
+    for shared_user in (True, False):
+        print(json.dumps(run(args.subscribers, args.events, args.idle, shared_user)))
+    server_budget(args.threads, args.max_streams)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Load-test plan generation with and without request coalescing.
+
+Concurrent callers run fetch_plan against a fake Ollama that serves one
+request at a time, as a single model instance does. Half of the prompts at
+each concurrency level are duplicates of another caller's, as when many
+users generate plans for similarly named goals. Reports throughput and
+p50/p95/p99 latency per mode and concurrency level.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import app
+from benchmarks.fake_ollama import start_fake_ollama
+from services.llm_router import llm_router
+from services.ai_service import fetch_plan, plan_coalescer
+
+
+def percentile(values, q):
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def load(concurrency, rounds):
+    distinct = max(1, concurrency // 2)
+
+    def caller(worker):
+        latencies = []
+        for r in range(rounds):
+            start = time.perf_counter()
+            plan = fetch_plan(f"Plan goal {(worker + r) % distinct}")
+            latencies.append(time.perf_counter() - start)
+            assert plan, "empty plan"
+        return latencies
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = sorted(l for worker in pool.map(caller, range(concurrency)) for l in worker)
+    return latencies, time.perf_counter() - start
+
+
+def run(levels=(1, 8, 32, 64), rounds=2, llm_delay=0.1, batch_cost=0.01):
+    server, url = start_fake_ollama(delay=llm_delay, parallel=1, batch_cost=batch_cost)
+    app.config["OLLAMA_API"] = url
+    llm_router.init_app(app)
+
+    for mode in ("off", "coalesce"):
+        plan_coalescer.init_app(app)
+        plan_coalescer.enabled = mode == "coalesce"
+        for concurrency in levels:
+            server.requests_seen = 0
+            latencies, elapsed = load(concurrency, rounds)
+            print(f"mode={mode:<8} concurrency={concurrency:<3} calls={len(latencies):<4} "
+                  f"llm_requests={server.requests_seen:<4} throughput={len(latencies) / elapsed:7.1f}/s "
+                  f"p50={percentile(latencies, 0.5) * 1000:7.1f}ms "
+                  f"p95={percentile(latencies, 0.95) * 1000:7.1f}ms "
+                  f"p99={percentile(latencies, 0.99) * 1000:7.1f}ms")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,166 @@
+"""
+Mixed read/write load on a SQLite file across several gunicorn workers.
+
+Runs the same load twice on a freshly seeded database: once with stock
+SQLite settings (rollback journal, synchronous=FULL, deferred BEGIN) and
+once with the tuned defaults from services/database.py. Every client
+thread signs in as its own user and, for `--seconds`, reads its goal's
+task list (with the response cache off, so every read hits the database)
+or, with probability `--write-ratio`, adds a task or changes a status.
+Reports throughput, read/write latency and failed requests per mode.
+
+A third run ("held_stream") repeats the tuned load with a 1s busy timeout
+while one more user keeps a generate-plan stream open the whole time, the
+fake model taking `--stream-seconds` per plan. A route that held the write
+lock while waiting on the model would make every other writer fail with
+"database is locked"; the run fails if any request does.
+
+    python -m benchmarks.bench_db_concurrency --workers 4 --clients 16 --seconds 10
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.fake_ollama import start_fake_ollama
+from benchmarks.suite import BACKEND_DIR, GunicornTarget, login, percentile
+
+STOCK = {
+    "SQLITE_JOURNAL_MODE": "DELETE",
+    "SQLITE_SYNCHRONOUS": "FULL",
+    "SQLITE_MMAP_SIZE": "0",
+    "SQLITE_BUSY_TIMEOUT_MS": "5000",  # the sqlite3 module's default
+    "SQLITE_BEGIN_IMMEDIATE": "0",
+}
+TUNED = {name: None for name in STOCK}  # unset: the Config defaults
+HELD_STREAM = dict(TUNED, SQLITE_BUSY_TIMEOUT_MS="1000")
+
+
+def hold_stream(target, username, goal_id, deadline, statuses):
+    """Keep a generate-plan stream open until the deadline, one slow plan after another."""
+    try:
+        session = login(target, username)
+    except AssertionError:
+        statuses.append(500)
+        return
+    while time.perf_counter() < deadline:
+        response = session.http.post(f"{session.base_url}/api/goals/{goal_id}/generate-plan/stream?refresh=1", timeout=60)
+        # errors inside the stream still answer 200, with an "error" event
+        statuses.append(500 if "event: error" in response.text else response.status_code)
+
+
+def load(target, clients, seconds, write_ratio, goal_ids, held_stream=False):
+    latencies = {"login": [], "read": [], "write": []}
+    failures = {"login": 0, "read": 0, "write": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+    holder, streams = None, []
+    if held_stream:
+        # the extra seeded user, after the clients'
+        holder = threading.Thread(target=hold_stream, args=(target, f"bench{clients}", clients + 1, deadline, streams))
+        holder.start()
+
+    def client(i):
+        rng = random.Random(i)
+        start = time.perf_counter()
+        try:
+            session = login(target, f"bench{i}")
+        except AssertionError:
+            session = None
+        with lock:
+            latencies["login"].append(time.perf_counter() - start)
+            failures["login"] += session is None
+        if session is None:
+            return
+        goal_id = goal_ids[i]
+        task_ids = []
+        while time.perf_counter() < deadline:
+            if rng.random() < write_ratio:
+                kind = "write"
+                start = time.perf_counter()
+                if task_ids and rng.random() < 0.5:
+                    status, _, _ = session.request("PUT", f"/api/tasks/{rng.choice(task_ids)}",
+                                                   json={"status": rng.choice(("active", "done"))})
+                else:
+                    status, _, body = session.request("POST", f"/api/goals/{goal_id}/tasks", json={"title": "Load"})
+                    if status == 201:
+                        task_ids.append(body["id"])
+            else:
+                kind = "read"
+                start = time.perf_counter()
+                status, _, _ = session.request("GET", f"/api/goals/{goal_id}/tasks?flat=1")
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies[kind].append(elapsed)
+                if status >= 400:
+                    failures[kind] += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if holder is not None:
+        holder.join()
+
+    result = {"requests_per_s": round(sum(len(v) for v in latencies.values()) / seconds, 1)}
+    for kind, values in latencies.items():
+        values.sort()
+        result[kind] = {
+            "count": len(values),
+            "failed": failures[kind],
+            "p50_ms": round(percentile(values, 0.5) * 1000, 1) if values else None,
+            "p99_ms": round(percentile(values, 0.99) * 1000, 1) if values else None,
+        }
+    if held_stream:
+        result["streams"] = {"count": len(streams), "failed": sum(1 for status in streams if status != 200)}
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn worker processes")
+    parser.add_argument("--threads", type=int, default=4, help="threads per worker")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--write-ratio", type=float, default=0.25)
+    parser.add_argument("--stream-seconds", type=float, default=4, help="fake model time per streamed plan")
+    args = parser.parse_args()
+
+    ollama, ollama_url = start_fake_ollama(delay=args.stream_seconds, task_count=5)
+    failed = []
+    for name, settings in (("stock", STOCK), ("tuned", TUNED), ("held_stream", HELD_STREAM)):
+        os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+        os.environ["RESPONSE_CACHE_SIZE"] = "0"
+        for key, value in settings.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+        # seeded in a child process: this one's app is bound to the database it was imported with
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.seed", "--users", str(args.clients + 1), "--depth", "2", "--fanout", "10"],
+            check=True, stdout=subprocess.DEVNULL, cwd=BACKEND_DIR,
+        )
+        goal_ids = list(range(1, args.clients + 1))  # one goal per user, inserted in user order
+
+        target = GunicornTarget(ollama_url, workers=args.workers, threads=args.threads)
+        try:
+            result = load(target, args.clients, args.seconds, args.write_ratio, goal_ids, held_stream=(name == "held_stream"))
+        finally:
+            target.close()
+        print(f"{name:<6} {result}", file=sys.stderr)
+        if name == "held_stream" and any(v["failed"] for v in result.values() if isinstance(v, dict)):
+            failed.append(name)
+    ollama.shutdown()
+    if failed:
+        sys.exit(f"requests failed while a plan stream was open: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Compare DELETE /api/tasks/<id> with the old ORM cascade delete, which loaded
+every descendant and deleted it one row at a time, on a 10k-node tree.
+Reports wall time, statement count and peak Python memory.
+"""
+import time
+import tracemalloc
+
+from benchmarks.common import app, db, reset_db, login_client, create_goal, count_queries
+from models import Task
+
+
+def load_subtree(task):
+    for child in task.subtasks:
+        load_subtree(child)
+
+
+def legacy_delete(task):
+    """
+    The pre-CTE behaviour: the ORM cascade lazy-loads every descendant, one
+    SELECT per node, then deletes the loaded objects in the flush.
+    """
+    load_subtree(task)
+    db.session.delete(task)
+
+
+def seed_tree(goal_id, size, fanout=10):
+    """Insert a breadth-first tree of `size` tasks level by level; returns the root id."""
+    with app.app_context():
+        root = Task(title="Root", goal_id=goal_id)
+        db.session.add(root)
+        db.session.flush()
+        level, created = [root.id], 1
+        while created < size:
+            rows = []
+            for parent_id in level:
+                for i in range(fanout):
+                    if created + len(rows) >= size:
+                        break
+                    rows.append({"title": f"Task {created + len(rows)}", "goal_id": goal_id, "parent_id": parent_id})
+            level = db.session.scalars(db.insert(Task).returning(Task.id), rows).all()
+            created += len(rows)
+        db.session.commit()
+        return root.id
+
+
+def measure(fn):
+    tracemalloc.start()
+    with count_queries() as queries:
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, queries["count"], peak
+
+
+def run(size=10_000):
+    reset_db()
+    client, user_id = login_client()
+    goal_id = create_goal(user_id)
+    root_id = seed_tree(goal_id, size)
+
+    def legacy():
+        with app.app_context():
+            legacy_delete(db.session.get(Task, root_id))
+            db.session.commit()
+
+    _, legacy_time, legacy_queries, legacy_peak = measure(legacy)
+
+    root_id = seed_tree(goal_id, size)
+    response, cte_time, cte_queries, cte_peak = measure(lambda: client.delete(f"/api/tasks/{root_id}"))
+    assert response.status_code == 200, response.json
+    with app.app_context():
+        assert db.session.scalar(db.select(db.func.count(Task.id))) == 0
+
+    print(f"nodes={size} legacy={legacy_time * 1000:8.1f}ms ({legacy_queries} queries, peak {legacy_peak / 2**20:.1f}MiB)")
+    print(f"nodes={size} cte   ={cte_time * 1000:8.1f}ms ({cte_queries} queries, peak {cte_peak / 2**20:.1f}MiB)")
+
+
+if __name__ == "__main__":
+    run()
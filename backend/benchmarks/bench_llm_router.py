@@ -0,0 +1,65 @@
+"""
+Exercise the LLM router against several fake Ollama servers.
+
+Checks that goal and subtask plans reach the backends configured for them,
+that load spreads by weight and outstanding requests, and that a backend
+failing its health check stops receiving traffic. Prints per-backend stats.
+"""
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import app
+from benchmarks.fake_ollama import start_fake_ollama
+from services.ai_service import fetch_plan, plan_coalescer
+from services.llm_router import llm_router
+
+
+def configure(backends):
+    app.config["OLLAMA_BACKENDS"] = json.dumps(backends)
+    app.config["OLLAMA_HEALTH_INTERVAL"] = 0
+    llm_router.init_app(app)
+
+
+def fire(role, count, concurrency=16):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda i: fetch_plan(f"{role} prompt {i}", role), range(count)))
+    return time.perf_counter() - start
+
+
+def run(requests=64, llm_delay=0.1):
+    plan_coalescer.enabled = False  # route every call on its own
+    large, large_url = start_fake_ollama(delay=llm_delay * 2, parallel=2, model="mistral:latest")
+    small_a, small_a_url = start_fake_ollama(delay=llm_delay, parallel=2, model="phi3:mini")
+    small_b, small_b_url = start_fake_ollama(delay=llm_delay, parallel=2, model="phi3:mini")
+    configure([
+        {"name": "large", "url": large_url, "model": "mistral:latest", "roles": ["goal"]},
+        {"name": "small-a", "url": small_a_url, "model": "phi3:mini", "roles": ["subtask"], "weight": 3},
+        {"name": "small-b", "url": small_b_url, "model": "phi3:mini", "roles": ["subtask"], "weight": 1},
+    ])
+
+    goal_time = fire("goal", requests // 4)
+    subtask_time = fire("subtask", requests)
+    assert set(large.models_seen) == {"mistral:latest"}, large.models_seen
+    assert set(small_a.models_seen + small_b.models_seen) == {"phi3:mini"}
+    assert small_a.requests_seen > small_b.requests_seen, (small_a.requests_seen, small_b.requests_seen)
+    print(f"goal plans: {requests // 4} in {goal_time:.2f}s, subtask plans: {requests} in {subtask_time:.2f}s")
+
+    # small-a starts failing its health check: traffic moves to small-b
+    small_a.healthy = False
+    llm_router.check_health()
+    before = small_b.requests_seen
+    fire("subtask", 8)
+    assert small_b.requests_seen - before == 8, small_b.requests_seen - before
+
+    for stats in llm_router.stats():
+        print(f"{stats['name']:<8} model={stats['model']:<15} weight={stats['weight']} healthy={stats['healthy']!s:<5} "
+              f"calls={stats['calls']:<3} p50={stats['latency_p50_ms']}ms p95={stats['latency_p95_ms']}ms "
+              f"p99={stats['latency_p99_ms']}ms")
+    for server in (large, small_a, small_b):
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    run()
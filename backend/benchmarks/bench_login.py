@@ -0,0 +1,91 @@
+"""
+Login throughput under a burst of concurrent sign-ins.
+
+Starts gunicorn (gthread) once per PASSWORD_HASH_WORKERS setting and fires
+`--logins` logins from `--concurrency` threads while one more thread keeps
+requesting the goal list of an already signed-in user. Reports login
+throughput and latency, 503s from a full hashing queue, and the latency of
+the other route during the burst, which is what a blocked worker costs.
+
+    python -m benchmarks.bench_login --logins 200 --concurrency 16 --hash-workers 0,2
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from benchmarks.seed import PASSWORD, seed
+from benchmarks.suite import GunicornTarget, login, percentile
+
+
+def summarize(latencies):
+    latencies = sorted(latencies)
+    return {
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+    }
+
+
+def burst(target, users, logins, concurrency):
+    probe = login(target)
+    probe_latencies = []
+    done = threading.Event()
+
+    def poll():
+        while not done.is_set():
+            start = time.perf_counter()
+            probe.request("GET", "/api/goals")
+            probe_latencies.append(time.perf_counter() - start)
+
+    def one(i):
+        session = target.session()
+        start = time.perf_counter()
+        status, _, _ = session.request("POST", "/api/login", json={"username": f"bench{i % users}", "password": PASSWORD})
+        return time.perf_counter() - start, status
+
+    poller = threading.Thread(target=poll)
+    poller.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(one, range(logins)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    poller.join()
+
+    ok = [t for t, status in outcomes if status == 200]
+    return {
+        "logins_per_s": round(len(ok) / elapsed, 1),
+        "busy_503": sum(1 for _, status in outcomes if status == 503),
+        "errors": sum(1 for _, status in outcomes if status not in (200, 503)),
+        "login": summarize(ok) if ok else None,
+        "other_route": summarize(probe_latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--threads", type=int, default=8, help="gunicorn threads")
+    parser.add_argument("--hash-workers", default="0,2", help="comma-separated PASSWORD_HASH_WORKERS values")
+    args = parser.parse_args()
+
+    seed(users=args.users, goals=1, depth=1, fanout=5)
+    for workers in args.hash_workers.split(","):
+        os.environ["PASSWORD_HASH_WORKERS"] = workers
+        target = GunicornTarget("http://127.0.0.1:9", threads=args.threads)
+        try:
+            result = burst(target, args.users, args.logins, args.concurrency)
+        finally:
+            target.close()
+        print(f"hash workers={workers:<3} {result}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
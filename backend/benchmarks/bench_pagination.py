@@ -0,0 +1,94 @@
+"""
+Walk a 100k-task goal page by page with keyset cursors and check that the
+last page costs about the same as the first, unlike LIMIT/OFFSET: every
+page must run the same number of statements, and the last pages may take
+at most MAX_SLOWDOWN times as long as the first ones.
+"""
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from benchmarks.common import app, db, reset_db, login_client, create_goal, count_queries
+from models import Task
+from services.ordering import spaced_ranks
+
+MAX_SLOWDOWN = 2.0
+SLACK = 0.005  # seconds, so scheduler noise on millisecond pages does not fail the check
+SAMPLE = 5  # pages averaged at each end
+
+
+def seed_tasks(goal_id, count):
+    ranks = spaced_ranks(count)
+    start = datetime(2025, 1, 1)
+    rows = [
+        {
+            "title": f"Task {i}",
+            "description": "x" * 500,
+            "goal_id": goal_id,
+            "rank": ranks[i],
+            "status": "done" if i % 3 == 0 else "active",
+            "created_at": start + timedelta(seconds=i),
+        }
+        for i in range(count)
+    ]
+    with app.app_context():
+        db.session.execute(insert(Task), rows)
+        db.session.commit()
+
+
+def walk(client, url):
+    timings, cursor, pages = [], None, 0
+    statements = set()
+    while True:
+        with count_queries() as queries:
+            start = time.perf_counter()
+            response = client.get(url + (f"&cursor={cursor}" if cursor else ""))
+            timings.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.json
+        statements.add(queries["count"])
+        pages += 1
+        cursor = response.json["next_cursor"]
+        if cursor is None:
+            break
+    assert len(statements) == 1, f"{url}: statement count varies with the page: {sorted(statements)}"
+    first, last = statistics.median(timings[:SAMPLE]), statistics.median(timings[-SAMPLE:])
+    assert last <= first * MAX_SLOWDOWN + SLACK, (
+        f"{url}: last pages took {last * 1000:.1f}ms, first pages {first * 1000:.1f}ms"
+    )
+    return pages, timings
+
+
+def offset_timing(goal_id, offset, limit):
+    with app.app_context():
+        start = time.perf_counter()
+        db.session.execute(
+            db.select(Task.id, Task.title).where(Task.goal_id == goal_id)
+            .order_by(Task.rank, Task.id).offset(offset).limit(limit)
+        ).all()
+        return time.perf_counter() - start
+
+
+def run(count=100_000, limit=500):
+    reset_db()
+    client, user_id = login_client()
+    goal_id = create_goal(user_id)
+    seed_tasks(goal_id, count)
+
+    for sort in ("rank", "created_at"):
+        for fields in ("id,title,status", "id,title,status,description"):
+            url = f"/api/goals/{goal_id}/tasks?limit={limit}&sort={sort}&fields={fields}"
+            pages, timings = walk(client, url)
+            print(f"sort={sort:<10} fields={fields:<30} pages={pages} first={timings[0] * 1000:.1f}ms "
+                  f"median={statistics.median(timings) * 1000:.1f}ms last={timings[-1] * 1000:.1f}ms")
+
+    pages, timings = walk(client, f"/api/goals/{goal_id}/tasks?limit={limit}&status=done&fields=id,title")
+    print(f"status=done pages={pages} first={timings[0] * 1000:.1f}ms last={timings[-1] * 1000:.1f}ms")
+
+    print(f"for comparison, LIMIT/OFFSET: offset=0 {offset_timing(goal_id, 0, limit) * 1000:.1f}ms "
+          f"offset={count - limit} {offset_timing(goal_id, count - limit, limit) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,78 @@
+"""
+Compare persisting a generated plan the old way (session.add per Task,
+commit, to_dict() on each, which refreshes every row and lazy-loads its
+subtasks) with the bulk insert_plan path, for flat and nested plans.
+Reports wall time and statement count.
+"""
+import time
+
+from benchmarks.common import app, db, reset_db, login_client, create_goal, count_queries
+from models import Task
+from services.ordering import append_ranks
+from services.plan_insert import insert_plan
+from services.versioning import bump_goal
+
+
+def make_plan(width, depth):
+    return [
+        {
+            "title": f"Task {depth}.{i}",
+            "description": "Generated",
+            **({"subtasks": make_plan(width, depth - 1)} if depth > 1 else {}),
+        }
+        for i in range(width)
+    ]
+
+
+def legacy_save(goal_id, parent_id, plan):
+    """The old save_generated_plan, applied level by level for nested plans."""
+    ranks = append_ranks(goal_id, parent_id, len(plan))
+    tasks = [
+        Task(title=t["title"], description=t["description"], goal_id=goal_id,
+             parent_id=parent_id, order_idx=i, rank=rank)
+        for i, (t, rank) in enumerate(zip(plan, ranks))
+    ]
+    db.session.add_all(tasks)
+    bump_goal(goal_id)
+    db.session.commit()
+    result = [t.to_dict() for t in tasks]
+    for t, item in zip(tasks, plan):
+        if item.get("subtasks"):
+            legacy_save(goal_id, t.id, item["subtasks"])
+    return result
+
+
+def bulk_save(goal_id, parent_id, plan):
+    tasks = insert_plan(goal_id, parent_id, plan)
+    bump_goal(goal_id)
+    db.session.commit()
+    return tasks
+
+
+def measure(save, goal_id, plan):
+    with app.app_context():
+        with count_queries() as queries:
+            start = time.perf_counter()
+            save(goal_id, None, plan)
+            elapsed = time.perf_counter() - start
+    return elapsed, queries["count"]
+
+
+def run(shapes=((10, 1), (50, 1), (8, 2), (8, 3))):
+    reset_db()
+    _, user_id = login_client()
+    for width, depth in shapes:
+        plan = make_plan(width, depth)
+        size = sum(width ** d for d in range(1, depth + 1))
+        results = {}
+        for name, save in (("legacy", legacy_save), ("bulk", bulk_save)):
+            goal_id = create_goal(user_id)
+            results[name] = measure(save, goal_id, plan)
+            with app.app_context():
+                assert db.session.scalar(db.select(db.func.count(Task.id)).where(Task.goal_id == goal_id)) == size
+        print(f"tasks={size:<4} depth={depth}  " + "  ".join(
+            f"{name}={elapsed * 1000:7.1f}ms ({queries} queries)" for name, (elapsed, queries) in results.items()))
+
+
+if __name__ == "__main__":
+    run()
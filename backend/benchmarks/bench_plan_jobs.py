@@ -0,0 +1,51 @@
+"""
+Measure plan generation throughput through the background job queue.
+
+Fires concurrent POST /api/goals/<id>/generate-plan requests against a fake
+Ollama server and long-polls each job until it completes.
+"""
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from benchmarks.common import app, reset_db, login_client, create_goal
+from benchmarks.fake_ollama import start_fake_ollama
+from services.llm_router import llm_router
+
+
+def run(requests=32, llm_delay=0.5):
+    server, url = start_fake_ollama(delay=llm_delay)
+    app.config["OLLAMA_API"] = url
+    llm_router.init_app(app)
+    reset_db()
+    client, user_id = login_client()
+    goal_ids = [create_goal(user_id, f"Goal {i}") for i in range(requests)]
+
+    def generate(goal_id):
+        enqueue_start = time.perf_counter()
+        response = client.post(f"/api/goals/{goal_id}/generate-plan")
+        enqueue_time = time.perf_counter() - enqueue_start
+        assert response.status_code == 202, response.json
+        job = response.json
+        while job["status"] in ("queued", "running"):
+            job = client.get(f"/api/ai/jobs/{job['id']}?wait=10").json
+        assert job["status"] == "done", job
+        return enqueue_time
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=requests) as pool:
+        enqueue_times = list(pool.map(generate, goal_ids))
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    workers = app.config["AI_JOB_WORKERS"]
+    print(f"jobs={requests} workers={workers} llm_delay={llm_delay}s total={elapsed:.2f}s "
+          f"throughput={requests / elapsed:.2f} plans/s "
+          f"max_enqueue={max(enqueue_times) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,39 @@
+"""
+Compare time-to-first-task for the streaming generate-plan endpoint with
+the total generation time, against a fake streaming Ollama server.
+"""
+import time
+
+from benchmarks.common import app, reset_db, login_client, create_goal
+from benchmarks.fake_ollama import start_fake_ollama
+from services.llm_router import llm_router
+
+
+def run(llm_delay=2.0, task_count=10):
+    server, url = start_fake_ollama(delay=llm_delay, task_count=task_count)
+    app.config["OLLAMA_API"] = url
+    llm_router.init_app(app)
+    reset_db()
+    client, user_id = login_client()
+    goal_id = create_goal(user_id)
+
+    start = time.perf_counter()
+    response = client.post(f"/api/goals/{goal_id}/generate-plan/stream?refresh=1", buffered=False)
+    first_task = None
+    events = []
+    for chunk in response.response:
+        text = chunk.decode() if isinstance(chunk, bytes) else chunk
+        event = text.split("\n", 1)[0].removeprefix("event: ")
+        events.append(event)
+        if event == "task" and first_task is None:
+            first_task = time.perf_counter() - start
+    total = time.perf_counter() - start
+    server.shutdown()
+
+    assert events.count("task") == task_count and events[-1] == "done", events
+    print(f"tasks={task_count} llm_delay={llm_delay}s time_to_first_task={first_task * 1000:.0f}ms "
+          f"total={total * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,143 @@
+"""
+Full-text search vs. a LIKE scan over a large task table.
+
+Fills a SQLite file with `--tasks` tasks (titles and descriptions drawn
+from a Zipf-distributed synthetic vocabulary, so some words are very
+common and most are rare), indexed by the search triggers as they are
+inserted, then times services/search.py against the LIKE queries it
+replaces for common, medium and rare words, a prefix and a two-word query.
+"like_all" fetches every match (what filtering the downloaded trees
+amounts to), "like_page" stops at the first page.
+
+    python -m benchmarks.bench_search --tasks 1000000 --users 1
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/search.db")
+
+from benchmarks.common import app, db, reset_db
+from models import Goal, Task, User
+from services.search import search
+from sqlalchemy import or_
+
+PAGE = 20
+CHUNK = 10_000
+
+
+def vocabulary(rng, size):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(letters) for _ in range(rng.randint(4, 10))))
+    words = sorted(words)  # set order changes with string hashing from run to run
+    rng.shuffle(words)
+    return words
+
+
+def fill(tasks, users, rng, words):
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(words))))
+
+    def text(low, high):
+        return " ".join(rng.choices(words, cum_weights=cum_weights, k=rng.randint(low, high)))
+
+    start = time.perf_counter()
+    with app.app_context():
+        user_ids = db.session.scalars(
+            db.insert(User).returning(User.id, sort_by_parameter_order=True),
+            [{"username": f"search{u}", "password_hash": "x"} for u in range(users)],
+        ).all()
+        goal_ids = {}
+        per_user = tasks // users
+        for user_id in user_ids:
+            goal_ids[user_id] = db.session.scalars(
+                db.insert(Goal).returning(Goal.id, sort_by_parameter_order=True),
+                [{"title": text(2, 4), "user_id": user_id} for _ in range(max(1, per_user // 1000))],
+            ).all()
+        db.session.commit()
+
+        rows = []
+        for n in range(tasks):
+            user_id = user_ids[n % users]
+            rows.append({
+                "title": text(3, 7),
+                "description": text(10, 30),
+                "goal_id": rng.choice(goal_ids[user_id]),
+                "rank": f"{n:08d}",
+            })
+            if len(rows) == CHUNK:
+                db.session.execute(db.insert(Task), rows)
+                db.session.commit()
+                rows = []
+        if rows:
+            db.session.execute(db.insert(Task), rows)
+            db.session.commit()
+    return user_ids[0], time.perf_counter() - start
+
+
+def like_query(user_id, terms, limit=None):
+    filters = [
+        or_(Task.title.like(f"%{t}%"), Task.description.like(f"%{t}%"))
+        for t in terms
+    ]
+    query = (
+        db.select(Task.id, Task.goal_id, Task.parent_id, Task.title, Task.status)
+        .join(Goal, Goal.id == Task.goal_id)
+        .where(Goal.user_id == user_id, Goal.deleted_at.is_(None), *filters)
+    )
+    if limit:
+        query = query.limit(limit)
+    return db.session.execute(query).all()
+
+
+def timed(fn, repeat):
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return round(statistics.median(times) * 1000, 2), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=1, help="tasks are spread over this many users; queries run as the first")
+    parser.add_argument("--words", type=int, default=20_000, help="vocabulary size")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    words = vocabulary(rng, args.words)
+    reset_db()
+    user_id, fill_seconds = fill(args.tasks, args.users, rng, words)
+    print(json.dumps({"tasks": args.tasks, "users": args.users, "fill_and_index_s": round(fill_seconds, 1)}))
+
+    queries = {
+        "common": [words[2]],
+        "medium": [words[200]],
+        "rare": [words[10_000 % len(words)]],
+        "prefix": [words[200][:3]],
+        "two_words": [words[20], words[300]],
+    }
+    with app.app_context():
+        for name, terms in queries.items():
+            fts_ms, items = timed(lambda: search(user_id, terms, limit=PAGE), args.repeat)
+            like_page_ms, _ = timed(lambda: like_query(user_id, terms, PAGE), args.repeat)
+            like_all_ms, matches = timed(lambda: like_query(user_id, terms), max(1, args.repeat // 2))
+            print(json.dumps({
+                "query": name, "terms": terms, "matches": len(matches), "page": len(items),
+                "fts_ms": fts_ms, "like_page_ms": like_page_ms, "like_all_ms": like_all_ms,
+            }))
+
+
+if __name__ == "__main__":
+    main()
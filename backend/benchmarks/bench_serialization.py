@@ -0,0 +1,69 @@
+"""
+Microbenchmark the task list read path for 1k, 10k and 100k tasks:
+ORM instances + to_dict + the stdlib JSON provider (the old path) against
+plain rows + compiled serializers with the stdlib and orjson providers.
+"""
+import time
+
+from benchmarks.common import app, db, reset_db, login_client, create_goal
+from models import Task
+from services.json_provider import OrjsonProvider, StdlibJSONProvider, orjson
+from services.ordering import spaced_ranks
+from services.serialization import task_rows
+
+
+def seed_flat(goal_id, count):
+    with app.app_context():
+        rows = [
+            {"title": f"Task {i}", "description": "Some description text", "goal_id": goal_id, "order_idx": i, "rank": rank}
+            for i, rank in enumerate(spaced_ranks(count))
+        ]
+        db.session.execute(db.insert(Task), rows)
+        db.session.commit()
+
+
+def legacy_rows(goal_id):
+    tasks = Task.query.filter_by(goal_id=goal_id).order_by(Task.rank, Task.id).all()
+    return [task.to_dict(recursive=False) for task in tasks]
+
+
+def measure(provider_class, fetch, goal_id, repeat):
+    app.json = provider_class(app)
+    best_fetch = best_encode = float("inf")
+    for _ in range(repeat):
+        with app.test_request_context():
+            start = time.perf_counter()
+            rows = fetch(goal_id)
+            fetched = time.perf_counter()
+            body = app.json.response(rows).get_data()
+            done = time.perf_counter()
+            db.session.remove()
+        best_fetch = min(best_fetch, fetched - start)
+        best_encode = min(best_encode, done - fetched)
+    return best_fetch, best_encode, len(body)
+
+
+def run(sizes=(1_000, 10_000, 100_000)):
+    original = app.json
+    variants = [
+        ("orm+to_dict+stdlib", StdlibJSONProvider, legacy_rows),
+        ("rows+compiled+stdlib", StdlibJSONProvider, task_rows),
+    ]
+    if orjson is not None:
+        variants.append(("rows+compiled+orjson", OrjsonProvider, task_rows))
+
+    for size in sizes:
+        reset_db()
+        _, user_id = login_client()
+        goal_id = create_goal(user_id)
+        seed_flat(goal_id, size)
+        repeat = 5 if size <= 10_000 else 2
+        for name, provider_class, fetch in variants:
+            fetch_time, encode_time, length = measure(provider_class, fetch, goal_id, repeat)
+            print(f"tasks={size:<7} {name:<22} fetch={fetch_time * 1000:8.1f}ms encode={encode_time * 1000:8.1f}ms "
+                  f"total={(fetch_time + encode_time) * 1000:8.1f}ms body={length / 1024:.0f}KiB")
+    app.json = original
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,119 @@
+"""
+Requests per second for the built frontend served by the app.
+
+Writes a synthetic CRA-style build (index.html, hashed JS/CSS bundles and
+their .gz copies from `compress_static_files`) to a temporary STATIC_FOLDER,
+starts gunicorn (gthread) on it and hammers four paths from `--concurrency`
+threads for `--seconds` each: a hashed bundle with and without gzip,
+index.html revalidated with If-None-Match, and an SPA route that falls back
+to index.html.
+
+    python -m benchmarks.bench_static --concurrency 8 --seconds 5
+"""
+import argparse
+import json
+import os
+import random
+import string
+import tempfile
+import threading
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+import requests
+
+from benchmarks.suite import GunicornTarget, percentile
+from services.static_files import compress_static_files
+
+
+def write_build(folder, rng):
+    def words(n):
+        return " ".join("".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(n))
+
+    os.makedirs(os.path.join(folder, "static", "js"))
+    os.makedirs(os.path.join(folder, "static", "css"))
+    files = {
+        "index.html": "<!doctype html><html><head><title>Taskflow</title>"
+                      '<script defer src="/static/js/main.3f2a1b4c.js"></script>'
+                      '<link href="/static/css/main.9e8d7c6b.css" rel="stylesheet"></head>'
+                      '<body><div id="root"></div></body></html>',
+        "static/js/main.3f2a1b4c.js": "".join(f"function f{i}(a,b){{return '{words(8)}'+a+b}}\n" for i in range(4000)),
+        "static/css/main.9e8d7c6b.css": "".join(f".c{i}{{margin:{i % 16}px;color:#{i % 4096:03x}}}\n" for i in range(2000)),
+        "robots.txt": "User-agent: *\nDisallow:\n",
+    }
+    for name, text in files.items():
+        with open(os.path.join(folder, name), "w") as f:
+            f.write(text)
+    compress_static_files(folder)
+    return {name: os.path.getsize(os.path.join(folder, name)) for name in files}
+
+
+def hammer(base_url, path, headers, concurrency, seconds):
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker():
+        session = requests.Session()
+        mine = []
+        seen = {}
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            # read the body as sent: decompressing it here would bill the client's CPU to the server
+            response = session.get(base_url + path, headers=headers, stream=True)
+            response.raw.read()
+            mine.append(time.perf_counter() - start)
+            seen[response.status_code] = seen.get(response.status_code, 0) + 1
+        with lock:
+            latencies.extend(mine)
+            for status, count in seen.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "path": path,
+        "headers": headers,
+        "statuses": statuses,
+        "rps": round(len(latencies) / elapsed),
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp()
+    sizes = write_build(folder, random.Random(0))
+    print(json.dumps({"build": sizes}))
+    os.environ["STATIC_FOLDER"] = folder
+    target = GunicornTarget("http://127.0.0.1:9", workers=args.workers)
+    try:
+        etag = requests.get(target.base_url + "/").headers.get("ETag", "")
+        cases = [
+            ("/static/js/main.3f2a1b4c.js", {"Accept-Encoding": "gzip, deflate, br"}),
+            ("/static/js/main.3f2a1b4c.js", {"Accept-Encoding": "identity"}),
+            ("/", {"If-None-Match": etag}),
+            ("/goals/42", {"Accept-Encoding": "gzip, deflate, br"}),
+        ]
+        for path, headers in cases:
+            print(json.dumps(hammer(target.base_url, path, headers, args.concurrency, args.seconds)))
+    finally:
+        target.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Benchmark GET /api/goals/<goal_id>/tasks across tree shapes.
+
+Asserts that the number of SQL queries stays constant regardless of depth.
+"""
+import time
+
+from benchmarks.common import app, db, reset_db, login_client, create_goal, count_queries
+from models import Task
+from services.ordering import spaced_ranks
+
+
+def seed_tree(goal_id, depth, fanout):
+    """Insert a full tree of the given depth and fan-out, one level at a time."""
+    with app.app_context():
+        parents = [None]
+        ranks = spaced_ranks(fanout)
+        total = 0
+        for _ in range(depth):
+            level = []
+            for parent_id in parents:
+                for idx in range(fanout):
+                    level.append(Task(title=f"Task {total}", goal_id=goal_id, parent_id=parent_id, rank=ranks[idx]))
+                    total += 1
+            db.session.add_all(level)
+            db.session.flush()
+            parents = [t.id for t in level]
+        db.session.commit()
+        return total
+
+
+def run(shapes=((1, 1000), (3, 10), (6, 3), (10, 2), (200, 1))):
+    query_counts = set()
+    for depth, fanout in shapes:
+        reset_db()
+        client, user_id = login_client()
+        goal_id = create_goal(user_id)
+        total = seed_tree(goal_id, depth, fanout)
+
+        for flat in (False, True):
+            url = f"/api/goals/{goal_id}/tasks" + ("?flat=1" if flat else "")
+            with count_queries() as queries:
+                start = time.perf_counter()
+                response = client.get(url)
+                elapsed = time.perf_counter() - start
+            assert response.status_code == 200
+            query_counts.add(queries["count"])
+            print(f"depth={depth:<4} fanout={fanout:<5} tasks={total:<6} flat={flat!s:<5} "
+                  f"queries={queries['count']:<3} time={elapsed * 1000:.1f}ms bytes={len(response.data)}")
+
+    assert len(query_counts) == 1, f"query count varies with tree shape: {sorted(query_counts)}"
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,138 @@
+"""
+NDJSON export/import round trip vs. scripting the task API.
+
+Fills a SQLite file with `--tasks` tasks over `--goals` goals (trees up to
+four levels deep, some tasks done or archived), exports them with
+GET /api/goals/export into a file and imports that file as another user
+with POST /api/goals/import, both streamed through the test client.
+Reports rows per second and peak memory growth of each direction, checks
+the imported counts with check_rollups, and times `--api-sample` tasks
+created one POST /api/goals/<id>/tasks at a time for comparison.
+
+    python -m benchmarks.bench_transfer --tasks 1000000 --goals 10
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/transfer.db")
+
+from benchmarks.common import app, db, login_client, reset_db
+from models import Goal, Task
+from services.auth_cache import user_cache
+from services.rollups import check_rollups
+
+CHUNK = 10_000
+MAX_DEPTH = 3
+
+
+def fill(user_id, goals, tasks, rng):
+    start = time.perf_counter()
+    with app.app_context():
+        goal_ids = db.session.scalars(
+            db.insert(Goal).returning(Goal.id, sort_by_parameter_order=True),
+            [{"title": f"Imported goal {g}", "user_id": user_id} for g in range(goals)],
+        ).all()
+        db.session.commit()
+        user_cache.clear()
+        next_id = 1
+        for goal_id in goal_ids:
+            depth = {}
+            recent = []  # ids that can still take children
+            rows = []
+            for _ in range(tasks // goals):
+                parent = rng.choice(recent) if recent and rng.random() < 0.8 else None
+                task_id = next_id
+                next_id += 1
+                depth[task_id] = 0 if parent is None else depth[parent] + 1
+                if depth[task_id] < MAX_DEPTH:
+                    recent.append(task_id)
+                    del recent[:-50]
+                rows.append({
+                    "id": task_id, "goal_id": goal_id, "parent_id": parent,
+                    "title": f"Task {task_id}", "description": "Imported from the old tracker" if task_id % 3 else None,
+                    "rank": f"{task_id:08d}1", "order_idx": task_id,
+                    "status": rng.choices(("active", "done", "archived"), (75, 20, 5))[0],
+                })
+                if len(rows) == CHUNK:
+                    db.session.execute(db.insert(Task), rows)
+                    db.session.commit()
+                    rows = []
+            if rows:
+                db.session.execute(db.insert(Task), rows)
+                db.session.commit()
+    return time.perf_counter() - start
+
+
+def peak_rss_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--goals", type=int, default=10)
+    parser.add_argument("--api-sample", type=int, default=2000, help="tasks created through the API for comparison")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    reset_db()
+    source, source_id = login_client("export-source")
+    target, _ = login_client("import-target")
+    fill_seconds = fill(source_id, args.goals, args.tasks, random.Random(args.seed))
+    print(json.dumps({"tasks": args.tasks, "goals": args.goals, "fill_s": round(fill_seconds, 1)}))
+
+    path = os.path.join(tempfile.mkdtemp(), "export.ndjson")
+    rss = peak_rss_kb()
+    start = time.perf_counter()
+    response = source.get("/api/goals/export", buffered=False)
+    with open(path, "wb") as f:
+        for chunk in response.response:
+            f.write(chunk if isinstance(chunk, bytes) else chunk.encode())
+    response.close()
+    export_seconds = time.perf_counter() - start
+    rows = args.tasks + args.goals
+    print(json.dumps({
+        "direction": "export", "status": response.status_code, "rows": rows,
+        "mb": round(os.path.getsize(path) / 2**20, 1), "seconds": round(export_seconds, 1),
+        "rows_per_s": round(rows / export_seconds), "peak_rss_growth_mb": round((peak_rss_kb() - rss) / 1024, 1),
+    }))
+
+    rss = peak_rss_kb()
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        response = target.post(
+            "/api/goals/import", input_stream=f, content_type="application/x-ndjson",
+            headers={"Content-Length": str(os.path.getsize(path))},
+        )
+    import_seconds = time.perf_counter() - start
+    result = response.get_json()
+    if response.status_code != 201:
+        raise SystemExit(f"import failed: {result}")
+    with app.app_context():
+        wrong = check_rollups(result.get("goal_ids", []))
+    print(json.dumps({
+        "direction": "import", "status": response.status_code, "rows": result.get("tasks", 0) + len(result.get("goal_ids", [])),
+        "seconds": round(import_seconds, 1), "rows_per_s": round(rows / import_seconds),
+        "peak_rss_growth_mb": round((peak_rss_kb() - rss) / 1024, 1), "wrong_counts": len(wrong),
+    }))
+    print(json.dumps({"direction": "round_trip", "rows_per_s": round(rows / (export_seconds + import_seconds))}))
+
+    goal_id = target.post("/api/goals", json={"title": "Scripted"}).get_json()["id"]
+    ids = []
+    start = time.perf_counter()
+    for n in range(args.api_sample):
+        body = {"title": f"Scripted {n}"}
+        if ids and n % 5:
+            body["parent_id"] = ids[-1 - n % 7] if len(ids) > 7 else ids[-1]
+        ids.append(target.post(f"/api/goals/{goal_id}/tasks", json=body).get_json()["id"])
+    api_seconds = time.perf_counter() - start
+    print(json.dumps({"direction": "api_one_by_one", "rows": args.api_sample, "rows_per_s": round(args.api_sample / api_seconds)}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+EXPLAIN every query the hot routes run and fail if any of them scans a whole table.
+
+The statements are not written out here: each scenario of the benchmark
+suite (benchmarks/suite.py), plus the extra requests below, is sent once
+through the Flask test client against a small seeded database, with the
+auth cache cleared so the sign-in lookups run too. Every statement the
+routes execute is captured with its parameters and explained, so a change
+to a route or a service query is checked as soon as it lands.
+
+Works against SQLite (EXPLAIN QUERY PLAN) and Postgres (EXPLAIN, with
+sequential scans disabled so the planner has to show whether an index
+exists even on small tables). Point DATABASE_URL at a Postgres database
+to check that dialect; the schema is created from models.py.
+"""
+import re
+import sys
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from benchmarks.suite import SCENARIOS, ClientTarget, expect, login, setup_etag, setup_ids
+from benchmarks.common import app, db
+from benchmarks.fake_ollama import start_fake_ollama
+from benchmarks.seed import seed
+from services.auth_cache import user_cache
+
+
+def next_page(session, url):
+    status, _, page = session.request("GET", url)
+    expect(status, 200)
+    # the second page is the one that seeks past a cursor
+    separator = "&" if "?" in url else "?"
+    return expect(session.request("GET", f"{url}{separator}cursor={page['next_cursor']}")[0], 200)
+
+
+EXTRA_REQUESTS = [
+    ("goal_page_cursor", lambda s, c, i: next_page(s, "/api/goals?limit=1")),
+    ("task_page_cursor", lambda s, c, i: next_page(s, f"/api/goals/{c['goal_id']}/tasks?limit=5")),
+    ("task_page_created_at", lambda s, c, i: next_page(s, f"/api/goals/{c['goal_id']}/tasks?limit=5&sort=created_at")),
+    ("subtask_page", lambda s, c, i: expect(s.request(
+        "GET", f"/api/goals/{c['goal_id']}/tasks?limit=5&parent_id={c['root_ids'][0]}")[0], 200)),
+    ("search", lambda s, c, i: next_page(s, "/api/search?q=synthetic+ta&limit=5")),
+]
+
+EXPLAINED = ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT")
+SQLITE_SCAN = re.compile(r"^SCAN (\w+)")
+
+
+@contextmanager
+def capture_statements():
+    """Collect (statement, parameters) of everything executed on the app engine inside the block."""
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        # executemany passes a list of parameter sets; one is enough to explain
+        if executemany and parameters and isinstance(parameters[0], (tuple, list, dict)):
+            parameters = parameters[0]
+        statements.append((statement, parameters))
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", on_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+
+
+def table_scans(sql, plan):
+    """SQLite plan lines that read a whole table; CTEs and FTS lookups are not tables."""
+    tables = set(db.metadata.tables)
+    aliases = {alias: table for table, alias in re.findall(r"\b(\w+) AS (\w+)\b", sql)}
+    scans = []
+    for line in plan:
+        match = SQLITE_SCAN.match(line)
+        if match and aliases.get(match.group(1), match.group(1)) in tables:
+            scans.append(line)
+    return scans
+
+
+def explain(conn, statement, parameters):
+    if conn.dialect.name == "sqlite":
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+        plan = [row[-1] for row in rows]
+        return plan, table_scans(statement, plan)
+    conn.exec_driver_sql("SET enable_seqscan = off")
+    plan = [row[0] for row in conn.exec_driver_sql(f"EXPLAIN {statement}", parameters).all()]
+    return plan, [line for line in plan if "Seq Scan" in line]
+
+
+def route_statements():
+    """{statement: (first scenario that ran it, its parameters)}, in the order they were first seen."""
+    summary = seed(users=2, goals=2, depth=2, fanout=6)
+    server, ollama_url = start_fake_ollama(delay=0, task_count=2)
+    target = ClientTarget(ollama_url)
+    found = {}
+    try:
+        ctx = {"run": 0, "user_id": summary["user_ids"][0], "goal_id": summary["goal_ids"][0]}
+        setup_ids(ctx, 1)
+        setup_etag(login(target), ctx)
+        for name, fn in SCENARIOS + EXTRA_REQUESTS:
+            session = login(target)
+            user_cache.clear()
+            with capture_statements() as statements:
+                fn(session, ctx, 0)
+            for statement, parameters in statements:
+                if statement.lstrip().upper().startswith(EXPLAINED):
+                    found.setdefault(statement, (name, parameters))
+    finally:
+        target.close()
+        server.shutdown()
+    return found
+
+
+def run():
+    failures = []
+    statements = route_statements()
+    with app.app_context(), db.engine.connect() as conn:
+        for statement, (name, parameters) in statements.items():
+            plan, full_scans = explain(conn, statement, parameters)
+            status = "FULL SCAN" if full_scans else "ok"
+            print(f"[{status}] {name}: {' '.join(statement.split())[:160]}")
+            for line in plan:
+                print(f"    {line}")
+            if full_scans:
+                failures.append(name)
+
+    print(f"{len(statements)} distinct statements explained")
+    if failures:
+        print(f"Full table scans in: {', '.join(sorted(set(failures)))}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    run()
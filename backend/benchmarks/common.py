@@ -0,0 +1,64 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Run benchmarks from the backend directory, e.g. `python -m benchmarks.bench_task_tree`.
+They use an in-memory SQLite database unless DATABASE_URL is set.
+"""
+import os
+import logging
+from contextlib import contextmanager
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+os.environ.setdefault("OLLAMA_HEALTH_INTERVAL", "0")
+
+from sqlalchemy import event
+
+from app import app
+from models import db, User, Goal
+from services.auth_cache import user_cache
+
+logging.getLogger().setLevel(logging.WARNING)
+
+
+def reset_db():
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    # ids start over, so cached goal ownership no longer applies
+    user_cache.clear()
+
+
+def login_client(username="bench", password="bench"):
+    """Sign up a fresh user and return (client, user_id)."""
+    client = app.test_client()
+    client.post("/api/signup", json={"username": username, "password": password})
+    client.get("/api/goals")  # fills the auth cache, so measured requests see the steady state
+    with app.app_context():
+        user_id = User.query.filter_by(username=username).first().id
+    return client, user_id
+
+
+def create_goal(user_id, title="Benchmark goal"):
+    with app.app_context():
+        goal = Goal(title=title, user_id=user_id)
+        db.session.add(goal)
+        db.session.commit()
+        user_cache.update_goals(user_id, added=(goal.id,))
+        return goal.id
+
+
+@contextmanager
+def count_queries():
+    """Count SQL statements executed on the app engine inside the block."""
+    counter = {"count": 0}
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        counter["count"] += 1
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", on_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
@@ -0,0 +1,130 @@
+"""
+Minimal stand-in for the Ollama completions API.
+
+Serves POST /v1/completions with a canned plan after a configurable delay,
+so AI routes can be exercised without a model. With "stream": true the plan
+is sent as OpenAI-style SSE chunks spread evenly over the same delay. A list
+"prompt" gets one choice per prompt, costing `batch_cost` extra seconds per
+additional prompt. `parallel` limits how many requests the "model" works on
+at once, the rest wait their turn as they would on one Ollama instance.
+
+Run it standalone with `python -m benchmarks.fake_ollama --port 11434 --delay 2`.
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def canned_plan(count=5):
+    return {
+        "tasks": [
+            {"title": f"Step {i + 1}", "description": f"Do part {i + 1} of the work."}
+            for i in range(count)
+        ]
+    }
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.path != "/api/tags":
+            self.send_error(404)
+            return
+        if not self.server.healthy:
+            self.send_error(503)
+            return
+        payload = json.dumps({"models": [{"name": self.server.model}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        self.server.requests_seen += 1
+        self.server.models_seen.append(body.get("model"))
+
+        if self.path != "/v1/completions":
+            self.send_error(404)
+            return
+
+        text = json.dumps(canned_plan(self.server.task_count))
+        if body.get("stream"):
+            self.stream_completion(text)
+            return
+
+        prompts = body.get("prompt")
+        count = len(prompts) if isinstance(prompts, list) else 1
+        self.server.batch_sizes.append(count)
+        with self.server.slots:
+            time.sleep(self.server.delay + self.server.batch_cost * (count - 1))
+        payload = json.dumps({
+            "model": body.get("model"),
+            "choices": [{"index": i, "text": text} for i in range(count)],
+        }).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def stream_completion(self, text, token_size=4):
+        tokens = [text[i:i + token_size] for i in range(0, len(text), token_size)]
+        token_delay = self.server.delay / len(tokens)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        for token in tokens:
+            time.sleep(token_delay)
+            chunk = json.dumps({"choices": [{"text": token}]})
+            self.wfile.write(f"data: {chunk}\n\n".encode())
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_ollama(delay=0.5, task_count=5, port=0, parallel=64, batch_cost=0.0, model="mistral:latest"):
+    """Start the fake server on a background thread and return (server, base_url)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeOllamaHandler)
+    server.daemon_threads = True
+    server.delay = delay
+    server.task_count = task_count
+    server.requests_seen = 0
+    server.models_seen = []
+    server.model = model
+    server.healthy = True
+    server.batch_sizes = []
+    server.slots = threading.BoundedSemaphore(parallel)
+    server.batch_cost = batch_cost
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--delay", type=float, default=0.5)
+    parser.add_argument("--tasks", type=int, default=5)
+    parser.add_argument("--parallel", type=int, default=64)
+    parser.add_argument("--batch-cost", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server, url = start_fake_ollama(args.delay, args.tasks, args.port, args.parallel, args.batch_cost)
+    print(f"Fake Ollama listening on {url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
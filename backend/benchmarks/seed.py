@@ -0,0 +1,91 @@
+"""
+Synthetic data generator for benchmarks.
+
+Creates `users` users (bench0, bench1, ... all with password "bench"), each
+with `goals` goals holding a task tree `depth` levels deep where every task
+has `fanout` children (± `jitter`, drawn from a seeded RNG so runs are
+reproducible). Rows are written level by level with multi-row INSERTs.
+
+    DATABASE_URL=sqlite:////tmp/bench.db python -m benchmarks.seed --users 10 --goals 5 --depth 3 --fanout 6
+"""
+import argparse
+import json
+import random
+import time
+
+from benchmarks.common import app, db, reset_db
+from models import Goal, Task, User, initial_version
+from services.ordering import spaced_ranks
+from werkzeug.security import generate_password_hash
+
+PASSWORD = "bench"
+
+
+def seed(users=1, goals=1, depth=2, fanout=5, jitter=0, rng_seed=0, reset=True):
+    """Populate the database and return a summary with the created ids."""
+    rng = random.Random(rng_seed)
+    start = time.perf_counter()
+    if reset:
+        reset_db()
+
+    with app.app_context():
+        password_hash = generate_password_hash(PASSWORD)  # hashed once, shared by every user
+        user_rows = [
+            {"username": f"bench{i}", "password_hash": password_hash, "goals_version": initial_version()}
+            for i in range(users)
+        ]
+        user_ids = db.session.scalars(db.insert(User).returning(User.id, sort_by_parameter_order=True), user_rows).all()
+
+        goal_rows = [
+            {"title": f"Goal {g} of user {u}", "user_id": user_id, "version": initial_version()}
+            for u, user_id in enumerate(user_ids) for g in range(goals)
+        ]
+        goal_ids = db.session.scalars(db.insert(Goal).returning(Goal.id, sort_by_parameter_order=True), goal_rows).all() if goal_rows else []
+
+        task_count = 0
+        level = [(goal_id, None) for goal_id in goal_ids]  # (goal_id, parent_id) of the groups to fill
+        for depth_index in range(depth):
+            rows = []
+            for goal_id, parent_id in level:
+                count = max(0, fanout + rng.randint(-jitter, jitter))
+                for i, rank in enumerate(spaced_ranks(count)):
+                    rows.append({
+                        "title": f"Task {depth_index}.{i}",
+                        "description": f"Synthetic task at depth {depth_index}",
+                        "goal_id": goal_id,
+                        "parent_id": parent_id,
+                        "order_idx": i,
+                        "rank": rank,
+                    })
+            if not rows:
+                break
+            ids = db.session.scalars(db.insert(Task).returning(Task.id, sort_by_parameter_order=True), rows).all()
+            task_count += len(ids)
+            level = [(row["goal_id"], task_id) for row, task_id in zip(rows, ids)]
+        db.session.commit()
+
+    return {
+        "users": len(user_ids),
+        "goals": len(goal_ids),
+        "tasks": task_count,
+        "user_ids": user_ids,
+        "goal_ids": goal_ids,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def add_arguments(parser):
+    parser.add_argument("--users", type=int, default=1)
+    parser.add_argument("--goals", type=int, default=1, help="goals per user")
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--fanout", type=int, default=5)
+    parser.add_argument("--jitter", type=int, default=0, help="random +/- variation of the fan-out")
+    parser.add_argument("--seed", type=int, default=0, help="RNG seed for the tree shape")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_arguments(parser)
+    args = parser.parse_args()
+    summary = seed(args.users, args.goals, args.depth, args.fanout, args.jitter, args.seed)
+    print(json.dumps({k: v for k, v in summary.items() if not k.endswith("_ids")}))
@@ -0,0 +1,436 @@
+"""
+Benchmark suite for the whole API.
+
+Seeds a database (see benchmarks/seed.py), then drives every route either
+through the Flask test client or against a real gunicorn process, with a
+fake Ollama answering the AI routes. For each scenario it reports
+throughput, p50/p95/p99 latency and SQL statements per request (read from
+/metrics), plus the peak RSS of the server, as JSON.
+
+    python -m benchmarks.suite --target client --output bench.json
+    python -m benchmarks.suite --target gunicorn --baseline benchmarks/baseline.json
+
+With --baseline the run fails (exit 1) when a scenario gets slower or
+issues more queries than the baseline allows; --save-baseline writes the
+current results as the new baseline. Set DATABASE_URL to run on Postgres.
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+os.environ.setdefault("METRICS_TOKEN", "bench")
+METRICS_HEADERS = {"Authorization": f"Bearer {os.environ['METRICS_TOKEN']}"}
+
+import requests
+
+from benchmarks.common import app, db
+from benchmarks.fake_ollama import start_fake_ollama
+from benchmarks.seed import PASSWORD, add_arguments, seed
+from models import Goal, Task
+from services.llm_router import llm_router
+from services.ordering import spaced_ranks
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SQL_METRIC = re.compile(r'^http_request_sql_queries_(sum|count)\{method="[^"]*",route="([^"]*)"\} (\S+)$')
+
+
+class ClientTarget:
+    """Requests through the Flask test client, in this process."""
+
+    name = "client"
+
+    def __init__(self, ollama_url):
+        app.config["OLLAMA_API"] = ollama_url
+        app.config["OLLAMA_BACKENDS"] = None
+        app.config["OLLAMA_HEALTH_INTERVAL"] = 0
+        llm_router.init_app(app)
+
+    def session(self):
+        return ClientSession(app.test_client())
+
+    def peak_rss_kb(self):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    def close(self):
+        pass
+
+
+class ClientSession:
+    def __init__(self, client):
+        self.client = client
+
+    def request(self, method, url, json=None, headers=None):
+        response = self.client.open(url, method=method, json=json, headers=headers)
+        response.get_data()
+        return response.status_code, response.headers, response.get_json(silent=True)
+
+
+class GunicornTarget:
+    """Requests over HTTP to a gunicorn server started on a free port."""
+
+    name = "gunicorn"
+
+    def __init__(self, ollama_url, workers=1, threads=8):
+        port = free_port()
+        self.base_url = f"http://127.0.0.1:{port}"
+        env = dict(
+            os.environ,
+            OLLAMA_API=ollama_url,
+            OLLAMA_HEALTH_INTERVAL="0",
+            LOG_LEVEL="WARNING",
+            METRICS_ENABLED="1",
+        )
+        env.pop("OLLAMA_BACKENDS", None)
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "app:app", "-b", f"127.0.0.1:{port}",
+             "--workers", str(workers), "--worker-class", "gthread", "--threads", str(threads)],
+            cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        deadline = time.time() + 30
+        while True:
+            try:
+                requests.get(f"{self.base_url}/metrics", timeout=1)
+                break
+            except (requests.ConnectionError, requests.Timeout):
+                if self.process.poll() is not None or time.time() > deadline:
+                    raise RuntimeError("gunicorn did not start")
+                time.sleep(0.2)
+
+    def session(self):
+        return HttpSession(self.base_url)
+
+    def peak_rss_kb(self):
+        """Largest VmHWM of the gunicorn master and its workers (Linux only)."""
+        pids = [self.process.pid] + child_pids(self.process.pid)
+        peaks = [vm_hwm_kb(pid) for pid in pids]
+        peaks = [p for p in peaks if p is not None]
+        return max(peaks) if peaks else None
+
+    def close(self):
+        self.process.terminate()
+        self.process.wait(timeout=10)
+
+
+class HttpSession:
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.http = requests.Session()
+
+    def request(self, method, url, json=None, headers=None):
+        response = self.http.request(method, self.base_url + url, json=json, headers=headers, timeout=60)
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+        return response.status_code, response.headers, body
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def child_pids(pid):
+    children = []
+    for entry in os.listdir("/proc") if os.path.isdir("/proc") else []:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            children.append(int(entry))
+    return children
+
+
+def vm_hwm_kb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def login(target, username="bench0"):
+    session = target.session()
+    status, _, _ = session.request("POST", "/api/login", json={"username": username, "password": PASSWORD})
+    assert status == 200, f"login failed with {status}"
+    return session
+
+
+# --- scenarios --------------------------------------------------------------
+# Each scenario is fn(session, ctx, i) -> status of its last request. Setup
+# functions run once before the timed loop and may add data to ctx.
+
+def expect(status, *ok):
+    if status not in ok:
+        raise AssertionError(f"unexpected status {status}")
+    return status
+
+
+def wait_for_job(session, job):
+    while job["status"] in ("queued", "running"):
+        status, _, job = session.request("GET", f"/api/ai/jobs/{job['id']}?wait=10")
+        expect(status, 200)
+    if job["status"] != "done":
+        raise AssertionError(f"plan job {job['status']}: {job.get('error')}")
+    return 200
+
+
+def insert_leaves(goal_id, count):
+    with app.app_context():
+        rows = [{"title": f"Leaf {i}", "goal_id": goal_id, "rank": rank} for i, rank in enumerate(spaced_ranks(count))]
+        ids = db.session.scalars(db.insert(Task).returning(Task.id, sort_by_parameter_order=True), rows).all()
+        db.session.commit()
+        return ids
+
+
+def insert_goals(user_id, count):
+    with app.app_context():
+        rows = [{"title": f"Disposable goal {i}", "user_id": user_id} for i in range(count)]
+        ids = db.session.scalars(db.insert(Goal).returning(Goal.id, sort_by_parameter_order=True), rows).all()
+        db.session.commit()
+        return ids
+
+
+def setup_ids(ctx, iterations):
+    with app.app_context():
+        goal_id = ctx["goal_id"]
+        ctx["root_ids"] = db.session.scalars(
+            db.select(Task.id).where(Task.goal_id == goal_id, Task.parent_id.is_(None)).order_by(Task.rank)
+        ).all()
+        ctx["task_ids"] = db.session.scalars(db.select(Task.id).where(Task.goal_id == goal_id).order_by(Task.id)).all()
+    ctx["scratch_goal_id"] = insert_goals(ctx["user_id"], 1)[0]
+    ctx["leaf_ids"] = insert_leaves(ctx["scratch_goal_id"], iterations)
+    ctx["disposable_goal_ids"] = insert_goals(ctx["user_id"], iterations)
+
+
+def setup_etag(session, ctx):
+    status, headers, _ = session.request("GET", f"/api/goals/{ctx['goal_id']}/tasks")
+    ctx["etag"] = headers.get("ETag")
+
+
+def pick(ids, i):
+    return ids[i % len(ids)]
+
+
+SCENARIOS = [
+    ("login", lambda s, c, i: expect(s.request("POST", "/api/login", json={"username": "bench0", "password": PASSWORD})[0], 200)),
+    ("signup", lambda s, c, i: expect(s.request("POST", "/api/signup", json={"username": f"new-{c['run']}-{i}", "password": "pw"})[0], 200)),
+    ("list_goals", lambda s, c, i: expect(s.request("GET", "/api/goals")[0], 200)),
+    ("list_goals_page", lambda s, c, i: expect(s.request("GET", "/api/goals?limit=20")[0], 200)),
+    ("task_tree", lambda s, c, i: expect(s.request("GET", f"/api/goals/{c['goal_id']}/tasks")[0], 200)),
+    ("task_tree_revalidate", lambda s, c, i: expect(s.request(
+        "GET", f"/api/goals/{c['goal_id']}/tasks", headers={"If-None-Match": c["etag"]})[0], 304)),
+    ("task_flat", lambda s, c, i: expect(s.request("GET", f"/api/goals/{c['goal_id']}/tasks?flat=1")[0], 200)),
+    ("task_page", lambda s, c, i: expect(s.request("GET", f"/api/goals/{c['goal_id']}/tasks?limit=100")[0], 200)),
+    ("create_goal", lambda s, c, i: expect(s.request("POST", "/api/goals", json={"title": f"Goal {i}"})[0], 201)),
+    ("update_goal", lambda s, c, i: expect(s.request("PUT", f"/api/goals/{c['goal_id']}", json={"title": f"Renamed {i}"})[0], 200)),
+    ("create_task", lambda s, c, i: expect(s.request("POST", f"/api/goals/{c['goal_id']}/tasks", json={"title": f"New {i}"})[0], 201)),
+    # a parent from another goal must be refused, not linked across goals
+    ("create_task_bad_parent", lambda s, c, i: expect(s.request(
+        "POST", f"/api/goals/{c['scratch_goal_id']}/tasks", json={"title": f"Stray {i}", "parent_id": pick(c['task_ids'], i)})[0], 400)),
+    ("update_task", lambda s, c, i: expect(s.request("PUT", f"/api/tasks/{pick(c['task_ids'], i)}", json={"title": f"Edited {i}"})[0], 200)),
+    ("move_task", lambda s, c, i: expect(s.request(
+        "POST", f"/api/tasks/{pick(c['root_ids'], i)}/move", json={"after_id": pick(c['root_ids'], i + 1)})[0], 200)),
+    ("batch_update", lambda s, c, i: expect(s.request("POST", "/api/tasks/batch-update", json={
+        "updates": [{"id": pick(c["task_ids"], i * 50 + k), "status": "done"} for k in range(50)]})[0], 200)),
+    ("delete_task", lambda s, c, i: expect(s.request("DELETE", f"/api/tasks/{c['leaf_ids'][i]}")[0], 200)),
+    ("delete_goal", lambda s, c, i: expect(s.request("DELETE", f"/api/goals/{c['disposable_goal_ids'][i]}")[0], 200)),
+    ("generate_plan", lambda s, c, i: wait_for_job(s, expect_job(s.request("POST", f"/api/goals/{c['scratch_goal_id']}/generate-plan?refresh=1")))),
+    ("generate_plan_stream", lambda s, c, i: expect(s.request("POST", f"/api/goals/{c['scratch_goal_id']}/generate-plan/stream?refresh=1")[0], 200)),
+    ("ai_cache_stats", lambda s, c, i: expect(s.request("GET", "/api/ai/cache", headers=METRICS_HEADERS)[0], 200)),
+    ("ai_llm_stats", lambda s, c, i: expect(s.request("GET", "/api/ai/llm", headers=METRICS_HEADERS)[0], 200)),
+]
+
+
+def expect_job(result):
+    status, _, job = result
+    expect(status, 202)
+    return job
+
+
+# --- runner -----------------------------------------------------------------
+
+def metrics_text(session):
+    if isinstance(session, ClientSession):
+        return session.client.get("/metrics", headers=METRICS_HEADERS).get_data(as_text=True)
+    return session.http.get(f"{session.base_url}/metrics", headers=METRICS_HEADERS, timeout=10).text
+
+
+def sql_counts(session):
+    """(statements, requests) from /metrics, excluding the /metrics route itself."""
+    totals = {"sum": 0.0, "count": 0.0}
+    for line in metrics_text(session).splitlines():
+        match = SQL_METRIC.match(line)
+        if match and match.group(2) != "/metrics":
+            totals[match.group(1)] += float(match.group(3))
+    return totals["sum"], totals["count"]
+
+
+def percentile(values, q):
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run_scenario(target, ctx, name, fn, iterations, concurrency):
+    local = threading.local()
+
+    def session():
+        if not hasattr(local, "session"):
+            local.session = login(target)
+        return local.session
+
+    def one(i):
+        s = session()
+        start = time.perf_counter()
+        try:
+            fn(s, ctx, i)
+            ok = True
+        except AssertionError:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    probe = login(target)
+    sql_before, requests_before = sql_counts(probe)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(one, range(iterations)))
+    elapsed = time.perf_counter() - start
+    sql_after, requests_after = sql_counts(probe)
+
+    latencies = sorted(t for t, _ in outcomes)
+    handled = requests_after - requests_before
+    return {
+        "iterations": iterations,
+        "errors": sum(1 for _, ok in outcomes if not ok),
+        "seconds": round(elapsed, 4),
+        "throughput_rps": round(iterations / elapsed, 2),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        # includes the logins made by new worker threads
+        "queries_per_request": round((sql_after - sql_before) / handled, 2) if handled else None,
+    }
+
+
+def compare(results, baseline, tolerance, min_ms):
+    """Return a list of human-readable regressions against the baseline."""
+    regressions = []
+    for name, current in results["scenarios"].items():
+        if current["errors"]:
+            regressions.append(f"{name}: {current['errors']} failed requests")
+        base = baseline.get("scenarios", {}).get(name)
+        if base is None:
+            continue
+        if current["p95_ms"] > base["p95_ms"] * (1 + tolerance) and current["p95_ms"] - base["p95_ms"] > min_ms:
+            regressions.append(f"{name}: p95 {current['p95_ms']}ms vs baseline {base['p95_ms']}ms")
+        if current["throughput_rps"] < base["throughput_rps"] * (1 - tolerance) and \
+                1000 / current["throughput_rps"] - 1000 / base["throughput_rps"] > min_ms:
+            regressions.append(f"{name}: {current['throughput_rps']} req/s vs baseline {base['throughput_rps']} req/s")
+        if None not in (current["queries_per_request"], base["queries_per_request"]) and \
+                current["queries_per_request"] > base["queries_per_request"] + 0.5:
+            regressions.append(
+                f"{name}: {current['queries_per_request']} queries/request vs baseline {base['queries_per_request']}")
+    return regressions
+
+
+def run(args):
+    summary = seed(args.users, args.goals, args.depth, args.fanout, args.jitter, args.seed)
+    server, ollama_url = start_fake_ollama(delay=args.llm_delay, task_count=5)
+    target = ClientTarget(ollama_url) if args.target == "client" else GunicornTarget(ollama_url, args.workers)
+    try:
+        ctx = {"run": int(time.time()), "user_id": summary["user_ids"][0], "goal_id": summary["goal_ids"][0]}
+        setup_ids(ctx, args.iterations)
+        setup_etag(login(target), ctx)
+
+        selected = set(args.scenarios.split(",")) if args.scenarios else None
+        scenarios = {}
+        for name, fn in SCENARIOS:
+            if selected and name not in selected:
+                continue
+            scenarios[name] = run_scenario(target, ctx, name, fn, args.iterations, args.concurrency)
+            print(f"{name:<22} {scenarios[name]['throughput_rps']:>9.1f} req/s  p50={scenarios[name]['p50_ms']:>8.2f}ms  "
+                  f"p95={scenarios[name]['p95_ms']:>8.2f}ms  p99={scenarios[name]['p99_ms']:>8.2f}ms  "
+                  f"queries={scenarios[name]['queries_per_request']}  errors={scenarios[name]['errors']}",
+                  file=sys.stderr)
+        peak_rss_kb = target.peak_rss_kb()
+    finally:
+        target.close()
+        server.shutdown()
+
+    return {
+        "meta": {
+            "target": args.target,
+            "database": os.environ["DATABASE_URL"].split(":", 1)[0],
+            "users": summary["users"],
+            "goals": summary["goals"],
+            "tasks": summary["tasks"],
+            "depth": args.depth,
+            "fanout": args.fanout,
+            "iterations": args.iterations,
+            "concurrency": args.concurrency,
+            "llm_delay": args.llm_delay,
+            "python": platform.python_version(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "peak_rss_kb": peak_rss_kb,
+        },
+        "scenarios": scenarios,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the API benchmark suite.")
+    add_arguments(parser)
+    parser.add_argument("--target", choices=("client", "gunicorn"), default="client")
+    parser.add_argument("--workers", type=int, default=1, help="gunicorn workers")
+    parser.add_argument("--iterations", type=int, default=50, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--scenarios", help="comma-separated subset to run")
+    parser.add_argument("--llm-delay", type=float, default=0.05, help="fake Ollama response time in seconds")
+    parser.add_argument("--output", help="write the JSON results here instead of stdout")
+    parser.add_argument("--baseline", help="compare against this results file and fail on regressions")
+    parser.add_argument("--save-baseline", help="also write the results to this baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed relative slowdown")
+    parser.add_argument("--min-ms", type=float, default=2.0, help="ignore slowdowns smaller than this")
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            f.write(output + "\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance, args.min_ms)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 1 if any(s["errors"] for s in results["scenarios"].values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,10 +12,101 @@ class Config:
 
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # GET/HEAD requests read from this database when set (see services/database.py)
+    DATABASE_REPLICA_URL = os.environ.get("DATABASE_REPLICA_URL")
+    # connection pool for Postgres and other server databases
+    DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "1") in ("1", "true", "True")
+    # SQLite pragmas set on every connection; write requests start with BEGIN IMMEDIATE
+    SQLITE_JOURNAL_MODE = os.environ.get("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "10000"))
+    SQLITE_MMAP_SIZE = int(os.environ.get("SQLITE_MMAP_SIZE", str(256 * 2**20)))
+    SQLITE_BEGIN_IMMEDIATE = os.environ.get("SQLITE_BEGIN_IMMEDIATE", "1") in ("1", "true", "True")
+
     SECRET_KEY = os.environ.get("SECRET_KEY", 'dev-secret-key')
 
     DEBUG = os.environ.get("FLASK_DEBUG", "0") in ("1", "true", "True")
+    LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+    # auto, orjson or stdlib; auto picks orjson when it is installed
+    JSON_PROVIDER = os.environ.get("JSON_PROVIDER", "auto")
+
+    # per-route histograms; /metrics and the process stats (/api/ai/cache, /api/ai/llm,
+    # /api/events/stats) are only served, to bearer METRICS_TOKEN, when the token is set
+    METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") in ("1", "true", "True")
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+    METRICS_QUERY_WARN = int(os.environ.get("METRICS_QUERY_WARN", "50"))
+    # requests sent with "X-Profile: 1" are run under cProfile, stats go to PROFILE_DIR
+    PROFILE_ENABLED = os.environ.get("PROFILE_ENABLED", "0") in ("1", "true", "True")
+    PROFILE_DIR = os.environ.get("PROFILE_DIR", str(BASEDIR / "profiles"))
 
     OLLAMA_API = os.environ.get("OLLAMA_API", "http://ollama:11434")
+    OLLAMA_TIMEOUT = float(os.environ.get("OLLAMA_TIMEOUT", "120"))
+    OLLAMA_MAX_IN_FLIGHT = int(os.environ.get("OLLAMA_MAX_IN_FLIGHT", "4"))
+    OLLAMA_QUEUE_TIMEOUT = float(os.environ.get("OLLAMA_QUEUE_TIMEOUT", "30"))
+    OLLAMA_RETRIES = int(os.environ.get("OLLAMA_RETRIES", "2"))
+    OLLAMA_RETRY_BACKOFF = float(os.environ.get("OLLAMA_RETRY_BACKOFF", "0.5"))
+    OLLAMA_BREAKER_THRESHOLD = int(os.environ.get("OLLAMA_BREAKER_THRESHOLD", "5"))
+    OLLAMA_BREAKER_RESET = float(os.environ.get("OLLAMA_BREAKER_RESET", "30"))
+    # JSON list of backends (see services/llm_router.py); unset uses OLLAMA_API for everything
+    OLLAMA_BACKENDS = os.environ.get("OLLAMA_BACKENDS")
+    OLLAMA_HEALTH_INTERVAL = float(os.environ.get("OLLAMA_HEALTH_INTERVAL", "15"))
+
+    AI_JOB_WORKERS = int(os.environ.get("AI_JOB_WORKERS", "4"))
+    AI_JOB_MAX_PENDING = int(os.environ.get("AI_JOB_MAX_PENDING", "32"))
+    AI_JOB_TTL = int(os.environ.get("AI_JOB_TTL", "600"))
+    AI_JOB_MAX_WAIT = int(os.environ.get("AI_JOB_MAX_WAIT", "30"))
+    # deepest ?depth= accepted by generate-plan (levels of subtasks generated in one job)
+    AI_PLAN_MAX_DEPTH = int(os.environ.get("AI_PLAN_MAX_DEPTH", "3"))
+
+    # identical in-flight prompts share one call; distinct ones arriving within
+    # the window are sent together as one list-prompt request (size 1 disables batching)
+    AI_COALESCE = os.environ.get("AI_COALESCE", "1") in ("1", "true", "True")
+    AI_BATCH_SIZE = int(os.environ.get("AI_BATCH_SIZE", "8"))
+    AI_BATCH_WINDOW_MS = int(os.environ.get("AI_BATCH_WINDOW_MS", "20"))
+
+    # set PLAN_CACHE_SIZE=0 to disable; PLAN_CACHE_PATH adds a SQLite tier that survives restarts
+    PLAN_CACHE_SIZE = int(os.environ.get("PLAN_CACHE_SIZE", "1024"))
+    PLAN_CACHE_TTL = int(os.environ.get("PLAN_CACHE_TTL", str(24 * 3600)))
+    PLAN_CACHE_PATH = os.environ.get("PLAN_CACHE_PATH")
+
+    # passed to werkzeug's generate_password_hash; older hashes are upgraded on login
+    PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "scrypt")
+    PASSWORD_SALT_LENGTH = int(os.environ.get("PASSWORD_SALT_LENGTH", "16"))
+    # hash in a process pool of this size (0 hashes in the request thread);
+    # more waiting hashes than PASSWORD_HASH_MAX_PENDING get a 503 (0 means 4 per worker)
+    PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get("PASSWORD_HASH_MAX_PENDING", "0"))
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get("PASSWORD_HASH_TIMEOUT", "10"))
+
+    # seconds the signed-in user and their goal ids are cached per process (0 disables)
+    AUTH_CACHE_TTL = float(os.environ.get("AUTH_CACHE_TTL", "30"))
+
+    # change events pushed on /api/events (see services/changefeed.py): "memory" reaches
+    # subscribers in the same process only, a redis:// URL reaches every worker
+    CHANGEFEED_BACKEND = os.environ.get("CHANGEFEED_BACKEND", "memory")
+    CHANGEFEED_HISTORY = int(os.environ.get("CHANGEFEED_HISTORY", "1000"))
+    CHANGEFEED_HEARTBEAT = float(os.environ.get("CHANGEFEED_HEARTBEAT", "15"))
+    # each open stream holds a worker thread; streams end after this and clients reconnect
+    CHANGEFEED_STREAM_TIMEOUT = float(os.environ.get("CHANGEFEED_STREAM_TIMEOUT", "300"))
+    # open streams per process, past it /api/events answers 503; keep it well under gunicorn's --threads
+    CHANGEFEED_MAX_STREAMS = int(os.environ.get("CHANGEFEED_MAX_STREAMS", "16"))
+
+    # serialized goal/task read bodies kept in memory, keyed by version
+    RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", "256"))
+
+    # sibling rank keys longer than this get respaced in the background
+    RANK_MAX_LENGTH = int(os.environ.get("RANK_MAX_LENGTH", "16"))
+
+    # goals with at least this many tasks are hidden at once and purged in the background (0 disables)
+    GOAL_SOFT_DELETE_THRESHOLD = int(os.environ.get("GOAL_SOFT_DELETE_THRESHOLD", "5000"))
+
+    # built frontend served in front of Flask (see services/static_files.py); files up to
+    # STATIC_MEMORY_MAX bytes are held in memory
+    STATIC_FOLDER = os.environ.get("STATIC_FOLDER", str(BASEDIR.parent / "frontend" / "build"))
+    STATIC_MEMORY_MAX = int(os.environ.get("STATIC_MEMORY_MAX", str(2**20)))
 
     CORS_ORIGINS = os.environ.get("CORS_ORIGINS", "http://bigwetstudios.com").split(",")
\ No newline at end of file
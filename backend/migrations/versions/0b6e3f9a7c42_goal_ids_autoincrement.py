@@ -0,0 +1,32 @@
+"""never reuse goal ids on SQLite
+
+Revision ID: 0b6e3f9a7c42
+Revises: e2b7c4d9a613
+Create Date: 2026-10-18 21:10:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0b6e3f9a7c42'
+down_revision = 'e2b7c4d9a613'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Postgres sequences never hand out an id twice; SQLite needs AUTOINCREMENT for that
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    with op.batch_alter_table('goal', schema=None, recreate='always',
+                              table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+        pass
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    with op.batch_alter_table('goal', schema=None, recreate='always',
+                              table_kwargs={'sqlite_autoincrement': False}) as batch_op:
+        pass
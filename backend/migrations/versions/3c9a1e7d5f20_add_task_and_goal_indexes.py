@@ -0,0 +1,34 @@
+"""add task and goal indexes
+
+Revision ID: 3c9a1e7d5f20
+Revises: b4ef1b082264
+Create Date: 2026-10-18 17:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c9a1e7d5f20'
+down_revision = 'b4ef1b082264'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('goal', schema=None) as batch_op:
+        batch_op.create_index('ix_goal_user_id_created_at', ['user_id', 'created_at'], unique=False)
+
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.create_index('ix_task_goal_id_parent_id_order_idx', ['goal_id', 'parent_id', 'order_idx'], unique=False)
+        batch_op.create_index(batch_op.f('ix_task_parent_id'), ['parent_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_task_parent_id'))
+        batch_op.drop_index('ix_task_goal_id_parent_id_order_idx')
+
+    with op.batch_alter_table('goal', schema=None) as batch_op:
+        batch_op.drop_index('ix_goal_user_id_created_at')
@@ -0,0 +1,91 @@
+"""add full-text search index
+
+Revision ID: 5d1c9b7e3a86
+Revises: f4a8d2c61b95
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '5d1c9b7e3a86'
+down_revision = 'f4a8d2c61b95'
+branch_labels = None
+depends_on = None
+
+# a copy of services/search.py at this revision; rowids are user_id * 2**33 + 2 * id (+ 1 for goals)
+SQLITE_UPGRADE = [
+    """CREATE VIRTUAL TABLE search_index USING fts5(
+        title, body, goal_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    )""",
+    """CREATE TRIGGER task_search_insert AFTER INSERT ON task BEGIN
+        INSERT INTO search_index (rowid, title, body, goal_id)
+        SELECT goal.user_id * 8589934592 + 2 * new.id, new.title, coalesce(new.description, ''), new.goal_id
+        FROM goal WHERE goal.id = new.goal_id;
+    END""",
+    """CREATE TRIGGER task_search_update AFTER UPDATE OF title, description, goal_id ON task BEGIN
+        DELETE FROM search_index
+        WHERE rowid = (SELECT goal.user_id * 8589934592 + 2 * old.id FROM goal WHERE goal.id = old.goal_id);
+        INSERT INTO search_index (rowid, title, body, goal_id)
+        SELECT goal.user_id * 8589934592 + 2 * new.id, new.title, coalesce(new.description, ''), new.goal_id
+        FROM goal WHERE goal.id = new.goal_id;
+    END""",
+    """CREATE TRIGGER task_search_delete AFTER DELETE ON task BEGIN
+        DELETE FROM search_index
+        WHERE rowid = (SELECT goal.user_id * 8589934592 + 2 * old.id FROM goal WHERE goal.id = old.goal_id);
+    END""",
+    """CREATE TRIGGER goal_search_insert AFTER INSERT ON goal BEGIN
+        INSERT INTO search_index (rowid, title, body, goal_id)
+        VALUES (new.user_id * 8589934592 + 2 * new.id + 1, new.title, '', new.id);
+    END""",
+    """CREATE TRIGGER goal_search_update AFTER UPDATE OF title ON goal BEGIN
+        UPDATE search_index SET title = new.title WHERE rowid = new.user_id * 8589934592 + 2 * new.id + 1;
+    END""",
+    """CREATE TRIGGER goal_search_delete AFTER DELETE ON goal BEGIN
+        DELETE FROM search_index WHERE rowid = old.user_id * 8589934592 + 2 * old.id + 1;
+    END""",
+    """INSERT INTO search_index (rowid, title, body, goal_id)
+       SELECT user_id * 8589934592 + 2 * id + 1, title, '', id FROM goal""",
+    """INSERT INTO search_index (rowid, title, body, goal_id)
+       SELECT goal.user_id * 8589934592 + 2 * task.id, task.title, coalesce(task.description, ''), task.goal_id
+       FROM task JOIN goal ON goal.id = task.goal_id
+       ORDER BY 1""",
+]
+
+SQLITE_DOWNGRADE = [
+    'DROP TRIGGER IF EXISTS goal_search_delete',
+    'DROP TRIGGER IF EXISTS goal_search_update',
+    'DROP TRIGGER IF EXISTS goal_search_insert',
+    'DROP TRIGGER IF EXISTS task_search_delete',
+    'DROP TRIGGER IF EXISTS task_search_update',
+    'DROP TRIGGER IF EXISTS task_search_insert',
+    'DROP TABLE IF EXISTS search_index',
+]
+
+TASK_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'B')"
+)
+GOAL_VECTOR = "setweight(to_tsvector('simple', coalesce(title, '')), 'A')"
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for statement in SQLITE_UPGRADE:
+            op.execute(statement)
+    elif dialect == 'postgresql':
+        op.execute(f"CREATE INDEX ix_task_search ON task USING gin (({TASK_VECTOR}))")
+        op.execute(f"CREATE INDEX ix_goal_search ON goal USING gin (({GOAL_VECTOR}))")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for statement in SQLITE_DOWNGRADE:
+            op.execute(statement)
+    elif dialect == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_goal_search')
+        op.execute('DROP INDEX IF EXISTS ix_task_search')
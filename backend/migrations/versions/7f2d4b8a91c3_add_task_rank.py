@@ -0,0 +1,65 @@
+"""add task rank
+
+Revision ID: 7f2d4b8a91c3
+Revises: 3c9a1e7d5f20
+Create Date: 2026-10-18 17:30:00.000000
+
+"""
+from itertools import groupby
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7f2d4b8a91c3'
+down_revision = '3c9a1e7d5f20'
+branch_labels = None
+depends_on = None
+
+DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+def spaced_ranks(count):
+    # frozen copy of services.ordering.spaced_ranks
+    width = 1
+    while 36 ** width < (count + 1) * 36:
+        width += 1
+    step = 36 ** width // (count + 1)
+    ranks = []
+    for i in range(count):
+        value, chars = step * (i + 1), []
+        for _ in range(width):
+            value, digit = divmod(value, 36)
+            chars.append(DIGITS[digit])
+        ranks.append("".join(reversed(chars)).rstrip("0"))
+    return ranks
+
+
+def upgrade():
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('rank', sa.String(length=255), nullable=True))
+
+    # carry the existing integer order forward into rank keys, per sibling group
+    conn = op.get_bind()
+    rows = conn.execute(sa.text(
+        "SELECT id, goal_id, parent_id FROM task "
+        "ORDER BY goal_id, parent_id, order_idx, id"
+    )).all()
+    updates = []
+    for _, group in groupby(rows, key=lambda row: (row.goal_id, row.parent_id)):
+        ids = [row.id for row in group]
+        updates.extend({"id": task_id, "rank": rank} for task_id, rank in zip(ids, spaced_ranks(len(ids))))
+    if updates:
+        conn.execute(sa.text("UPDATE task SET rank = :rank WHERE id = :id"), updates)
+
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.drop_index('ix_task_goal_id_parent_id_order_idx')
+        batch_op.create_index('ix_task_goal_id_parent_id_rank', ['goal_id', 'parent_id', 'rank'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.drop_index('ix_task_goal_id_parent_id_rank')
+        batch_op.create_index('ix_task_goal_id_parent_id_order_idx', ['goal_id', 'parent_id', 'order_idx'], unique=False)
+        batch_op.drop_column('rank')
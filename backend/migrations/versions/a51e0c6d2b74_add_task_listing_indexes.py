@@ -0,0 +1,28 @@
+"""add task listing indexes
+
+Revision ID: a51e0c6d2b74
+Revises: 7f2d4b8a91c3
+Create Date: 2026-10-18 17:50:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a51e0c6d2b74'
+down_revision = '7f2d4b8a91c3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.create_index('ix_task_goal_id_rank', ['goal_id', 'rank'], unique=False)
+        batch_op.create_index('ix_task_goal_id_created_at', ['goal_id', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.drop_index('ix_task_goal_id_created_at')
+        batch_op.drop_index('ix_task_goal_id_rank')
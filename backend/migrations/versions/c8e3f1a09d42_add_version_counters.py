@@ -0,0 +1,32 @@
+"""add version counters
+
+Revision ID: c8e3f1a09d42
+Revises: a51e0c6d2b74
+Create Date: 2026-10-18 18:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c8e3f1a09d42'
+down_revision = 'a51e0c6d2b74'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('goal', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('goals_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('goals_version')
+
+    with op.batch_alter_table('goal', schema=None) as batch_op:
+        batch_op.drop_column('version')
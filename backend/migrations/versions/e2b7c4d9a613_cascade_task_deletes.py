@@ -0,0 +1,49 @@
+"""cascade task deletes and soft-deleted goals
+
+Revision ID: e2b7c4d9a613
+Revises: c8e3f1a09d42
+Create Date: 2026-10-18 19:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b7c4d9a613'
+down_revision = 'c8e3f1a09d42'
+branch_labels = None
+depends_on = None
+
+# names the unnamed SQLite foreign keys from the initial migration so batch mode can drop them
+naming_convention = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+
+
+def old_fk_names():
+    if op.get_bind().dialect.name == 'sqlite':
+        return 'fk_task_goal_id_goal', 'fk_task_parent_id_task'
+    return 'task_goal_id_fkey', 'task_parent_id_fkey'
+
+
+def upgrade():
+    with op.batch_alter_table('goal', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('deleted_at', sa.DateTime(), nullable=True))
+
+    goal_fk, parent_fk = old_fk_names()
+    with op.batch_alter_table('task', schema=None, naming_convention=naming_convention) as batch_op:
+        batch_op.drop_constraint(goal_fk, type_='foreignkey')
+        batch_op.drop_constraint(parent_fk, type_='foreignkey')
+        batch_op.create_foreign_key('fk_task_goal_id_goal', 'goal', ['goal_id'], ['id'], ondelete='CASCADE')
+        batch_op.create_foreign_key('fk_task_parent_id_task', 'task', ['parent_id'], ['id'], ondelete='CASCADE')
+
+
+def downgrade():
+    goal_fk, parent_fk = old_fk_names()
+    with op.batch_alter_table('task', schema=None, naming_convention=naming_convention) as batch_op:
+        batch_op.drop_constraint('fk_task_parent_id_task', type_='foreignkey')
+        batch_op.drop_constraint('fk_task_goal_id_goal', type_='foreignkey')
+        batch_op.create_foreign_key(parent_fk, 'task', ['parent_id'], ['id'])
+        batch_op.create_foreign_key(goal_fk, 'goal', ['goal_id'], ['id'])
+
+    with op.batch_alter_table('goal', schema=None) as batch_op:
+        batch_op.drop_column('deleted_at')
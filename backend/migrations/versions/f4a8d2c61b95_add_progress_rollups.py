@@ -0,0 +1,67 @@
+"""add goal and task progress rollups
+
+Revision ID: f4a8d2c61b95
+Revises: 0b6e3f9a7c42
+Create Date: 2026-10-18 20:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4a8d2c61b95'
+down_revision = '0b6e3f9a7c42'
+branch_labels = None
+depends_on = None
+
+COUNTS = ('total_count', 'done_count', 'archived_count')
+
+GOAL_BACKFILL = """
+UPDATE goal SET
+    total_count = (SELECT count(*) FROM task WHERE task.goal_id = goal.id),
+    done_count = (SELECT count(*) FROM task WHERE task.goal_id = goal.id AND task.status = 'done'),
+    archived_count = (SELECT count(*) FROM task WHERE task.goal_id = goal.id AND task.status = 'archived')
+"""
+
+TASK_COUNTS = """
+WITH RECURSIVE closure(ancestor, descendant) AS (
+    SELECT parent_id, id FROM task WHERE parent_id IS NOT NULL
+    UNION ALL
+    SELECT parent.parent_id, closure.descendant
+    FROM task AS parent JOIN closure ON parent.id = closure.ancestor
+    WHERE parent.parent_id IS NOT NULL
+)
+SELECT closure.ancestor,
+       count(*),
+       sum(CASE WHEN d.status = 'done' THEN 1 ELSE 0 END),
+       sum(CASE WHEN d.status = 'archived' THEN 1 ELSE 0 END)
+FROM closure JOIN task AS d ON d.id = closure.descendant
+GROUP BY closure.ancestor
+"""
+
+
+def upgrade():
+    for table in ('goal', 'task'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for name in COUNTS:
+                batch_op.add_column(sa.Column(name, sa.Integer(), server_default='0', nullable=False))
+
+    bind = op.get_bind()
+    bind.execute(sa.text(GOAL_BACKFILL))
+    rows = [
+        {'id': task_id, 'total': int(total), 'done': int(done), 'archived': int(archived)}
+        for task_id, total, done, archived in bind.execute(sa.text(TASK_COUNTS))
+    ]
+    if rows:
+        bind.execute(
+            sa.text('UPDATE task SET total_count = :total, done_count = :done, archived_count = :archived WHERE id = :id'),
+            rows,
+        )
+
+
+def downgrade():
+    for table in ('task', 'goal'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for name in reversed(COUNTS):
+                batch_op.drop_column(name)
@@ -1,61 +1,107 @@
+import random
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_sqlalchemy import SQLAlchemy
 
-db = SQLAlchemy()
+from services.database import RoutingSession
+from services.passwords import password_hasher
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+
+def initial_version():
+    # random start so a reused id never repeats an ETag handed out for a deleted row
+    return random.randrange(1 << 30)
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     password_hash = db.Column(db.String(200), nullable=False)
+    goals_version = db.Column(db.Integer, nullable=False, default=initial_version, server_default='0')
 
     goals = db.relationship("Goal", backref="user", lazy=True)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        return password_hasher.needs_rehash(self.password_hash)
 
 
 class Goal(db.Model):
     __tablename__ = 'goal'
+    __table_args__ = (
+        db.Index('ix_goal_user_id_created_at', 'user_id', 'created_at'),
+        # never reuse the id of a deleted goal: other processes may still cache it as owned by its old user
+        {'sqlite_autoincrement': True},
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id', name='fk_goal_user_id'), nullable=False)
     created_at = db.Column(db.DateTime, default=db.func.now())
+    version = db.Column(db.Integer, nullable=False, default=initial_version, server_default='0') # bumped on every task change
+    deleted_at = db.Column(db.DateTime, nullable=True) # soft-deleted, waiting for the background purge
+    # progress over all tasks of the goal, see services/rollups.py
+    total_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    done_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    archived_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
-    tasks = db.relationship('Task', back_populates='goal', lazy=True, cascade="all, delete-orphan")
+    tasks = db.relationship('Task', back_populates='goal', lazy=True, cascade="all, delete-orphan", passive_deletes=True)
+
+    @classmethod
+    def get_active_or_404(cls, goal_id):
+        return cls.query.filter_by(id=goal_id, deleted_at=None).first_or_404()
 
     def to_dict(self):
         return {
             "id": self.id,
             "title": self.title,
             "created_at": self.created_at.isoformat(),
+            "total_count": self.total_count,
+            "done_count": self.done_count,
+            "archived_count": self.archived_count,
         }
 
 class Task(db.Model):
     __tablename__ = 'task'
+    __table_args__ = (
+        db.Index('ix_task_goal_id_parent_id_rank', 'goal_id', 'parent_id', 'rank'),
+        db.Index('ix_task_goal_id_rank', 'goal_id', 'rank'),
+        db.Index('ix_task_goal_id_created_at', 'goal_id', 'created_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
     description = db.Column(db.Text, nullable=True)
-    goal_id = db.Column(db.Integer, db.ForeignKey('goal.id'), nullable=False)
-    parent_id = db.Column(db.Integer, db.ForeignKey('task.id'), nullable=True)
+    goal_id = db.Column(db.Integer, db.ForeignKey('goal.id', name='fk_task_goal_id_goal', ondelete='CASCADE'), nullable=False)
+    parent_id = db.Column(db.Integer, db.ForeignKey('task.id', name='fk_task_parent_id_task', ondelete='CASCADE'), nullable=True, index=True)
 
     created_at = db.Column(db.DateTime, default=db.func.now())
-    order_idx = db.Column(db.Integer)
+    order_idx = db.Column(db.Integer) # legacy position, ordering uses rank
+    rank = db.Column(db.String(255)) # fractional sort key, see services/ordering.py
     status = db.Column(db.String(20), default='active') # active, done, archived
+    # progress over the task's descendants, see services/rollups.py
+    total_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    done_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    archived_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     goal = db.relationship("Goal", back_populates="tasks")
     parent = db.relationship(
         'Task', remote_side=[id], 
         backref=db.backref('subtasks', 
         cascade="all, delete-orphan", 
-        single_parent=True)
+        single_parent=True,
+        passive_deletes=True)
     )
 
+    @classmethod
+    def get_active_or_404(cls, task_id):
+        """The task, unless it is missing or its goal is soft-deleted."""
+        return (cls.query.join(Goal, Goal.id == cls.goal_id)
+                .filter(cls.id == task_id, Goal.deleted_at.is_(None)).first_or_404())
+
     def to_dict(self, recursive=True):
         base = {
             "id": self.id,
@@ -65,7 +111,11 @@ class Task(db.Model):
             "parent_id": self.parent_id,
             "created_at": self.created_at.isoformat(),
             "order_idx": self.order_idx,
+            "rank": self.rank,
             "status": self.status,
+            "total_count": self.total_count,
+            "done_count": self.done_count,
+            "archived_count": self.archived_count,
         }
 
         if recursive:
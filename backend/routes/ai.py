@@ -1,16 +1,40 @@
-from flask import Blueprint, jsonify
+import json
+from flask import Blueprint, Response, jsonify, request, session, stream_with_context
 from models import Goal, Task, db
-from utils.decorators import login_required
-from services.ai_service import generate_plan_from_ai
+from utils.decorators import login_required, metrics_token_required
+from services.ai_service import generate_plan_from_ai, plan_coalescer, plan_role, stream_plan
+from services.auth_cache import require_goal
+from services.changefeed import change, change_feed
+from services.llm_router import llm_router
+from services.ordering import last_rank, rank_after, rebalancer
+from services.plan_cache import plan_cache
+from services.plan_insert import insert_plan, insert_rows, plan_size, task_row
+from services.rollups import add_counts, status_counts
+from services.plan_jobs import plan_jobs, QueueFullError
+from services.versioning import bump_goal
 from flask import current_app as app
 
 bp = Blueprint("ai", __name__)
 
-@bp.route("/api/goals/<int:goal_id>/generate-plan", methods=["POST"])
-@login_required
-def generate_plan_for_goal(goal_id):
-    goal = Goal.query.get_or_404(goal_id)
-    prompt = f"""
+
+def save_generated_plan(prompt, goal_id, parent_id, use_cache=True, depth=1, goal_title="", user_id=None):
+    """Run the AI calls and bulk insert the plan. Executed on a plan job worker."""
+    plan = generate_plan_from_ai(
+        prompt, parent_id=parent_id, use_cache=use_cache, depth=depth,
+        subtask_prompt=lambda t: subtask_prompt(goal_title, t["title"], t["description"]),
+    )
+    tasks = insert_plan(goal_id, parent_id, plan)
+    add_counts([(goal_id, parent_id, status_counts("active", plan_size(plan)))])
+    bump_goal(goal_id)
+    db.session.commit()
+    rebalancer.check(goal_id, parent_id, *(t["rank"] for t in tasks))
+    if user_id is not None:
+        change_feed.publish(user_id, *(change("task.created", goal_id=goal_id, task=t) for t in tasks))
+    return tasks
+
+
+def goal_plan_prompt(goal):
+    return f"""
     Generate a concise project plan for the following goal as valid JSON.
     Only output JSON. No explanations, and no comments.
 
@@ -20,38 +44,144 @@ def generate_plan_for_goal(goal_id):
     - title
     - description
     """
-    try:
-        tasks = generate_plan_from_ai(prompt, goal_id, parent_id=None, ollama_api_url=app.config['OLLAMA_API'])
-        for t in tasks:
-            db.session.add(t)
-        db.session.commit()
-        return jsonify([t.to_dict() for t in tasks]), 200
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
 
 
-@bp.route("/api/tasks/<int:task_id>/generate-plan", methods=["POST"])
-@login_required
-def generate_plan_for_task(task_id):
-    task = Task.query.get_or_404(task_id)
-    goal = Goal.query.get_or_404(task.goal_id)
-    prompt = f"""
+def task_plan_prompt(goal, task):
+    return subtask_prompt(goal.title, task.title, task.description)
+
+
+def subtask_prompt(goal_title, title, description):
+    return f"""
     Generate a concise list of subtasks for this task as valid JSON.
     Only output JSON. No explanations, and no comments.
 
-    Goal: "{goal.title}"
-    Task: "{task.title}"
-    Description: "{task.description or ''}"
+    Goal: "{goal_title}"
+    Task: "{title}"
+    Description: "{description or ''}"
 
     Each subtask must have:
     - title
     - description
     """
+
+
+def use_plan_cache():
+    # ?refresh=1 skips the plan cache lookup and asks the model again
+    return request.args.get("refresh", "0") not in ("1", "true", "True")
+
+
+def format_sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def plan_depth():
+    # ?depth=N also generates N-1 levels of subtasks below each new task
+    return max(1, min(request.args.get("depth", 1, type=int), app.config["AI_PLAN_MAX_DEPTH"]))
+
+
+def enqueue_plan(prompt, goal, parent_id):
+    use_cache = use_plan_cache()
     try:
-        subtasks = generate_plan_from_ai(prompt, goal_id=task.goal_id, parent_id=task.id, ollama_api_url=app.config['OLLAMA_API'])
-        for t in subtasks:
-            db.session.add(t)
-        db.session.commit()
-        return jsonify([t.to_dict() for t in subtasks]), 200
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        job = plan_jobs.submit(
+            session["user_id"], save_generated_plan,
+            prompt, goal.id, parent_id, use_cache, plan_depth(), goal.title, session["user_id"],
+        )
+    except QueueFullError as e:
+        return jsonify({"error": str(e)}), 503
+    return jsonify(job.to_dict()), 202
+
+
+@bp.route("/api/goals/<int:goal_id>/generate-plan", methods=["POST"])
+@login_required
+def generate_plan_for_goal(goal_id):
+    require_goal(goal_id)
+    goal = Goal.get_active_or_404(goal_id)
+    return enqueue_plan(goal_plan_prompt(goal), goal, parent_id=None)
+
+
+@bp.route("/api/tasks/<int:task_id>/generate-plan", methods=["POST"])
+@login_required
+def generate_plan_for_task(task_id):
+    task = Task.query.get_or_404(task_id)
+    require_goal(task.goal_id)
+    goal = Goal.get_active_or_404(task.goal_id)
+    return enqueue_plan(task_plan_prompt(goal, task), goal, parent_id=task.id)
+
+
+def stream_plan_events(prompt, goal_id, parent_id):
+    """Save and emit each task as a Server-Sent Event as soon as the model finishes it."""
+    use_cache = use_plan_cache()
+    role = plan_role(parent_id)
+    user_id = session["user_id"]
+    # the model can take minutes: hold no transaction (or SQLite lock) while it writes
+    db.session.close()
+
+    def events():
+        count = 0
+        rank = None
+        try:
+            for t in stream_plan(prompt, role, use_cache=use_cache):
+                # one short transaction per task, ranked after whatever the siblings are by now
+                rank = rank_after(last_rank(goal_id, parent_id))
+                task = insert_rows([task_row(t, goal_id, parent_id, count, rank)])[0]
+                add_counts([(goal_id, parent_id, status_counts("active"))])
+                bump_goal(goal_id)
+                db.session.commit()
+                count += 1
+                change_feed.publish(user_id, change("task.created", goal_id=goal_id, task=task))
+                yield format_sse("task", task)
+            rebalancer.check(goal_id, parent_id, rank)
+            yield format_sse("done", {"count": count})
+        except Exception as e:
+            db.session.rollback()
+            yield format_sse("error", {"error": str(e)})
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@bp.route("/api/goals/<int:goal_id>/generate-plan/stream", methods=["POST"])
+@login_required
+def stream_plan_for_goal(goal_id):
+    require_goal(goal_id)
+    goal = Goal.get_active_or_404(goal_id)
+    return stream_plan_events(goal_plan_prompt(goal), goal_id, parent_id=None)
+
+
+@bp.route("/api/tasks/<int:task_id>/generate-plan/stream", methods=["POST"])
+@login_required
+def stream_plan_for_task(task_id):
+    task = Task.query.get_or_404(task_id)
+    require_goal(task.goal_id)
+    goal = Goal.get_active_or_404(task.goal_id)
+    return stream_plan_events(task_plan_prompt(goal, task), task.goal_id, parent_id=task.id)
+
+
+@bp.route("/api/ai/jobs/<job_id>", methods=["GET"])
+@login_required
+def get_plan_job(job_id):
+    job = plan_jobs.get(job_id)
+    if job is None or job.user_id != session["user_id"]:
+        return jsonify({"error": "Job not found"}), 404
+
+    # long-poll: ?wait=<seconds> blocks until the job finishes or the wait expires
+    wait = min(request.args.get("wait", 0, type=float), app.config['AI_JOB_MAX_WAIT'])
+    if wait > 0:
+        job.wait(wait)
+
+    return jsonify(job.to_dict()), 200
+
+
+@bp.route("/api/ai/cache", methods=["GET"])
+@metrics_token_required
+def get_plan_cache_stats():
+    return jsonify(plan_cache.stats()), 200
+
+
+@bp.route("/api/ai/llm", methods=["GET"])
+@metrics_token_required
+def get_llm_stats():
+    return jsonify({"backends": llm_router.stats(), "coalescer": plan_coalescer.stats()}), 200
@@ -1,5 +1,7 @@
 from flask import Blueprint, request, jsonify, session
+from sqlalchemy.exc import IntegrityError
 from models import db, User
+from services.passwords import HasherBusyError
 from utils.decorators import login_required
 
 bp = Blueprint("auth", __name__)
@@ -12,11 +14,21 @@ def signup():
 
     if User.query.filter_by(username=username).first():
         return jsonify({"error": "Username already exists"}), 400
+    # hashing takes a while: hold no transaction (or SQLite write lock) meanwhile
+    db.session.close()
 
     user = User(username=username)
-    user.set_password(password)
+    try:
+        user.set_password(password)
+    except HasherBusyError as e:
+        return jsonify({"error": str(e)}), 503
     db.session.add(user)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # taken by a signup that committed while this one was hashing
+        db.session.rollback()
+        return jsonify({"error": "Username already exists"}), 400
 
     session["user_id"] = user.id
     return jsonify({"message": "Signup successful"})
@@ -28,10 +40,21 @@ def login():
     password = data.get("password")
 
     user = User.query.filter_by(username=username).first()
-    if user and user.check_password(password):
-        session["user_id"] = user.id
-        return jsonify({"message": "Login successful"})
-    return jsonify({"error": "Invalid username or password"}), 401
+    # verifying takes a while: hold no transaction (or SQLite write lock) meanwhile
+    db.session.close()
+    try:
+        if not (user and user.check_password(password)):
+            return jsonify({"error": "Invalid username or password"}), 401
+        if user.password_needs_rehash():
+            # hash parameters changed since this password was stored
+            user.set_password(password)
+            db.session.add(user)
+            db.session.commit()
+    except HasherBusyError as e:
+        return jsonify({"error": str(e)}), 503
+
+    session["user_id"] = user.id
+    return jsonify({"message": "Login successful"})
 
 @bp.route("/api/logout", methods=["POST"])
 def logout():
@@ -0,0 +1,38 @@
+from flask import Blueprint, Response, jsonify, request, session
+from models import db
+from services.changefeed import change_feed
+from utils.decorators import login_required, metrics_token_required
+
+bp = Blueprint("events", __name__)
+
+BUSY_RETRY = 30  # seconds a subscriber turned away waits before trying again
+
+
+@bp.route("/api/events", methods=["GET"])
+@login_required
+def stream_changes():
+    # EventSource sends Last-Event-ID when it reconnects; ?last_event_id= resumes a fresh one
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    if not change_feed.acquire_stream():
+        return Response(
+            f"retry: {BUSY_RETRY * 1000}\n\n",
+            status=503,
+            mimetype="text/event-stream",
+            headers={"Retry-After": str(BUSY_RETRY), "Cache-Control": "no-cache"},
+        )
+    # the stream can stay open for minutes: hold no database connection (or SQLite snapshot) meanwhile
+    db.session.close()
+    response = Response(
+        change_feed.stream(session["user_id"], last_event_id),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    # on close, not in the generator: a stream dropped before its first chunk never runs the generator
+    response.call_on_close(change_feed.release_stream)
+    return response
+
+
+@bp.route("/api/events/stats", methods=["GET"])
+@metrics_token_required
+def get_stream_stats():
+    return jsonify(change_feed.stats()), 200
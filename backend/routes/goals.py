@@ -1,14 +1,33 @@
 from utils.decorators import login_required
-from flask import Blueprint, request, session, jsonify
-from models import db, Goal
+from datetime import datetime, timezone
+
+from flask import Blueprint, Response, request, session, jsonify, stream_with_context
+from models import db, Goal, User
+from services.auth_cache import require_goal, user_cache
+from services.changefeed import change, change_feed
+from services.deletion import count_goal_tasks, delete_goal_tree, goal_purger
+from services.serialization import goal_rows
+from services.transfer import export_lines, import_goals, read_lines
+from services.pagination import keyset_page, GOAL_FIELDS, GOAL_SORTS
+from services.versioning import bump_user_goals, conditional_json
 
 bp = Blueprint("goals", __name__)
 
 @bp.route("/api/goals", methods=["GET"])
 @login_required
 def list_goals():
-    goals = Goal.query.filter_by(user_id=session["user_id"]).all()
-    return jsonify([goal.to_dict() for goal in goals]), 200
+    user = db.get_or_404(User, session["user_id"])
+    return conditional_json("goals", user.id, user.goals_version, goal_listing)
+
+def goal_listing():
+    if any(p in request.args for p in ("limit", "cursor", "sort", "fields")):
+        try:
+            page = keyset_page(GOAL_FIELDS, GOAL_SORTS, [Goal.user_id == session["user_id"], Goal.deleted_at.is_(None)], request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify(page), 200
+
+    return jsonify(goal_rows(session["user_id"])), 200
 
 @bp.route("/api/goals", methods=["POST"])
 @login_required
@@ -19,28 +38,73 @@ def create_goal():
         return jsonify({"error": "Missing goal title"}), 400
     new_goal = Goal(title=goal_title, user_id=session["user_id"])
     db.session.add(new_goal)
+    bump_user_goals(session["user_id"])
     db.session.commit()
-    return jsonify(new_goal.to_dict()), 201
+    user_cache.update_goals(session["user_id"], added=(new_goal.id,))
+    goal = new_goal.to_dict()
+    change_feed.publish(session["user_id"], change("goal.created", goal=goal))
+    return jsonify(goal), 201
+
+@bp.route("/api/goals/export", methods=["GET"])
+@login_required
+def export_goals():
+    return Response(
+        stream_with_context(export_lines(session["user_id"])),
+        mimetype="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="goals.ndjson"'},
+    )
+
+@bp.route("/api/goals/import", methods=["POST"])
+@login_required
+def import_goals_ndjson():
+    # NDJSON as written by /api/goals/export; parsed as it is read, never held whole.
+    # The upload can be slow: hold no transaction (or SQLite write lock) while it arrives
+    db.session.close()
+    try:
+        result = import_goals(session["user_id"], read_lines(request.stream))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(result), 201
 
 @bp.route("/api/goals/<int:goal_id>", methods=['DELETE'])
 @login_required
 def delete_goal(goal_id):
-    goal = Goal.query.get_or_404(goal_id)
-    db.session.delete(goal)
+    require_goal(goal_id)
+    goal = Goal.get_active_or_404(goal_id)
+    user_id = goal.user_id
+    if goal_purger.should_soft_delete(count_goal_tasks(goal_id)):
+        # hide it now, purge the tasks in the background
+        goal.deleted_at = datetime.now(timezone.utc)
+        bump_user_goals(user_id)
+        db.session.commit()
+        user_cache.update_goals(user_id, removed=(goal_id,))
+        goal_purger.schedule(goal_id)
+        change_feed.publish(user_id, change("goal.deleted", id=goal_id))
+        return jsonify({"message": "Goal deleted"}), 202
+
+    delete_goal_tree(goal_id)
+    bump_user_goals(user_id)
     db.session.commit()
+    user_cache.update_goals(user_id, removed=(goal_id,))
+    change_feed.publish(user_id, change("goal.deleted", id=goal_id))
     return jsonify({"message": "Goal deleted"}), 200
 
 @bp.route("/api/goals/<int:goal_id>", methods=['PUT'])
 @login_required
 def update_goal(goal_id):
-    goal = Goal.query.get_or_404(goal_id)
+    require_goal(goal_id)
+    goal = Goal.get_active_or_404(goal_id)
     
     data = request.get_json()
     new_title = data.get("title")
     if not new_title:
         return jsonify({"error": "Missing 'title' in request"}), 400
     
+    changed = goal.title != new_title
     goal.title = new_title
+    bump_user_goals(goal.user_id)
     db.session.commit()
+    if changed:
+        change_feed.publish(goal.user_id, change("goal.updated", id=goal_id, changes={"title": new_title}))
 
     return jsonify(goal.to_dict()), 200
\ No newline at end of file
@@ -0,0 +1,34 @@
+from flask import Blueprint, jsonify, request, session
+from services.pagination import decode_cursor, encode_cursor, parse_limit
+from services.search import search, search_terms
+from utils.decorators import login_required
+
+bp = Blueprint("search", __name__)
+
+SEARCH_TYPES = {"goal": ("goal",), "task": ("task",), "all": ("goal", "task")}
+DEFAULT_SEARCH_LIMIT = 20
+
+
+@bp.route("/api/search", methods=["GET"])
+@login_required
+def search_goals_and_tasks():
+    terms = search_terms(request.args.get("q", ""))
+    if not terms:
+        return jsonify({"error": "Missing search query 'q'"}), 400
+    kinds = SEARCH_TYPES.get(request.args.get("type", "all"))
+    if kinds is None:
+        return jsonify({"error": f"'type' must be one of {', '.join(SEARCH_TYPES)}"}), 400
+    try:
+        limit = parse_limit(request.args.get("limit", str(DEFAULT_SEARCH_LIMIT)))
+        # ranked results page by position; the cursor is bound to the query it came from
+        offset = 0
+        if request.args.get("cursor"):
+            offset, _ = decode_cursor(request.args["cursor"], " ".join(terms))
+            if not isinstance(offset, int) or offset < 0:
+                raise ValueError("Invalid cursor")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    items = search(session["user_id"], terms, kinds, limit=limit + 1, offset=offset)
+    next_cursor = encode_cursor(" ".join(terms), [offset + limit, None]) if len(items) > limit else None
+    return jsonify({"items": items[:limit], "next_cursor": next_cursor}), 200
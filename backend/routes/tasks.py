@@ -1,15 +1,46 @@
 from utils.decorators import login_required
 from flask import Blueprint, request, session, jsonify
 from models import db, Task, Goal
+from services.auth_cache import owns_goal, require_goal
+from services.changefeed import change, change_feed, changed_fields
+from services.deletion import delete_task_tree
+from services.pagination import keyset_page, TASK_FIELDS, TASK_SORTS
+from services.ordering import last_rank, move_task, rank_after, rebalancer
+from services.rollups import add_counts, status_change, status_counts, subtree_counts
+from services.task_batch import MOVED_FIELD_ERROR, apply_task_updates
+from services.task_tree import load_task_tree
+from services.versioning import bump_goal, conditional_json
 
 bp = Blueprint("tasks", __name__)
 
 @bp.route("/api/goals/<int:goal_id>/tasks", methods=['GET'])
 @login_required
 def get_tasks_for_goal(goal_id):
-    goal = Goal.query.get_or_404(goal_id)
-    all_tasks = Task.query.filter_by(goal_id=goal_id).all()
-    return jsonify([task.to_dict(recursive=True) for task in all_tasks])
+    require_goal(goal_id)
+    goal = Goal.get_active_or_404(goal_id)
+    return conditional_json("goal", goal_id, goal.version, lambda: task_listing(goal_id))
+
+def task_listing(goal_id):
+    # any listing parameter switches to a flat, keyset-paginated page
+    if any(p in request.args for p in ("limit", "cursor", "sort", "fields", "status", "parent_id")):
+        filters = [Task.goal_id == goal_id]
+        if "status" in request.args:
+            filters.append(Task.status == request.args["status"])
+        if "parent_id" in request.args:
+            parent_id = request.args["parent_id"]
+            if parent_id in ("", "null"):
+                filters.append(Task.parent_id.is_(None))
+            elif parent_id.isdigit():
+                filters.append(Task.parent_id == int(parent_id))
+            else:
+                return jsonify({"error": "'parent_id' must be an integer or 'null'"}), 400
+        try:
+            return jsonify(keyset_page(TASK_FIELDS, TASK_SORTS, filters, request.args))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+    flat = request.args.get("flat", "0") in ("1", "true", "True")
+    return jsonify(load_task_tree(goal_id, flat=flat))
 
 @bp.route("/api/goals/<int:goal_id>/tasks", methods=['POST'])
 @login_required
@@ -21,78 +52,148 @@ def add_task(goal_id):
 
     if not title:
         return jsonify({'error': 'Missing task title'}), 400
+    if parent_id is not None and (not isinstance(parent_id, int) or isinstance(parent_id, bool)):
+        return jsonify({'error': "'parent_id' must be an integer"}), 400
     
-    siblings = Task.query.filter_by(goal_id=goal_id, parent_id=parent_id).all()
-    max_order = max([s.order_idx for s in siblings if s.order_idx is not None], default=-1)
-    new_order_idx = max_order + 1
-    
-    goal = Goal.query.get_or_404(goal_id)
-    
+    require_goal(goal_id)
+    if parent_id is None:
+        Goal.get_active_or_404(goal_id)
+    # the parent must be in this goal: add_counts walks up its ancestors
+    elif not db.session.scalar(
+        db.select(Task.id).join(Goal, Goal.id == Task.goal_id)
+        .where(Task.id == parent_id, Task.goal_id == goal_id, Goal.deleted_at.is_(None))
+    ):
+        Goal.get_active_or_404(goal_id)
+        return jsonify({'error': 'Parent task not found in this goal'}), 400
+
+    new_rank = rank_after(last_rank(goal_id, parent_id))
+
     new_task = Task(
         title=title,
         description=description,
         goal_id=goal_id,
         parent_id=parent_id,
-        order_idx = new_order_idx
+        rank=new_rank
     )
     db.session.add(new_task)
+    add_counts([(goal_id, parent_id, status_counts("active"))])
+    bump_goal(goal_id)
     db.session.commit()
-    return jsonify(new_task.to_dict()), 201
+    rebalancer.check(goal_id, parent_id, new_rank)
+    task = new_task.to_dict()
+    change_feed.publish(session["user_id"], change("task.created", goal_id=goal_id, task=task))
+    return jsonify(task), 201
 
 @bp.route("/api/tasks/<int:task_id>", methods=['PUT'])
 @login_required
 def update_task(task_id):
-    task = Task.query.get_or_404(task_id)
+    task = Task.get_active_or_404(task_id)
+    require_goal(task.goal_id)
     
     data = request.get_json()
     if data is None:
         return jsonify({"error": "No JSON data received"}), 400
+    if "order_idx" in data:
+        return jsonify({"error": MOVED_FIELD_ERROR}), 400
     
+    before = {"title": task.title, "description": task.description, "status": task.status}
     task.title = data.get("title", task.title)
     task.description = data.get("description", task.description)
 
-    if "status" in data:
+    if "status" in data and data["status"] != task.status:
+        add_counts([(task.goal_id, task.parent_id, status_change(task.status, data["status"]))])
         task.status = data["status"]
-    if "order_idx" in data:
-        task.order_idx = data["order_idx"]
 
+    after = {"title": task.title, "description": task.description, "status": task.status}
+    bump_goal(task.goal_id)
     db.session.commit()
+    changes = changed_fields(before, after)
+    if changes:
+        change_feed.publish(session["user_id"], change("task.updated", goal_id=task.goal_id, id=task.id, changes=changes))
     return jsonify(task.to_dict()), 200
 
+@bp.route("/api/tasks/<int:task_id>/move", methods=["POST"])
+@login_required
+def move_task_route(task_id):
+    task = Task.get_active_or_404(task_id)
+    require_goal(task.goal_id)
+
+    data = request.get_json()
+    if data is None:
+        return jsonify({"error": "No JSON data received"}), 400
+    if ("before_id" in data) == ("after_id" in data):
+        return jsonify({"error": "Provide exactly one of 'before_id' or 'after_id'"}), 400
+
+    position = "before" if "before_id" in data else "after"
+    anchor = Task.get_active_or_404(data[f"{position}_id"])
+    require_goal(anchor.goal_id)
+
+    old_parent_id = task.parent_id
+    try:
+        new_rank = move_task(task, anchor, position)
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
+    if task.parent_id != old_parent_id:
+        add_counts([
+            (task.goal_id, old_parent_id, subtree_counts(task, sign=-1)),
+            (task.goal_id, task.parent_id, subtree_counts(task)),
+        ])
+
+    bump_goal(task.goal_id)
+    db.session.commit()
+    rebalancer.check(task.goal_id, task.parent_id, new_rank)
+    change_feed.publish(session["user_id"], change(
+        "task.updated", goal_id=task.goal_id, id=task.id, changes={"parent_id": task.parent_id, "rank": new_rank},
+    ))
+    return jsonify(task.to_dict(recursive=False)), 200
+
 @bp.route('/api/tasks/batch-update', methods=["POST"])
 @login_required
 def batch_update_tasks():
     data = request.get_json()
     updates = data.get("updates", [])
+    mode = data.get("mode", "atomic")
 
     if not updates:
         return jsonify({"error": "No updates provided"}), 400
-    
-    try:
-        for update in updates:
-            task_id = update.get("id")
-            task = Task.query.get_or_404(task_id)
-            if "order_idx" in update:
-                task.order_idx = update["order_idx"]
-            if "status" in update:
-                task.status = update["status"]
-            if "title" in update:
-                task.title = update["title"]
-        
-        db.session.commit()
+    if mode not in ("atomic", "best_effort"):
+        return jsonify({"error": "'mode' must be 'atomic' or 'best_effort'"}), 400
+    # a reorder the batch cannot apply is refused outright, even in best_effort mode
+    if any(isinstance(entry, dict) and "order_idx" in entry for entry in updates):
+        return jsonify({"error": MOVED_FIELD_ERROR}), 400
 
-        return jsonify({
-            "message": f"Successfully updated {len(updates)} tasks",
-            "updated_count": len(updates)
-        }), 200
+    try:
+        results, updated_count, applied = apply_task_updates(updates, atomic=(mode == "atomic"), owns_goal=owns_goal)
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": f"Failed to update tasks: {str(e)}"}), 500
 
+    if mode == "atomic" and updated_count < len(results):
+        return jsonify({
+            "error": "Batch rejected, no tasks were updated",
+            "results": results
+        }), 400
+
+    change_feed.publish(session["user_id"], *(
+        change("task.updated", goal_id=goal_id, id=task_id, changes=changes)
+        for task_id, goal_id, changes in applied
+    ))
+    return jsonify({
+        "message": f"Successfully updated {updated_count} tasks",
+        "updated_count": updated_count,
+        "results": results
+    }), 200
+
 @bp.route("/api/tasks/<int:task_id>", methods=["DELETE"])
 @login_required
 def delete_task(task_id):
-    task = Task.query.get_or_404(task_id)
-    db.session.delete(task)
+    task = Task.get_active_or_404(task_id)
+    require_goal(task.goal_id)
+    goal_id = task.goal_id
+    add_counts([(goal_id, task.parent_id, subtree_counts(task, sign=-1))])
+    delete_task_tree(task_id)
+    bump_goal(goal_id)
     db.session.commit()
+    change_feed.publish(session["user_id"], change("task.deleted", goal_id=goal_id, id=task_id))
     return jsonify({"message": "Task deleted"}), 200
\ No newline at end of file
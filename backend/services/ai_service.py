@@ -1,11 +1,18 @@
-import requests
 import json
 import re
 import logging
-from models import Task, db
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterator
+from services.llm_client import LLMError
+from services.llm_router import llm_router
+from services.plan_cache import plan_cache, plan_cache_key
 
 logger = logging.getLogger(__name__)
 
+# subtask plans of one level requested at once by generate_plan_from_ai
+MAX_PARALLEL_PLANS = 16
+
 def clean_json_string(raw: str) -> str:
     """
     Remove comments and invalid trailing text from Ollama output.
@@ -35,30 +42,109 @@ def extract_tasks(parsed_data):
         return parsed_data
     return []
 
-def generate_plan_from_ai(prompt: str, goal_id: int, parent_id=None, ollama_api_url: str = "http://ollama:11434") -> list[Task]:
-    """Call AI API, parse JSON, and create Task objects (not yet committed)."""
-    # call api
-    try:
-        response = requests.post(
-            f"{ollama_api_url}/v1/completions",
-            json={
-                "model": "mistral:latest",
-                "prompt": prompt.strip(),
-                "temperature": 0.2,
-                "max_tokens": 512
-            },
-            timeout=120
-        )
-    except Exception as e:
-        raise RuntimeError(f"Failed to call Ollama: {e}") from e
+def normalize_task(t: dict) -> dict:
+    return {"title": t.get("title", "Untitled"), "description": t.get("description", "")}
+
+
+class TaskStreamParser:
+    """
+    Incremental, tolerant parser for a plan streamed token by token.
+    feed() returns each task object as soon as its closing brace arrives.
+    Tasks are the outermost objects inside an array that carry a "title",
+    which covers every shape extract_tasks accepts. Text before or after
+    the JSON, // comments and trailing commas are ignored.
+    """
+
+    def __init__(self):
+        self._stack = []  # open "{" / "[" containers
+        self._in_string = False
+        self._escape = False
+        self._in_comment = False
+        self._slash = False
+        self._item = None  # chars of the task object currently being read
+        self._item_depth = 0
+
+    def feed(self, chunk: str) -> list[dict]:
+        tasks = []
+        for ch in chunk:
+            if self._in_comment:
+                if ch != "\n":
+                    continue
+                self._in_comment = False
+
+            if self._in_string:
+                self._append(ch)
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if self._slash:
+                self._slash = False
+                if ch == "/":
+                    self._in_comment = True
+                    continue
+                self._append("/")
+
+            if not self._stack and ch not in "{[":
+                continue  # prose around the JSON
+
+            if ch == "/":
+                self._slash = True
+                continue
+            if ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                if ch == "{" and self._item is None and self._stack and self._stack[-1] == "[":
+                    self._item = []
+                    self._item_depth = len(self._stack)
+                self._stack.append(ch)
+            elif ch in "}]":
+                if self._stack:
+                    self._stack.pop()
+                if ch == "}" and self._item is not None and len(self._stack) == self._item_depth:
+                    self._item.append(ch)
+                    task = self._finish_item()
+                    if task is not None:
+                        tasks.append(task)
+                    continue
+
+            self._append(ch)
+        return tasks
+
+    def _append(self, ch):
+        if self._item is not None:
+            self._item.append(ch)
+
+    def _finish_item(self):
+        raw = re.sub(r',\s*([\]}])', r'\1', "".join(self._item))
+        self._item = None
+        try:
+            parsed = json.loads(raw)
+        except ValueError:
+            logger.warning("Skipping unparseable task in AI stream: %s", raw)
+            return None
+        if not isinstance(parsed, dict) or "title" not in parsed:
+            return None
+        return normalize_task(parsed)
 
-    if response.status_code != 200:
-        raise RuntimeError(f"AI API returned status {response.status_code}")
 
-    # parse json and return task list
+def plan_role(parent_id) -> str:
+    """Top-level goal plans and subtask breakdowns may be served by different models."""
+    return "goal" if parent_id is None else "subtask"
+
+
+def plan_key(prompt: str, role: str = "goal") -> str:
+    return plan_cache_key(json.dumps(llm_router.signature(role)), prompt, role=role)
+
+
+def parse_plan_text(raw_output: str) -> list[dict]:
+    """Parse the text of one completion choice into a list of task dicts."""
     try:
-        data = response.json()
-        raw_output = data.get("choices", [{}])[0].get("text", "").strip()
+        raw_output = raw_output.strip()
         if not raw_output:
             raise ValueError("Empty AI response")
 
@@ -72,19 +158,247 @@ def generate_plan_from_ai(prompt: str, goal_id: int, parent_id=None, ollama_api_
         logging.debug('JSON STR %s', json_str)
 
         parsed_data = json.loads(clean_json_string(json_str))
-        task_list = extract_tasks(parsed_data)
-
-        tasks = []
-        for idx, t in enumerate(task_list):
-            task = Task(
-                title=t.get("title", "Untitled"),
-                description=t.get("description", ""),
-                goal_id=goal_id,
-                parent_id=parent_id,
-                order_idx=idx
-            )
-            tasks.append(task)
-        return tasks
+        return [normalize_task(t) for t in extract_tasks(parsed_data)]
     except Exception as e:
         logger.exception("Error parsing AI output")
-        raise RuntimeError(f"Failed to parse AI output: {e}") from e
\ No newline at end of file
+        raise RuntimeError(f"Failed to parse AI output: {e}") from e
+
+
+def request_plan(prompt: str, role: str = "goal") -> list[dict]:
+    """Call the AI API for a single prompt and return the parsed plan."""
+    data = llm_router.completion(prompt, role)
+    return parse_plan_text(data.get("choices", [{}])[0].get("text", ""))
+
+
+def request_plan_texts(prompts: list[str], role: str = "goal") -> list[str]:
+    """
+    Call the AI API once for several prompts (OpenAI-style list prompt) and
+    return the completion texts in prompt order.
+    """
+    data = llm_router.completion(prompts, role)
+    choices = data.get("choices") or []
+    if len(choices) != len(prompts):
+        raise LLMError(f"AI API returned {len(choices)} choices for {len(prompts)} prompts")
+    choices = sorted(choices, key=lambda c: c.get("index", 0))
+    return [choice.get("text", "") for choice in choices]
+
+
+class _Batch:
+    def __init__(self, role):
+        self.role = role
+        self.calls = []  # (key, prompt, future)
+        self.closed = False
+
+
+class PlanCoalescer:
+    """
+    Coalesces concurrent plan requests before they reach the model.
+
+    Callers asking for a prompt that is already in flight wait for that call
+    instead of starting another (single-flight). Distinct prompts arriving
+    within AI_BATCH_WINDOW_MS are sent together, up to AI_BATCH_SIZE per
+    request. A backend that rejects list prompts with a 4xx is remembered and
+    served one request per prompt from then on.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.batch_size = 1
+        self.window = 0.0
+        self.batch_prompts = True
+        self._lock = threading.Lock()
+        self._in_flight = {}  # plan key -> Future
+        self._open = {}  # role -> _Batch collecting prompts
+        self.calls = 0
+        self.shared = 0
+        self.batches = 0
+        self.batched_prompts = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config["AI_COALESCE"]
+        self.batch_size = max(1, app.config["AI_BATCH_SIZE"])
+        self.window = app.config["AI_BATCH_WINDOW_MS"] / 1000
+        app.extensions["plan_coalescer"] = self
+
+    def fetch(self, prompt: str, role: str = "goal") -> list[dict]:
+        if not self.enabled:
+            return request_plan(prompt, role)
+
+        key = plan_key(prompt, role)
+        flush = None
+        with self._lock:
+            self.calls += 1
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.shared += 1
+            else:
+                future = Future()
+                self._in_flight[key] = future
+                flush = self._add(key, prompt, role, future)
+
+        if flush is not None:
+            flush()
+        return future.result()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "shared": self.shared,
+                "batches": self.batches,
+                "batched_prompts": self.batched_prompts,
+                "batch_prompts": self.batch_prompts,
+                "in_flight": len(self._in_flight),
+            }
+
+    def _add(self, key, prompt, role, future):
+        """Queue a new call; returns a callable the caller must run to dispatch, if any."""
+        if self.batch_size == 1 or self.window <= 0:
+            batch = _Batch(role)
+            batch.calls.append((key, prompt, future))
+            batch.closed = True
+            return lambda: self._dispatch(batch)
+
+        batch = self._open.get(role)
+        if batch is None:
+            batch = self._open[role] = _Batch(role)
+            timer = threading.Timer(self.window, self._flush, args=(batch,))
+            timer.daemon = True
+            timer.start()
+        batch.calls.append((key, prompt, future))
+        if len(batch.calls) >= self.batch_size:
+            # full: the caller that filled it sends it right away
+            self._close(batch)
+            return lambda: self._dispatch(batch)
+        return None
+
+    def _close(self, batch):
+        batch.closed = True
+        if self._open.get(batch.role) is batch:
+            del self._open[batch.role]
+
+    def _flush(self, batch):
+        with self._lock:
+            if batch.closed:
+                return
+            self._close(batch)
+        self._dispatch(batch)
+
+    def _dispatch(self, batch):
+        prompts = [prompt for _, prompt, _ in batch.calls]
+        try:
+            if len(prompts) == 1:
+                results = [request_plan(prompts[0], batch.role)]
+            else:
+                results = self._request_batch(prompts, batch.role)
+        except Exception as e:
+            results = [e] * len(prompts)
+
+        with self._lock:
+            self.batches += 1
+            self.batched_prompts += len(prompts)
+            for key, _, _ in batch.calls:
+                self._in_flight.pop(key, None)
+        for (_, _, future), result in zip(batch.calls, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def _request_batch(self, prompts, role):
+        def parse(text):
+            try:
+                return parse_plan_text(text)
+            except Exception as e:
+                return e
+
+        if self.batch_prompts:
+            try:
+                return [parse(text) for text in request_plan_texts(prompts, role)]
+            except LLMError as e:
+                if e.status_code is None or not 400 <= e.status_code < 500:
+                    raise
+                logger.warning("AI backend rejected a batched request (%s), sending prompts one by one", e)
+                self.batch_prompts = False
+
+        def one(prompt):
+            try:
+                return request_plan(prompt, role)
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=len(prompts)) as pool:
+            return list(pool.map(one, prompts))
+
+
+plan_coalescer = PlanCoalescer()
+
+
+def fetch_plan(prompt: str, role: str = "goal") -> list[dict]:
+    """Get a plan from the AI API, sharing the call with identical concurrent requests."""
+    return plan_coalescer.fetch(prompt, role)
+
+
+def stream_plan(prompt: str, role: str = "goal", use_cache: bool = True) -> Iterator[dict]:
+    """Yield plan task dicts one by one as the model streams them out."""
+    prompt = prompt.strip()
+    key = plan_key(prompt, role)
+
+    cached = plan_cache.get(key) if use_cache else None
+    if cached is not None:
+        yield from cached
+        return
+
+    parser = TaskStreamParser()
+    task_list = []
+    for text in llm_router.stream_completion(prompt, role):
+        for task in parser.feed(text):
+            task_list.append(task)
+            yield task
+
+    if task_list:
+        plan_cache.set(key, task_list)
+
+
+def cached_plan(prompt: str, role: str = "goal", use_cache: bool = True) -> list[dict]:
+    """A plan from the cache, or from the AI API (then cached)."""
+    prompt = prompt.strip()
+    key = plan_key(prompt, role)
+
+    task_list = plan_cache.get(key) if use_cache else None
+    if task_list is None:
+        task_list = fetch_plan(prompt, role)
+        plan_cache.set(key, task_list)
+    return task_list
+
+
+def cached_plans(prompts: list[str], role: str = "goal", use_cache: bool = True) -> list[list[dict]]:
+    """Several plans, fetched concurrently so the coalescer can batch them into few calls."""
+    if len(prompts) <= 1:
+        return [cached_plan(p, role, use_cache) for p in prompts]
+    with ThreadPoolExecutor(max_workers=min(len(prompts), MAX_PARALLEL_PLANS)) as pool:
+        return list(pool.map(lambda p: cached_plan(p, role, use_cache), prompts))
+
+
+def generate_plan_from_ai(prompt: str, parent_id=None, use_cache: bool = True,
+                          depth: int = 1, subtask_prompt=None) -> list[dict]:
+    """
+    Get a plan (from the cache or the AI API) as task dicts. With depth > 1
+    every task also gets "subtasks", asked for with subtask_prompt(task)
+    one level at a time.
+    """
+    # copies, the cached lists are shared
+    plan = [dict(t) for t in cached_plan(prompt, plan_role(parent_id), use_cache)]
+    level = plan
+    for _ in range(depth - 1):
+        if not level:
+            break
+        subplans = cached_plans([subtask_prompt(t) for t in level], "subtask", use_cache)
+        next_level = []
+        for task, subplan in zip(level, subplans):
+            task["subtasks"] = [dict(t) for t in subplan]
+            next_level.extend(task["subtasks"])
+        level = next_level
+    return plan
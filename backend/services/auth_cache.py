@@ -0,0 +1,119 @@
+"""
+Cache of the signed-in user and the ids of the goals they own.
+
+login_required loads an AuthContext once per request into `g.auth`, from a
+process-level cache kept for AUTH_CACHE_TTL seconds (0 disables it), so
+ownership checks on goals and tasks cost no queries. Goal create and delete
+update the entry in this process; a goal id missing from a cached entry
+triggers one reload before access is refused, so goals created through
+another worker are never rejected.
+
+A goal deleted through another worker stays in this worker's entry until
+it expires. Ownership never goes to anyone else (goal ids are not reused),
+but the goal itself is gone, so routes load the goal or task they act on
+with get_active_or_404(), which also rejects soft-deleted goals.
+"""
+import threading
+import time
+
+from flask import abort, g
+
+from models import db, Goal, User
+
+
+class AuthContext:
+    __slots__ = ("user_id", "username", "goal_ids", "loaded_at")
+
+    def __init__(self, user_id, username, goal_ids):
+        self.user_id = user_id
+        self.username = username
+        self.goal_ids = frozenset(goal_ids)
+        self.loaded_at = time.monotonic()
+
+
+def load_auth_context(user_id):
+    """The user and their live goal ids in one query, or None if the user is gone."""
+    rows = db.session.execute(
+        db.select(User.username, Goal.id)
+        .outerjoin(Goal, (Goal.user_id == User.id) & Goal.deleted_at.is_(None))
+        .where(User.id == user_id)
+    ).all()
+    if not rows:
+        return None
+    return AuthContext(user_id, rows[0][0], [goal_id for _, goal_id in rows if goal_id is not None])
+
+
+class UserCache:
+    def __init__(self, app=None):
+        self.ttl = 0
+        self.max_entries = 10000
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = app.config["AUTH_CACHE_TTL"]
+        self._entries = {}
+        app.extensions["user_cache"] = self
+
+    def get(self, user_id, refresh=False):
+        now = time.monotonic()
+        if self.ttl > 0 and not refresh:
+            with self._lock:
+                context = self._entries.get(user_id)
+                if context is not None and now - context.loaded_at < self.ttl:
+                    self.hits += 1
+                    return context
+        with self._lock:
+            self.misses += 1
+
+        context = load_auth_context(user_id)
+        if context is not None and self.ttl > 0:
+            with self._lock:
+                if len(self._entries) >= self.max_entries:
+                    self._entries.clear()
+                self._entries[user_id] = context
+        return context
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def update_goals(self, user_id, added=(), removed=()):
+        """Apply a goal create or delete to the cached entry instead of reloading it."""
+        with self._lock:
+            context = self._entries.get(user_id)
+            if context is not None:
+                context.goal_ids = (context.goal_ids | set(added)) - set(removed)
+
+
+user_cache = UserCache()
+
+
+def owns_goal(goal_id):
+    """Whether the signed-in user owns a live goal with this id."""
+    auth = g.auth
+    if goal_id in auth.goal_ids:
+        return True
+    if g.get("auth_refreshed"):
+        return False
+    # the cached entry may predate a goal created in another worker
+    g.auth_refreshed = True
+    g.auth = user_cache.get(auth.user_id, refresh=True) or auth
+    return goal_id in g.auth.goal_ids
+
+
+def require_goal(goal_id):
+    """
+    404 unless the signed-in user owns the goal; the same response as a missing
+    goal. May pass for a goal just deleted in another worker, see above.
+    """
+    if not owns_goal(goal_id):
+        abort(404)
@@ -0,0 +1,244 @@
+"""
+Change feed: compact delta events for goals and tasks, pushed over SSE.
+
+Mutating routes publish events for the goal's owner once their
+transaction has committed, e.g.
+
+    {"type": "task.updated", "goal_id": 3, "id": 17, "changes": {"status": "done"}}
+
+"goal.created" and "task.created" carry the new row (a generated plan's
+"task.created" events carry the new subtasks nested under "subtasks"),
+"*.updated" only the fields that changed and "*.deleted" only the ids; a
+deleted task takes its subtree with it. Rollup counts of ancestors and
+goals are not repeated, clients apply the same delta to them.
+
+Every user's events get increasing ids and the last CHANGEFEED_HISTORY of
+them are kept, so a subscriber reconnecting with Last-Event-ID replays what
+it missed; an id that is no longer retained (or from before a restart)
+gets a "reset" event and the client should refetch. The default "memory"
+backend only reaches subscribers in the same process, which is enough for
+a single gunicorn worker; with CHANGEFEED_BACKEND set to a redis:// URL
+events go through one Redis stream per user and reach every worker.
+
+Each open stream holds a gthread worker thread for up to
+CHANGEFEED_STREAM_TIMEOUT, so a process serves at most
+CHANGEFEED_MAX_STREAMS of them and keeps its other threads for API
+requests; a subscriber over the limit gets 503 with Retry-After and an SSE
+"retry:" field, and should try again then.
+"""
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+
+from flask import current_app
+
+try:
+    import redis
+except ImportError:  # optional dependency, only needed for the redis backend
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+class EventsExpired(LookupError):
+    """The requested position is older than the retained history."""
+
+
+def change(type_, **fields):
+    """One change event, e.g. change("task.deleted", id=4, goal_id=1)."""
+    return {"type": type_, **fields}
+
+
+def changed_fields(before, after):
+    """The entries of `after` whose values differ from `before`."""
+    return {k: v for k, v in after.items() if before.get(k) != v}
+
+
+class _Channel:
+    """One user's retained events and the subscribers waiting for more."""
+
+    def __init__(self, history):
+        self.events = deque(maxlen=history)  # (seq, payload)
+        self.seq = 0
+        self.changed = threading.Condition()
+
+
+class MemoryBackend:
+    """
+    Per-process history and wake-ups. Each user has a ring buffer and a
+    condition variable, so a publish appends once and wakes only that
+    user's subscribers, who all read the same encoded payloads. Ids are
+    "<epoch>-<seq>" with an epoch per process, so ids handed out before
+    a restart are recognised as expired.
+    """
+
+    def __init__(self, history):
+        self.history = history
+        self.epoch = uuid.uuid4().hex[:8]
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    def _channel(self, user_id):
+        channel = self._channels.get(user_id)
+        if channel is None:
+            with self._lock:
+                channel = self._channels.setdefault(user_id, _Channel(self.history))
+        return channel
+
+    def publish(self, user_id, payloads):
+        channel = self._channel(user_id)
+        with channel.changed:
+            for payload in payloads:
+                channel.seq += 1
+                channel.events.append((channel.seq, payload))
+            channel.changed.notify_all()
+
+    def latest(self, user_id):
+        return f"{self.epoch}-{self._channel(user_id).seq}"
+
+    def read(self, user_id, after, timeout):
+        """(id, payload) of the events after `after`, waiting up to `timeout` seconds for the first."""
+        epoch, _, seq = after.partition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            raise EventsExpired(after)
+        seq = int(seq)
+        channel = self._channel(user_id)
+        with channel.changed:
+            if seq > channel.seq:
+                raise EventsExpired(after)
+            if seq == channel.seq:
+                channel.changed.wait(timeout)
+            oldest = channel.events[0][0] if channel.events else channel.seq + 1
+            if seq < oldest - 1:
+                raise EventsExpired(after)
+            # the newest events are at the end: index back from it instead of scanning the buffer
+            size = len(channel.events)
+            events = [channel.events[i] for i in range(size - (channel.seq - seq), size)]
+        return [(f"{self.epoch}-{s}", payload) for s, payload in events]
+
+
+class RedisBackend:
+    """One capped Redis stream per user; XREAD BLOCK does the waiting."""
+
+    def __init__(self, url, history):
+        if redis is None:
+            raise RuntimeError("CHANGEFEED_BACKEND is a Redis URL but the redis package is not installed")
+        self.client = redis.Redis.from_url(url)
+        self.history = history
+
+    @staticmethod
+    def _key(user_id):
+        return f"taskflow:changes:{user_id}"
+
+    def publish(self, user_id, payloads):
+        pipe = self.client.pipeline(transaction=False)
+        for payload in payloads:
+            pipe.xadd(self._key(user_id), {"event": payload}, maxlen=self.history, approximate=True)
+        pipe.execute()
+
+    def latest(self, user_id):
+        rows = self.client.xrevrange(self._key(user_id), count=1)
+        return rows[0][0].decode() if rows else "0-0"
+
+    def read(self, user_id, after, timeout):
+        key = self._key(user_id)
+        try:
+            position = _stream_id(after)
+        except ValueError:
+            raise EventsExpired(after)
+        oldest = self.client.xrange(key, count=1)
+        if oldest and position != (0, 0) and position < _stream_id(oldest[0][0].decode()):
+            raise EventsExpired(after)
+        result = self.client.xread({key: after}, count=self.history, block=max(1, int(timeout * 1000)))
+        return [
+            (event_id.decode(), fields[b"event"].decode())
+            for _, entries in result for event_id, fields in entries
+        ]
+
+
+def _stream_id(value):
+    ms, _, seq = value.partition("-")
+    return int(ms), int(seq or 0)
+
+
+class ChangeFeed:
+    """Publishes change events per user and turns them into SSE streams."""
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.heartbeat = 15
+        self.stream_timeout = 300
+        self.max_streams = 0
+        self.open_streams = 0
+        self.rejected_streams = 0
+        self._streams_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        url = app.config["CHANGEFEED_BACKEND"]
+        history = app.config["CHANGEFEED_HISTORY"]
+        if url.startswith(("redis://", "rediss://", "unix://")):
+            self.backend = RedisBackend(url, history)
+        else:
+            self.backend = MemoryBackend(history)
+        self.heartbeat = app.config["CHANGEFEED_HEARTBEAT"]
+        self.stream_timeout = app.config["CHANGEFEED_STREAM_TIMEOUT"]
+        self.max_streams = app.config["CHANGEFEED_MAX_STREAMS"]
+        app.extensions["change_feed"] = self
+
+    def acquire_stream(self):
+        """Take one of the process's stream slots; False when all are in use."""
+        with self._streams_lock:
+            if self.open_streams >= self.max_streams:
+                self.rejected_streams += 1
+                return False
+            self.open_streams += 1
+            return True
+
+    def release_stream(self):
+        with self._streams_lock:
+            self.open_streams -= 1
+
+    def stats(self):
+        with self._streams_lock:
+            return {"open_streams": self.open_streams, "max_streams": self.max_streams,
+                    "rejected_streams": self.rejected_streams}
+
+    def publish(self, user_id, *events):
+        """Send events to the user's subscribers. Call after the commit; never raises."""
+        if not events or self.backend is None:
+            return
+        try:
+            self.backend.publish(user_id, [current_app.json.dumps(e) for e in events])
+        except Exception:
+            # the change is committed either way; subscribers catch up on their next refetch
+            logger.exception("Could not publish %d change events for user %s", len(events), user_id)
+
+    def stream(self, user_id, last_event_id=None):
+        """
+        SSE frames for one subscriber: the events after last_event_id (from
+        now on without one) and a comment every CHANGEFEED_HEARTBEAT seconds
+        while idle. Ends after CHANGEFEED_STREAM_TIMEOUT; EventSource then
+        reconnects with the id of the last event it got.
+        """
+        cursor = last_event_id or self.backend.latest(user_id)
+        deadline = time.monotonic() + self.stream_timeout
+        yield ": connected\n\n"
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                events = self.backend.read(user_id, cursor, min(self.heartbeat, remaining))
+            except EventsExpired:
+                cursor = self.backend.latest(user_id)
+                yield f"id: {cursor}\nevent: reset\ndata: {{}}\n\n"
+                continue
+            if not events:
+                yield ": keepalive\n\n"
+                continue
+            yield "".join(f"id: {event_id}\nevent: change\ndata: {payload}\n\n" for event_id, payload in events)
+            cursor = events[-1][0]
+
+
+change_feed = ChangeFeed()
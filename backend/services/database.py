@@ -0,0 +1,119 @@
+"""
+Engine configuration for the Flask-SQLAlchemy `db`.
+
+Every SQLite connection, in-memory ones included, enforces foreign keys, so
+the ON DELETE CASCADE on task rows applies there as it does on Postgres.
+SQLite files also get WAL journaling, synchronous=NORMAL, a busy timeout
+and mmap on every new connection, so readers never wait for the writer. Write
+requests open their transaction with BEGIN IMMEDIATE: they queue for the
+write lock up front (within the busy timeout) instead of failing with
+"database is locked" when a read transaction tries to upgrade. They hold
+it until they commit, so a write route that waits on something slow (a
+password hash, the model, an upload) closes the session first. Server
+databases get a sized connection pool with pre-ping and recycling.
+
+With DATABASE_REPLICA_URL set, GET and HEAD requests read from that
+database through the "replica" bind; anything flushed in such a request
+still goes to the primary.
+"""
+import sqlite3
+
+from flask import has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+REPLICA_BIND = "replica"
+READ_METHODS = ("GET", "HEAD")
+
+
+def is_sqlite(url) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def engine_options(url, config) -> dict:
+    if is_sqlite(url):
+        # the driver's own busy wait, in seconds; the pragma below sets the same for every connection
+        return {"connect_args": {"timeout": config["SQLITE_BUSY_TIMEOUT_MS"] / 1000}}
+    return {
+        "pool_size": config["DB_POOL_SIZE"],
+        "max_overflow": config["DB_MAX_OVERFLOW"],
+        "pool_timeout": config["DB_POOL_TIMEOUT"],
+        "pool_recycle": config["DB_POOL_RECYCLE"],
+        "pool_pre_ping": config["DB_POOL_PRE_PING"],
+    }
+
+
+def configure_engines(config):
+    """Fill in SQLALCHEMY_ENGINE_OPTIONS and the replica bind; must run before db.init_app."""
+    config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options(config["SQLALCHEMY_DATABASE_URI"], config))
+    replica_url = config.get("DATABASE_REPLICA_URL")
+    if replica_url:
+        binds = dict(config.get("SQLALCHEMY_BINDS") or {})
+        binds.setdefault(REPLICA_BIND, {"url": replica_url, **engine_options(replica_url, config)})
+        config["SQLALCHEMY_BINDS"] = binds
+
+
+def enforce_foreign_keys(engine):
+    """SQLite ignores foreign keys, cascades included, unless each connection turns them on."""
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        if isinstance(dbapi_connection, sqlite3.Connection):
+            dbapi_connection.execute("PRAGMA foreign_keys = ON")
+
+
+def tune_sqlite(engine, config):
+    """Apply the SQLite pragmas to each new connection and take write locks at BEGIN."""
+    pragmas = [
+        f"PRAGMA busy_timeout = {int(config['SQLITE_BUSY_TIMEOUT_MS'])}",
+        f"PRAGMA journal_mode = {config['SQLITE_JOURNAL_MODE']}",
+        f"PRAGMA synchronous = {config['SQLITE_SYNCHRONOUS']}",
+        f"PRAGMA mmap_size = {int(config['SQLITE_MMAP_SIZE'])}",
+    ]
+    begin_immediate = config["SQLITE_BEGIN_IMMEDIATE"]
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        if not isinstance(dbapi_connection, sqlite3.Connection):
+            return
+        for pragma in pragmas:
+            dbapi_connection.execute(pragma)
+        if begin_immediate:
+            # let SQLAlchemy, not the driver, decide when and how transactions begin
+            dbapi_connection.isolation_level = None
+
+    if begin_immediate:
+        @event.listens_for(engine, "begin")
+        def on_begin(connection):
+            # straight on the driver, so it is not counted as a query by the metrics hooks
+            mode = "" if is_read_request() else " IMMEDIATE"
+            connection.connection.driver_connection.execute(f"BEGIN{mode}")
+
+
+def init_database(app, db):
+    """Configure the engines, then set up `db` on the app."""
+    configure_engines(app.config)
+    db.init_app(app)
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name != "sqlite":
+                continue
+            enforce_foreign_keys(engine)
+            # in-memory databases share one connection between threads, leave them alone
+            if engine.url.database not in (None, "", ":memory:"):
+                tune_sqlite(engine, app.config)
+
+
+def is_read_request() -> bool:
+    return has_request_context() and request.method in READ_METHODS
+
+
+class RoutingSession(Session):
+    """Session that sends the reads of GET/HEAD requests to the replica bind, when there is one."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and is_read_request():
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
@@ -0,0 +1,108 @@
+"""
+Set-based deletion of task trees and goals.
+
+Descendants are collected with one recursive CTE and deleted deepest level
+first in chunked DELETE ... WHERE id IN (...) statements, so no ORM objects
+are loaded and the parent_id foreign key holds after every statement.
+Goals with very large trees can be soft-deleted instead: they disappear
+from reads at once and a background thread purges them in short
+transactions.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import delete, literal
+
+from models import db, Goal, Task
+
+logger = logging.getLogger(__name__)
+
+DELETE_CHUNK_SIZE = 500
+
+
+def tree_ids(*root_filters):
+    """Ids of the matching root tasks and all their descendants, deepest first."""
+    tree = (
+        db.select(Task.id, literal(0).label("depth"))
+        .where(*root_filters)
+        .cte("tree", recursive=True)
+    )
+    tree = tree.union_all(
+        db.select(Task.id, tree.c.depth + 1).where(Task.parent_id == tree.c.id)
+    )
+    return db.session.scalars(db.select(tree.c.id).order_by(tree.c.depth.desc())).all()
+
+
+def delete_ids(ids, commit_each_chunk=False):
+    for start in range(0, len(ids), DELETE_CHUNK_SIZE):
+        chunk = ids[start:start + DELETE_CHUNK_SIZE]
+        db.session.execute(
+            delete(Task).where(Task.id.in_(chunk)).execution_options(synchronize_session=False)
+        )
+        if commit_each_chunk:
+            db.session.commit()
+    return len(ids)
+
+
+def delete_task_tree(task_id):
+    """Delete a task and its whole subtree. Returns the number of tasks removed."""
+    return delete_ids(tree_ids(Task.id == task_id))
+
+
+def delete_goal_tree(goal_id, commit_each_chunk=False):
+    """Delete a goal and all of its tasks. Returns the number of tasks removed."""
+    count = delete_ids(tree_ids(Task.goal_id == goal_id, Task.parent_id.is_(None)), commit_each_chunk)
+    # tasks left unreachable from a root (e.g. by a parent cycle) still belong to the goal
+    db.session.execute(delete(Task).where(Task.goal_id == goal_id).execution_options(synchronize_session=False))
+    db.session.execute(delete(Goal).where(Goal.id == goal_id).execution_options(synchronize_session=False))
+    return count
+
+
+def count_goal_tasks(goal_id):
+    return db.session.scalar(db.select(db.func.count(Task.id)).where(Task.goal_id == goal_id))
+
+
+class GoalPurger:
+    """Purges soft-deleted goals on a background thread."""
+
+    def __init__(self, app=None):
+        self.app = None
+        self.threshold = 0
+        self._executor = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.threshold = app.config["GOAL_SOFT_DELETE_THRESHOLD"]
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="goal-purge")
+        app.extensions["goal_purger"] = self
+
+    def should_soft_delete(self, task_count):
+        return self._executor is not None and 0 < self.threshold <= task_count
+
+    def schedule(self, goal_id):
+        self._executor.submit(self._run, goal_id)
+
+    def _run(self, goal_id):
+        try:
+            with self.app.app_context():
+                count = purge_goal(goal_id)
+                logger.info("Purged goal %s with %d tasks", goal_id, count)
+        except Exception:
+            logger.exception("Purging goal %s failed", goal_id)
+
+
+def purge_goal(goal_id):
+    count = delete_goal_tree(goal_id, commit_each_chunk=True)
+    db.session.commit()
+    return count
+
+
+def purge_deleted_goals():
+    """Purge every soft-deleted goal, e.g. ones left behind by a restart mid-purge."""
+    goal_ids = db.session.scalars(db.select(Goal.id).where(Goal.deleted_at.is_not(None))).all()
+    return sum(purge_goal(goal_id) for goal_id in goal_ids)
+
+
+goal_purger = GoalPurger()
@@ -0,0 +1,90 @@
+"""
+JSON providers for the Flask app, chosen with JSON_PROVIDER.
+
+"orjson" encodes straight to bytes in C and handles datetimes natively;
+"stdlib" is Flask's default provider; "auto" (the default) uses orjson
+when it is installed. Both record encoding time in the request metrics.
+"""
+import json
+import time
+from datetime import date
+
+from flask.json.provider import DefaultJSONProvider
+
+from services.metrics import add_to_request
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    native_datetime = False
+
+    def dumps(self, obj, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            add_to_request("json", time.perf_counter() - start)
+
+
+def isoformat_default(o):
+    """Encode dates the way orjson does, everything else like Flask."""
+    if isinstance(o, date):
+        return o.isoformat()
+    return DefaultJSONProvider.default(o)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    native_datetime = True
+
+    def _options(self, indent=False):
+        options = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def encode(self, obj, indent=False) -> bytes:
+        start = time.perf_counter()
+        try:
+            return orjson.dumps(obj, default=self.default, option=self._options(indent))
+        except orjson.JSONEncodeError as e:
+            # orjson stops at 254 levels of nesting; very deep task trees go through json
+            if "Recursion limit" not in str(e):
+                raise
+            return json.dumps(
+                obj, default=isoformat_default, sort_keys=self.sort_keys,
+                ensure_ascii=self.ensure_ascii, indent=2 if indent else None,
+            ).encode()
+        finally:
+            add_to_request("json", time.perf_counter() - start)
+
+    def dumps(self, obj, **kwargs):
+        return self.encode(obj, indent=bool(kwargs.get("indent"))).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        body = self.encode(obj, indent=indent)
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
+
+
+def provider_class(name: str):
+    if name == "orjson" or (name == "auto" and orjson is not None):
+        if orjson is None:
+            raise RuntimeError("JSON_PROVIDER=orjson but orjson is not installed")
+        return OrjsonProvider
+    if name in ("stdlib", "auto"):
+        return StdlibJSONProvider
+    raise ValueError(f"Unknown JSON_PROVIDER {name!r}")
+
+
+def init_json(app):
+    app.json = provider_class(app.config["JSON_PROVIDER"])(app)
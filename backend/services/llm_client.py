@@ -0,0 +1,247 @@
+import json
+import logging
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+TRANSIENT_STATUSES = {429, 502, 503, 504}
+
+
+class LLMError(RuntimeError):
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class LLMUnavailableError(LLMError):
+    """Raised without calling Ollama: breaker open or too many calls in flight."""
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures and fails fast for
+    `reset_timeout` seconds, then lets a single trial call through.
+    Every call let through must end in record_success() or
+    record_failure(), or a half-open breaker stays shut.
+    """
+
+    def __init__(self, threshold=5, reset_timeout=30):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_progress = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_in_progress:
+                self._trial_in_progress = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_progress = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_progress = False
+            if self.failures >= self.threshold or self.opened_at is not None:
+                self.opened_at = time.monotonic()
+
+
+class LLMClient:
+    """
+    HTTP client for one Ollama backend: pooled keep-alive session, a cap on
+    concurrent calls, jittered retries on transient errors and a circuit
+    breaker. Records latency and token counts per call.
+    """
+
+    def __init__(self, base_url, timeout=120, retries=2, backoff=0.5, queue_timeout=30,
+                 max_in_flight=4, breaker_threshold=5, breaker_reset=30):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.queue_timeout = queue_timeout
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset)
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._session = self._build_session(max_in_flight)
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=1000)
+        self.in_flight = 0
+        self.calls = 0
+        self.failures = 0
+        self.retried = 0
+        self.rejected = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def completion(self, payload: dict) -> dict:
+        """POST a completion request and return the decoded JSON body."""
+        self._acquire()
+        start = time.perf_counter()
+        try:
+            response = self._post(payload, stream=False)
+            try:
+                data = response.json()
+            except ValueError as e:
+                raise LLMError(f"AI API returned invalid JSON: {e}") from e
+            usage = data.get("usage") or {}
+            self._record(start, usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0))
+            return data
+        finally:
+            self._release()
+
+    def stream_completion(self, payload: dict):
+        """POST a streamed completion request and yield text chunks as they arrive."""
+        self._acquire()
+        start = time.perf_counter()
+        chunks = 0
+        try:
+            response = self._post(dict(payload, stream=True), stream=True)
+            with response:
+                # OpenAI-compatible stream: "data: {...}" lines, terminated by "data: [DONE]"
+                try:
+                    for line in response.iter_lines(decode_unicode=True):
+                        if not line or not line.startswith("data:"):
+                            continue
+                        data = line[len("data:"):].strip()
+                        if data == "[DONE]":
+                            break
+                        try:
+                            text = json.loads(data).get("choices", [{}])[0].get("text", "")
+                        except ValueError as e:
+                            raise LLMError(f"Malformed AI stream chunk: {data}") from e
+                        chunks += 1
+                        yield text
+                except requests.RequestException as e:
+                    self._fail()
+                    raise LLMError(f"AI stream broke off: {e}") from e
+            self._record(start, 0, chunks)
+        finally:
+            self._release()
+
+    def stats(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            stats = {
+                "calls": self.calls,
+                "failures": self.failures,
+                "retries": self.retried,
+                "rejected": self.rejected,
+                "in_flight": self.in_flight,
+                "breaker": self.breaker.state,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+            }
+        for name, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+            stats[f"latency_{name}_ms"] = (
+                round(latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000, 1)
+                if latencies else None
+            )
+        return stats
+
+    def ping(self, path="/api/tags", timeout=2):
+        """True when the backend answers a cheap GET (Ollama lists its models there)."""
+        try:
+            response = self._session.get(f"{self.base_url}{path}", timeout=timeout)
+            response.close()
+            return response.status_code == 200
+        except requests.RequestException:
+            return False
+
+    def _post(self, payload, stream):
+        if not self.breaker.allow():
+            with self._lock:
+                self.rejected += 1
+            raise LLMUnavailableError("AI backend is unavailable, try again shortly")
+
+        url = f"{self.base_url}/v1/completions"
+        for attempt in range(self.retries + 1):
+            error = None
+            try:
+                response = self._session.post(url, json=payload, stream=stream, timeout=self.timeout)
+                if response.status_code == 200:
+                    self.breaker.record_success()
+                    return response
+                response.close()
+                error = LLMError(f"AI API returned status {response.status_code}", response.status_code)
+                transient = response.status_code in TRANSIENT_STATUSES
+                if 400 <= response.status_code < 500 and not transient:
+                    # the backend is up and rejected this request; callers probe with some (see ai_service)
+                    self.breaker.record_success()
+                    with self._lock:
+                        self.failures += 1
+                    raise error
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = LLMError(f"Failed to call Ollama: {e}")
+                transient = True
+            except requests.RequestException as e:
+                error = LLMError(f"Failed to call Ollama: {e}")
+                transient = False
+
+            if not transient or attempt == self.retries:
+                self._fail()
+                raise error
+
+            with self._lock:
+                self.retried += 1
+            # full jitter: sleep somewhere in [0, backoff * 2^attempt)
+            delay = random.uniform(0, self.backoff * (2 ** attempt))
+            logger.warning("Ollama call failed (%s), retrying in %.2fs", error, delay)
+            time.sleep(delay)
+
+    def _fail(self):
+        self.breaker.record_failure()
+        with self._lock:
+            self.failures += 1
+
+    def _acquire(self):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self.rejected += 1
+            raise LLMUnavailableError("Too many AI requests in flight, try again shortly")
+        with self._lock:
+            self.in_flight += 1
+
+    def _release(self):
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def _record(self, start, prompt_tokens, completion_tokens):
+        with self._lock:
+            self._latencies.append(time.perf_counter() - start)
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+
+    @staticmethod
+    def _build_session(pool_size):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
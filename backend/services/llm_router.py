@@ -0,0 +1,176 @@
+"""
+Routes completions across several Ollama backends.
+
+Backends come from OLLAMA_BACKENDS, a JSON list such as
+
+    [{"name": "large", "url": "http://ollama-1:11434", "model": "mistral:latest", "roles": ["goal"]},
+     {"name": "small", "url": "http://ollama-2:11434", "model": "phi3:mini", "roles": ["subtask"], "weight": 2}]
+
+Unset, a single backend on OLLAMA_API serves every role. Each call goes to
+the backend serving its role with the fewest outstanding requests per unit
+of weight, skipping backends that failed their last health check or whose
+circuit breaker is open (unless no other backend is left).
+"""
+import json
+import logging
+import random
+import threading
+import time
+
+from services.llm_client import LLMClient, LLMUnavailableError
+from services.metrics import observe_llm
+
+logger = logging.getLogger(__name__)
+
+ROLES = ("goal", "subtask")
+DEFAULT_MODEL = "mistral:latest"
+DEFAULT_TEMPERATURE = 0.2
+DEFAULT_MAX_TOKENS = 512
+
+
+class Backend:
+    def __init__(self, name, client, model=DEFAULT_MODEL, roles=ROLES, weight=1,
+                 temperature=DEFAULT_TEMPERATURE, max_tokens=DEFAULT_MAX_TOKENS):
+        unknown = set(roles) - set(ROLES)
+        if unknown:
+            raise ValueError(f"Backend {name}: unknown roles {', '.join(sorted(unknown))}")
+        if weight <= 0:
+            raise ValueError(f"Backend {name}: weight must be positive")
+        self.name = name
+        self.client = client
+        self.model = model
+        self.roles = tuple(roles)
+        self.weight = weight
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.outstanding = 0  # routed calls not yet finished, including ones queued on the client
+        self.healthy = True
+        self.checked_at = None
+
+    def payload(self, prompt) -> dict:
+        return {
+            "model": self.model,
+            "prompt": prompt,
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens
+        }
+
+    def signature(self):
+        return (self.model, self.temperature, self.max_tokens)
+
+    def stats(self):
+        return dict(
+            self.client.stats(),
+            name=self.name,
+            url=self.client.base_url,
+            model=self.model,
+            roles=list(self.roles),
+            weight=self.weight,
+            outstanding=self.outstanding,
+            healthy=self.healthy,
+        )
+
+
+class LLMRouter:
+    def __init__(self, app=None):
+        self.backends = []
+        self.health_interval = 0
+        self._lock = threading.Lock()
+        self._health_thread = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        specs = app.config["OLLAMA_BACKENDS"]
+        specs = json.loads(specs) if isinstance(specs, str) else specs
+        if not specs:
+            specs = [{"name": "default", "url": app.config["OLLAMA_API"]}]
+
+        backends = []
+        for i, spec in enumerate(specs):
+            client = LLMClient(
+                spec["url"].rstrip("/"),
+                timeout=app.config["OLLAMA_TIMEOUT"],
+                retries=app.config["OLLAMA_RETRIES"],
+                backoff=app.config["OLLAMA_RETRY_BACKOFF"],
+                queue_timeout=app.config["OLLAMA_QUEUE_TIMEOUT"],
+                max_in_flight=spec.get("max_in_flight", app.config["OLLAMA_MAX_IN_FLIGHT"]),
+                breaker_threshold=app.config["OLLAMA_BREAKER_THRESHOLD"],
+                breaker_reset=app.config["OLLAMA_BREAKER_RESET"],
+            )
+            backends.append(Backend(
+                spec.get("name", f"backend-{i}"),
+                client,
+                model=spec.get("model", DEFAULT_MODEL),
+                roles=spec.get("roles", ROLES),
+                weight=spec.get("weight", 1),
+                temperature=spec.get("temperature", DEFAULT_TEMPERATURE),
+                max_tokens=spec.get("max_tokens", DEFAULT_MAX_TOKENS),
+            ))
+        missing = [role for role in ROLES if not any(role in b.roles for b in backends)]
+        if missing:
+            raise ValueError(f"No AI backend configured for: {', '.join(missing)}")
+
+        self.backends = backends
+        self.health_interval = app.config["OLLAMA_HEALTH_INTERVAL"]
+        if self.health_interval > 0 and self._health_thread is None:
+            self._health_thread = threading.Thread(target=self._health_loop, name="llm-health", daemon=True)
+            self._health_thread.start()
+        app.extensions["llm_router"] = self
+
+    def signature(self, role):
+        """Models and sampling parameters that may answer a role, for cache keys."""
+        return sorted({b.signature() for b in self.backends if role in b.roles})
+
+    def pick(self, role):
+        candidates = [b for b in self.backends if role in b.roles]
+        if not candidates:
+            raise LLMUnavailableError(f"No AI backend serves '{role}' requests")
+        live = [b for b in candidates if b.healthy and b.client.breaker.state != "open"] or candidates
+        with self._lock:
+            backend = min(live, key=lambda b: ((b.outstanding + 1) / b.weight, random.random()))
+            backend.outstanding += 1
+        return backend
+
+    def release(self, backend, start):
+        with self._lock:
+            backend.outstanding -= 1
+        observe_llm(backend.name, time.perf_counter() - start)
+
+    def completion(self, prompt, role) -> dict:
+        backend = self.pick(role)
+        start = time.perf_counter()
+        try:
+            return backend.client.completion(backend.payload(prompt))
+        finally:
+            self.release(backend, start)
+
+    def stream_completion(self, prompt, role):
+        backend = self.pick(role)
+        start = time.perf_counter()
+        try:
+            yield from backend.client.stream_completion(backend.payload(prompt))
+        finally:
+            self.release(backend, start)
+
+    def check_health(self):
+        for backend in self.backends:
+            healthy = backend.client.ping()
+            if healthy != backend.healthy:
+                logger.warning("AI backend %s is now %s", backend.name, "healthy" if healthy else "unhealthy")
+            backend.healthy = healthy
+            backend.checked_at = time.time()
+
+    def stats(self):
+        return [backend.stats() for backend in self.backends]
+
+    def _health_loop(self):
+        while True:
+            time.sleep(self.health_interval)
+            try:
+                self.check_health()
+            except Exception:
+                logger.exception("AI backend health check failed")
+
+
+llm_router = LLMRouter()
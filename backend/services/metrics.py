@@ -0,0 +1,218 @@
+"""
+Request instrumentation and a Prometheus text-format /metrics endpoint.
+
+Each request records its wall time, SQL statement count and time (from
+SQLAlchemy cursor events), JSON serialization time (reported by the JSON
+providers in services/json_provider.py) and time spent waiting on the AI
+backends, as histograms labelled by route. Requests running more
+than METRICS_QUERY_WARN statements are logged, which makes N+1 regressions
+visible straight away. /metrics itself only exists when METRICS_TOKEN is
+set, and answers requests carrying it as a bearer token.
+
+With PROFILE_ENABLED set, a request carrying `X-Profile: 1` runs under
+cProfile and the stats are written to PROFILE_DIR; the file name is
+returned in the X-Profile-File response header. One request is profiled
+at a time (the profiler hooks the whole interpreter); another one asking
+while it runs gets 409.
+"""
+import cProfile
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+from flask import Response, g, has_request_context, jsonify, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from utils.decorators import metrics_token_required
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class Histogram:
+    """A labelled Prometheus histogram (cumulative buckets, sum and count)."""
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series = defaultdict(lambda: [[0] * len(buckets), 0.0, 0])  # label values -> [counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series[label_values]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def _stop_profile(self, exc=None):
+        """Disable this request's profiler, if any, and free the slot; also runs when the request raised."""
+        profiler = g.pop("profiler", None)
+        if profiler is not None:
+            profiler.disable()
+            self._profile_lock.release()
+        return profiler
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._series.items())
+        for label_values, (counts, total, count) in series:
+            labels = ",".join(f'{k}="{escape(v)}"' for k, v in zip(self.labels, label_values))
+            sep = "," if labels else ""
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append(f'{self.name}_bucket{{{labels}{sep}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{labels}{sep}le="+Inf"}} {count}')
+            suffix = f"{{{labels}}}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {total}")
+            lines.append(f"{self.name}_count{suffix} {count}")
+        return "\n".join(lines)
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "Request wall time.", ("method", "route", "status"))
+REQUEST_QUERIES = Histogram("http_request_sql_queries", "SQL statements per request.", ("method", "route"), COUNT_BUCKETS)
+REQUEST_SQL_SECONDS = Histogram("http_request_sql_seconds", "Time in SQL statements per request.", ("method", "route"))
+REQUEST_JSON_SECONDS = Histogram("http_request_json_seconds", "Time serializing JSON per request.", ("method", "route"))
+REQUEST_LLM_SECONDS = Histogram("http_request_llm_seconds", "Time waiting on AI backends per request.", ("method", "route"))
+SQL_SECONDS = Histogram("db_query_duration_seconds", "Duration of each SQL statement.")
+LLM_SECONDS = Histogram("llm_request_duration_seconds", "Duration of each AI backend call.", ("backend",))
+HISTOGRAMS = (REQUEST_SECONDS, REQUEST_QUERIES, REQUEST_SQL_SECONDS, REQUEST_JSON_SECONDS,
+              REQUEST_LLM_SECONDS, SQL_SECONDS, LLM_SECONDS)
+
+
+def add_to_request(name, seconds, count=0):
+    """Accumulate a timing on the current request, if there is one."""
+    if has_request_context() and "metrics" in g:
+        stats = g.metrics
+        stats[name] += seconds
+        stats[name + "_count"] += count
+
+
+def observe_llm(backend, seconds):
+    LLM_SECONDS.observe(seconds, backend)
+    add_to_request("llm", seconds)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    SQL_SECONDS.observe(elapsed)
+    add_to_request("sql", elapsed, 1)
+
+
+def _handle_error(context):
+    # a failed statement never reaches after_cursor_execute; drop its start time here
+    starts = context.connection.info.get("query_start") if context.connection is not None else None
+    if starts:
+        elapsed = time.perf_counter() - starts.pop()
+        SQL_SECONDS.observe(elapsed)
+        add_to_request("sql", elapsed, 1)
+
+
+class Metrics:
+    def __init__(self, app=None):
+        self.enabled = False
+        self.query_warn = 0
+        self.profile_dir = None
+        self.token = None
+        self._profile_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config["METRICS_ENABLED"]
+        self.query_warn = app.config["METRICS_QUERY_WARN"]
+        self.token = app.config["METRICS_TOKEN"]
+        self.profile_dir = app.config["PROFILE_DIR"] if app.config["PROFILE_ENABLED"] else None
+        app.extensions["metrics"] = self
+        if not self.enabled:
+            return
+
+        if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+            event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+            event.listen(Engine, "handle_error", _handle_error)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._stop_profile)
+        # per-route traffic is nobody's business without a token
+        if self.token:
+            app.add_url_rule("/metrics", "metrics", self.render_endpoint)
+        else:
+            logger.debug("METRICS_TOKEN is not set, /metrics is disabled")
+
+    def _start(self):
+        g.metrics = defaultdict(float, start=time.perf_counter())
+        if self.profile_dir and request.headers.get("X-Profile") == "1":
+            if not self._profile_lock.acquire(blocking=False):
+                return jsonify({"error": "Another request is being profiled, try again shortly"}), 409
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+    def _finish(self, response):
+        stats = g.pop("metrics", None)
+        if stats is None:
+            return response
+        elapsed = time.perf_counter() - stats["start"]
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        REQUEST_SECONDS.observe(elapsed, request.method, route, str(response.status_code))
+        REQUEST_QUERIES.observe(stats["sql_count"], request.method, route)
+        REQUEST_SQL_SECONDS.observe(stats["sql"], request.method, route)
+        REQUEST_JSON_SECONDS.observe(stats["json"], request.method, route)
+        REQUEST_LLM_SECONDS.observe(stats["llm"], request.method, route)
+        logger.debug("REQUEST: %s %s %d %.1fms", request.method, request.path, response.status_code, elapsed * 1000)
+        if self.query_warn and stats["sql_count"] > self.query_warn:
+            logger.warning("%s %s ran %d SQL statements", request.method, request.path, stats["sql_count"])
+
+        profiler = self._stop_profile()
+        if profiler is not None:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            slug = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+            name = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}-{request.method}-{slug}.prof"
+            profiler.dump_stats(os.path.join(self.profile_dir, name))
+            response.headers["X-Profile-File"] = name
+
+        response.headers["Server-Timing"] = (
+            f"app;dur={elapsed * 1000:.1f}, db;dur={stats['sql'] * 1000:.1f}, "
+            f"json;dur={stats['json'] * 1000:.1f}, llm;dur={stats['llm'] * 1000:.1f}"
+        )
+        return response
+
+    def _stop_profile(self, exc=None):
+        """Disable this request's profiler, if any, and free the slot; also runs when the request raised."""
+        profiler = g.pop("profiler", None)
+        if profiler is not None:
+            profiler.disable()
+            self._profile_lock.release()
+        return profiler
+
+    def render(self):
+        return "\n".join(h.render() for h in HISTOGRAMS) + "\n"
+
+    @metrics_token_required
+    def render_endpoint(self):
+        return Response(self.render(), mimetype="text/plain; version=0.0.4")
+
+
+metrics = Metrics()
@@ -0,0 +1,219 @@
+"""
+Sibling ordering with fractional rank keys (LexoRank style).
+
+A rank is a base-36 fraction written as a string of digits 0-9a-z without
+trailing zeros, so plain string comparison matches numeric order in every
+collation. Inserting or moving a task only computes a key between its new
+neighbours and writes that one row. Keys that grow past RANK_MAX_LENGTH
+trigger a background pass that respaces the sibling group; it publishes
+the new ranks as "task.updated" events, since clients order by them.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import update
+
+from models import db, Goal, Task
+from services.changefeed import change, change_feed
+from services.versioning import bump_goal
+
+logger = logging.getLogger(__name__)
+
+DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+BASE = len(DIGITS)
+STEP_DEPTH = 3  # appends/prepends step by 36**-3, leaving ~23k slots each way from "i"
+INITIAL_RANK = "i"
+
+
+def _to_int(key, width):
+    value = 0
+    for ch in key.ljust(width, "0"):
+        value = value * BASE + DIGITS.index(ch)
+    return value
+
+
+def _to_key(value, width):
+    chars = []
+    for _ in range(width):
+        value, digit = divmod(value, BASE)
+        chars.append(DIGITS[digit])
+    return "".join(reversed(chars)).rstrip("0")
+
+
+def rank_between(before, after):
+    """Return a key strictly between two keys; None means an open end."""
+    if before is not None and after is not None and before >= after:
+        raise ValueError(f"Invalid rank interval: {before!r} >= {after!r}")
+    before = before or ""
+    result = []
+    i = 0
+    while True:
+        low = DIGITS.index(before[i]) if i < len(before) else 0
+        high = DIGITS.index(after[i]) if after is not None and i < len(after) else BASE
+        if low == high:
+            result.append(DIGITS[low])
+        else:
+            mid = (low + high) // 2
+            if mid > low:
+                result.append(DIGITS[mid])
+                return "".join(result)
+            # adjacent digits: keep `low` here; everything below `after` is free past this prefix
+            result.append(DIGITS[low])
+            after = None
+        i += 1
+
+
+def rank_after(key):
+    """Key for appending after `key`, stepping a fixed amount so repeated appends stay short."""
+    if key is None:
+        return INITIAL_RANK
+    width = max(len(key), STEP_DEPTH)
+    value = _to_int(key, width) + BASE ** (width - STEP_DEPTH)
+    if value >= BASE ** width:
+        return rank_between(key, None)
+    return _to_key(value, width)
+
+
+def rank_before(key):
+    """Key for prepending before `key`."""
+    if key is None:
+        return INITIAL_RANK
+    width = max(len(key), STEP_DEPTH)
+    value = _to_int(key, width) - BASE ** (width - STEP_DEPTH)
+    if value <= 0:
+        return rank_between(None, key)
+    return _to_key(value, width)
+
+
+def spaced_ranks(count):
+    """Evenly spaced keys for `count` items, used when respacing a sibling group."""
+    width = 1
+    while BASE ** width < (count + 1) * BASE:
+        width += 1
+    step = BASE ** width // (count + 1)
+    return [_to_key(step * (i + 1), width) for i in range(count)]
+
+
+def sibling_filter(goal_id, parent_id):
+    return (Task.goal_id == goal_id, Task.parent_id == parent_id)
+
+
+def last_rank(goal_id, parent_id):
+    """Largest rank among siblings: a single index seek on (goal_id, parent_id, rank)."""
+    return db.session.scalar(db.select(db.func.max(Task.rank)).where(*sibling_filter(goal_id, parent_id)))
+
+
+def append_ranks(goal_id, parent_id, count):
+    ranks = []
+    rank = last_rank(goal_id, parent_id)
+    for _ in range(count):
+        rank = rank_after(rank)
+        ranks.append(rank)
+    return ranks
+
+
+def neighbour_rank(task, before, exclude_id=None):
+    """Rank of the sibling immediately before (or after) `task`, or None at the ends."""
+    siblings = sibling_filter(task.goal_id, task.parent_id) + (Task.id != exclude_id,)
+    if before:
+        query = db.select(db.func.max(Task.rank)).where(*siblings, Task.rank < task.rank)
+    else:
+        query = db.select(db.func.min(Task.rank)).where(*siblings, Task.rank > task.rank)
+    return db.session.scalar(query)
+
+
+def move_task(task, anchor, position):
+    """
+    Place `task` immediately before or after `anchor`, adopting the anchor's parent.
+    Only `task`'s row changes. Raises ValueError for moves that are not allowed.
+    """
+    if position not in ("before", "after"):
+        raise ValueError("'position' must be 'before' or 'after'")
+    if anchor.id == task.id:
+        raise ValueError("Cannot move a task relative to itself")
+    if anchor.goal_id != task.goal_id:
+        raise ValueError("Cannot move a task to another goal")
+
+    # the new parent must not be the task itself or one of its descendants
+    ancestor_id = anchor.parent_id
+    while ancestor_id is not None:
+        if ancestor_id == task.id:
+            raise ValueError("Cannot move a task inside its own subtree")
+        ancestor_id = db.session.scalar(db.select(Task.parent_id).where(Task.id == ancestor_id))
+
+    if anchor.rank is None:
+        # rows created before ranks existed: give the group keys first
+        rebalance(anchor.goal_id, anchor.parent_id)
+        db.session.refresh(anchor)
+        db.session.refresh(task)
+
+    neighbour = neighbour_rank(anchor, before=(position == "before"), exclude_id=task.id)
+    task.parent_id = anchor.parent_id
+    if position == "before":
+        task.rank = rank_before(anchor.rank) if neighbour is None else rank_between(neighbour, anchor.rank)
+    else:
+        task.rank = rank_after(anchor.rank) if neighbour is None else rank_between(anchor.rank, neighbour)
+    return task.rank
+
+
+def rebalance(goal_id, parent_id):
+    """Respace every sibling in one group with short, evenly spaced keys. Returns {task id: new rank}."""
+    ids = db.session.scalars(
+        db.select(Task.id)
+        .where(*sibling_filter(goal_id, parent_id))
+        .order_by(Task.rank, Task.id)
+    ).all()
+    ranks = dict(zip(ids, spaced_ranks(len(ids))))
+    if ranks:
+        db.session.execute(update(Task), [{"id": task_id, "rank": rank} for task_id, rank in ranks.items()])
+    return ranks
+
+
+class Rebalancer:
+    """Runs rebalance passes on a single background thread, one per sibling group at a time."""
+
+    def __init__(self, app=None):
+        self.app = None
+        self.max_length = 16
+        self._executor = None
+        self._pending = set()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.max_length = app.config["RANK_MAX_LENGTH"]
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rank-rebalance")
+        app.extensions["rebalancer"] = self
+
+    def check(self, goal_id, parent_id, *ranks):
+        """Schedule a rebalance if any of the given keys is too long."""
+        if self._executor is None or all(r is None or len(r) <= self.max_length for r in ranks):
+            return
+        group = (goal_id, parent_id)
+        if group in self._pending:
+            return
+        self._pending.add(group)
+        self._executor.submit(self._run, group)
+
+    def _run(self, group):
+        try:
+            with self.app.app_context():
+                goal_id = group[0]
+                ranks = rebalance(*group)
+                bump_goal(goal_id)
+                user_id = db.session.scalar(db.select(Goal.user_id).where(Goal.id == goal_id))
+                db.session.commit()
+                # feed clients hold the old keys; later move deltas would misplace tasks among them
+                change_feed.publish(user_id, *(
+                    change("task.updated", goal_id=goal_id, id=task_id, changes={"rank": rank})
+                    for task_id, rank in ranks.items()
+                ))
+                logger.info("Rebalanced %d ranks for goal %s parent %s", len(ranks), *group)
+        except Exception:
+            logger.exception("Rank rebalance failed for goal %s parent %s", *group)
+        finally:
+            self._pending.discard(group)
+
+
+rebalancer = Rebalancer()
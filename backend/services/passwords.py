@@ -0,0 +1,104 @@
+"""
+Password hashing with parameters from Config.
+
+PASSWORD_HASH_METHOD and PASSWORD_SALT_LENGTH are handed to Werkzeug; a
+stored hash made with other parameters is replaced on the user's next
+successful login. With PASSWORD_HASH_WORKERS > 0 hashing runs in a process
+pool, so a login burst occupies at most that many cores and the request
+threads wait without holding the GIL. At most PASSWORD_HASH_MAX_PENDING
+hashes may wait for the pool; past that HasherBusyError is raised and the
+caller answers 503 instead of queueing logins behind each other.
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HasherBusyError(RuntimeError):
+    pass
+
+
+class PasswordHasher:
+    def __init__(self, app=None):
+        self.method = "scrypt"
+        self.salt_length = 16
+        self.workers = 0
+        self.max_pending = 0
+        self.timeout = None
+        self._params = None
+        self._executor = None
+        self._pid = None
+        self._slots = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.method = app.config["PASSWORD_HASH_METHOD"]
+        self.salt_length = app.config["PASSWORD_SALT_LENGTH"]
+        self.workers = app.config["PASSWORD_HASH_WORKERS"]
+        self.max_pending = app.config["PASSWORD_HASH_MAX_PENDING"] or self.workers * 4
+        self.timeout = app.config["PASSWORD_HASH_TIMEOUT"]
+        self._params = None
+        self._shutdown()
+        app.extensions["password_hasher"] = self
+
+    def hash(self, password: str) -> str:
+        return self._run(generate_password_hash, password, self.method, self.salt_length)
+
+    def verify(self, password_hash: str, password: str) -> bool:
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """True when the hash was made with other parameters than the configured ones."""
+        method, _, rest = password_hash.partition("$")
+        salt = rest.partition("$")[0]
+        return (method, len(salt)) != self.params()
+
+    def params(self):
+        """(full method string, salt length) of a hash made now, e.g. ("scrypt:32768:8:1", 16)."""
+        if self._params is None:
+            # Werkzeug fills in default cost parameters, so read them back from a real hash
+            method, _, rest = generate_password_hash("", self.method, self.salt_length).partition("$")
+            self._params = (method, len(rest.partition("$")[0]))
+        return self._params
+
+    def stats(self):
+        return {
+            "method": self.method,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+        }
+
+    def _run(self, fn, *args):
+        if self.workers <= 0:
+            return fn(*args)
+        executor, slots = self._pool()
+        if not slots.acquire(blocking=False):
+            raise HasherBusyError("Too many sign-ins in progress, try again shortly")
+        try:
+            return executor.submit(fn, *args).result(timeout=self.timeout)
+        except FutureTimeout:
+            raise HasherBusyError("Password hashing timed out, try again shortly") from None
+        finally:
+            slots.release()
+
+    def _pool(self):
+        # created on first use in each process, so gunicorn workers never share a pool forked from the master
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                self._slots = threading.BoundedSemaphore(self.max_pending)
+                self._pid = os.getpid()
+            return self._executor, self._slots
+
+    def _shutdown(self):
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
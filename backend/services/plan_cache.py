@@ -0,0 +1,151 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def plan_cache_key(model: str, prompt: str, **params) -> str:
+    """Content address for a completion: hash of model, prompt and sampling parameters."""
+    payload = json.dumps({"model": model, "prompt": prompt, "params": params}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class PlanCache:
+    """
+    LRU + TTL cache of parsed AI plans (lists of plain task dicts).
+    When PLAN_CACHE_PATH is set, entries are also written to a SQLite file
+    so they survive restarts; memory misses fall back to that tier. The file
+    is bounded like memory: every write drops expired rows and the oldest
+    rows beyond PLAN_CACHE_SIZE.
+    """
+
+    def __init__(self, app=None):
+        self.max_entries = 0
+        self.ttl = 0
+        self._entries = OrderedDict()  # key -> (expires_at, tasks)
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+        self.expirations = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.max_entries = app.config["PLAN_CACHE_SIZE"]
+        self.ttl = app.config["PLAN_CACHE_TTL"]
+        path = app.config["PLAN_CACHE_PATH"]
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS plan_cache "
+                "(key TEXT PRIMARY KEY, tasks TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS ix_plan_cache_expires_at ON plan_cache (expires_at)")
+            self._trim_persistent(time.time())
+            self._db.commit()
+        app.extensions["plan_cache"] = self
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, tasks = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return tasks
+                del self._entries[key]
+                self.expirations += 1
+
+            tasks = self._get_persistent(key, now)
+            if tasks is not None:
+                self.disk_hits += 1
+                self._store(key, tasks, now)
+                return tasks
+
+            self.misses += 1
+            return None
+
+    def set(self, key, tasks):
+        # an empty plan is a failed or unparseable answer, not worth serving again
+        if not self.enabled or not tasks:
+            return
+        now = time.time()
+        with self._lock:
+            self._store(key, tasks, now)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO plan_cache (key, tasks, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(tasks), now + self.ttl),
+                )
+                self._trim_persistent(now)
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "persistent": self._db is not None,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "disk_evictions": self.disk_evictions,
+                "expirations": self.expirations,
+            }
+
+    def _store(self, key, tasks, now):
+        self._entries[key] = (now + self.ttl, tasks)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _trim_persistent(self, now):
+        self.expirations += self._db.execute("DELETE FROM plan_cache WHERE expires_at <= ?", (now,)).rowcount
+        # every entry lives for the same TTL, so the earliest to expire is the oldest
+        self.disk_evictions += self._db.execute(
+            "DELETE FROM plan_cache WHERE key IN "
+            "(SELECT key FROM plan_cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        ).rowcount
+
+    def _get_persistent(self, key, now):
+        if self._db is None:
+            return None
+        row = self._db.execute(
+            "SELECT tasks, expires_at FROM plan_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[1] <= now:
+            self._db.execute("DELETE FROM plan_cache WHERE key = ?", (key,))
+            self._db.commit()
+            self.expirations += 1
+            return None
+        try:
+            return json.loads(row[0])
+        except ValueError:
+            logger.warning("Discarding unreadable plan cache entry %s", key)
+            return None
+
+
+plan_cache = PlanCache()
@@ -0,0 +1,99 @@
+"""
+Bulk persistence for generated plans.
+
+A plan is a list of {"title", "description"} dicts, each optionally with
+nested "subtasks". Every level of the tree is written with one multi-row
+INSERT ... RETURNING id, created_at (the ids of a level are the parent ids
+of the next), and the response is built from the inserted values, so no
+row is refreshed or lazily loaded afterwards.
+"""
+from models import db, Task
+from services.ordering import append_ranks, spaced_ranks
+
+RETURNED = (Task.id, Task.created_at, Task.parent_id, Task.order_idx)
+
+
+def _returning_rows(rows):
+    """(id, created_at) for each inserted row, in order."""
+    if db.session.get_bind().dialect.insert_executemany_returning:
+        # rows come back in any order (asking for parameter order makes some
+        # dialects insert one row per statement), so match them on (parent_id, order_idx)
+        returned = db.session.execute(db.insert(Task).returning(*RETURNED), rows).all()
+    else:
+        ids = [db.session.execute(db.insert(Task), row).inserted_primary_key[0] for row in rows]
+        returned = db.session.execute(db.select(*RETURNED).where(Task.id.in_(ids))).all()
+    by_position = {(parent_id, order_idx): (task_id, created_at) for task_id, created_at, parent_id, order_idx in returned}
+    return [by_position[row["parent_id"], row["order_idx"]] for row in rows]
+
+
+def insert_rows(rows: list[dict]) -> list[dict]:
+    """
+    Insert task rows and return them shaped like Task.to_dict() of a new
+    task. No two rows may share the same (parent_id, order_idx).
+    """
+    if not rows:
+        return []
+    return [
+        {
+            "id": task_id,
+            "title": row["title"],
+            "description": row["description"],
+            "goal_id": row["goal_id"],
+            "parent_id": row["parent_id"],
+            "created_at": created_at.isoformat(),
+            "order_idx": row["order_idx"],
+            "rank": row["rank"],
+            "status": row["status"],
+            "total_count": row["total_count"],
+            "done_count": 0,
+            "archived_count": 0,
+            "subtasks": [],
+        }
+        for row, (task_id, created_at) in zip(rows, _returning_rows(rows))
+    ]
+
+
+def plan_size(plan: list[dict]) -> int:
+    """Number of tasks in a plan, nested subtasks included."""
+    return sum(1 + plan_size(item.get("subtasks") or []) for item in plan)
+
+
+def task_row(item, goal_id, parent_id, order_idx, rank):
+    return {
+        "title": item["title"],
+        "description": item["description"],
+        "goal_id": goal_id,
+        "parent_id": parent_id,
+        "order_idx": order_idx,
+        "rank": rank,
+        "status": "active",
+        "total_count": plan_size(item.get("subtasks") or []),
+    }
+
+
+def insert_plan(goal_id, parent_id, plan: list[dict]) -> list[dict]:
+    """
+    Insert a plan, nested subtasks included, after the existing children of
+    parent_id. Returns the top-level task dicts with their "subtasks" filled
+    in. The caller updates the rollups, bumps the goal version and commits.
+    """
+    result = []
+    level = [(parent_id, plan, result)]  # (parent id, plan items, list to fill)
+    top = True
+    while level:
+        rows, targets = [], []
+        for parent, items, out in level:
+            # new parents have no children yet, so their ranks need no lookup
+            ranks = append_ranks(goal_id, parent, len(items)) if top else spaced_ranks(len(items))
+            for idx, (item, rank) in enumerate(zip(items, ranks)):
+                rows.append(task_row(item, goal_id, parent, idx, rank))
+                targets.append((item, out))
+
+        next_level = []
+        for task, (item, out) in zip(insert_rows(rows), targets):
+            out.append(task)
+            if item.get("subtasks"):
+                next_level.append((task["id"], item["subtasks"], task["subtasks"]))
+        level = next_level
+        top = False
+    return result
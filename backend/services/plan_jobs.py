@@ -0,0 +1,106 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(RuntimeError):
+    pass
+
+
+class PlanJob:
+    """A single background plan generation and its outcome."""
+
+    def __init__(self, user_id):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.status = "queued"  # queued, running, done, failed
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self._done = threading.Event()
+
+    def wait(self, timeout):
+        return self._done.wait(timeout)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "tasks": self.result,
+            "error": self.error,
+        }
+
+
+class PlanJobQueue:
+    """
+    Bounded thread pool for AI plan generation.
+    Each job runs inside its own app context so it gets a fresh db session.
+    Finished jobs are kept for AI_JOB_TTL seconds so clients can collect them.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._executor = None
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._slots = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.ttl = app.config["AI_JOB_TTL"]
+        self._executor = ThreadPoolExecutor(
+            max_workers=app.config["AI_JOB_WORKERS"],
+            thread_name_prefix="plan-job",
+        )
+        self._slots = threading.BoundedSemaphore(app.config["AI_JOB_MAX_PENDING"])
+        app.extensions["plan_jobs"] = self
+
+    def submit(self, user_id, fn, *args, **kwargs) -> PlanJob:
+        """Queue fn(*args, **kwargs) to run in the background; raise QueueFullError when saturated."""
+        if not self._slots.acquire(blocking=False):
+            raise QueueFullError("Too many plan generations in progress, try again shortly")
+
+        job = PlanJob(user_id)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job, fn, args, kwargs):
+        job.status = "running"
+        try:
+            with self.app.app_context():
+                job.result = fn(*args, **kwargs)
+            job.status = "done"
+        except Exception as e:
+            logger.exception("Plan job %s failed", job.id)
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+            self._slots.release()
+            job._done.set()
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+plan_jobs = PlanJobQueue()
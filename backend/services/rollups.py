@@ -0,0 +1,201 @@
+"""
+Materialized progress counts.
+
+Goals and tasks carry total_count, done_count and archived_count: a goal's
+over all of its tasks, a task's over its descendants (itself excluded).
+Every route that creates, re-statuses, moves or deletes tasks calls
+add_counts() in its own transaction. It adds the deltas to the goal and to
+the changed node and its ancestors, found with one recursive CTE, and bumps
+the owners' goal-list versions so cached goal lists pick the counts up.
+check_rollups() and rebuild_rollups() recompute everything (or the given
+goals) with one aggregate query per table; fill_rollups() stores them for
+goals whose tasks were bulk-inserted with zero counts.
+"""
+from collections import defaultdict
+
+from sqlalchemy import bindparam, case
+from sqlalchemy.orm import aliased
+
+from models import db, Goal, Task, User
+from services.versioning import bump_goal
+
+COUNTS = ("total_count", "done_count", "archived_count")
+SET_CHUNK_SIZE = 1000  # rows per executemany when storing recomputed counts
+
+
+def status_counts(status, n=1):
+    """The (total, done, archived) deltas of n tasks with this status."""
+    return (n, n if status == "done" else 0, n if status == "archived" else 0)
+
+
+def status_change(old, new):
+    """The deltas of one task changing status from old to new."""
+    return tuple(b - a for a, b in zip(status_counts(old), status_counts(new)))
+
+
+def subtree_counts(task, sign=1):
+    """The deltas of a whole subtree: the task itself plus its stored counts."""
+    own = status_counts(task.status)
+    return tuple(sign * (o + (getattr(task, c) or 0)) for o, c in zip(own, COUNTS))
+
+
+def ancestor_pairs(task_ids):
+    """(start id, id) for every task in task_ids and each of its ancestors, the start included."""
+    chain = (
+        db.select(Task.id.label("start"), Task.id, Task.parent_id)
+        .where(Task.id.in_(task_ids))
+        .cte("chain", recursive=True)
+    )
+    chain = chain.union_all(
+        db.select(chain.c.start, Task.id, Task.parent_id).where(Task.id == chain.c.parent_id)
+    )
+    return db.session.execute(db.select(chain.c.start, chain.c.id)).all()
+
+
+def add_counts(changes):
+    """
+    Apply count deltas. `changes` holds (goal_id, parent_id, deltas) with
+    deltas a (total, done, archived) tuple; parent_id is the task whose
+    descendants changed, or None for changes at the top level of the goal.
+    """
+    goal_deltas = defaultdict(lambda: [0, 0, 0])
+    start_deltas = defaultdict(lambda: [0, 0, 0])
+    for goal_id, parent_id, deltas in changes:
+        _add(goal_deltas[goal_id], deltas)
+        if parent_id is not None:
+            _add(start_deltas[parent_id], deltas)
+
+    task_deltas = defaultdict(lambda: [0, 0, 0])
+    starts = [task_id for task_id, deltas in start_deltas.items() if any(deltas)]
+    if starts:
+        for start, task_id in ancestor_pairs(starts):
+            _add(task_deltas[task_id], start_deltas[start])
+
+    _add_to_rows(Task, task_deltas)
+    if _add_to_rows(Goal, goal_deltas):
+        bump_goal_lists([goal_id for goal_id, deltas in goal_deltas.items() if any(deltas)])
+
+
+def bump_goal_lists(goal_ids):
+    """Invalidate the goal lists of the users owning these goals."""
+    db.session.execute(
+        db.update(User)
+        .where(User.id.in_(db.select(Goal.user_id).where(Goal.id.in_(goal_ids))))
+        .values(goals_version=User.goals_version + 1)
+    )
+
+
+def _add(into, deltas):
+    for i, d in enumerate(deltas):
+        into[i] += d
+
+
+def _add_to_rows(model, deltas):
+    params = [
+        {"row_id": row_id, "d_total": d[0], "d_done": d[1], "d_archived": d[2]}
+        for row_id, d in deltas.items() if any(d)
+    ]
+    if params:
+        table = model.__table__
+        db.session.execute(
+            table.update().where(table.c.id == bindparam("row_id")).values(
+                total_count=table.c.total_count + bindparam("d_total"),
+                done_count=table.c.done_count + bindparam("d_done"),
+                archived_count=table.c.archived_count + bindparam("d_archived"),
+            ),
+            params,
+        )
+    return len(params)
+
+
+def computed_counts(goal_ids=None):
+    """
+    (goal counts, task counts), each {id: (total, done, archived)}, recomputed
+    from the task rows; rows without tasks below them are left out.
+    """
+    filters = [] if goal_ids is None else [Task.goal_id.in_(goal_ids)]
+
+    def sums(status):
+        return (
+            db.func.count(),
+            db.func.sum(case((status == "done", 1), else_=0)),
+            db.func.sum(case((status == "archived", 1), else_=0)),
+        )
+
+    goals = db.session.execute(db.select(Task.goal_id, *sums(Task.status)).where(*filters).group_by(Task.goal_id)).all()
+
+    # (ancestor, descendant) for every pair in every tree
+    closure = (
+        db.select(Task.parent_id.label("ancestor"), Task.id.label("descendant"))
+        .where(Task.parent_id.is_not(None), *filters)
+        .cte("closure", recursive=True)
+    )
+    parent = aliased(Task)
+    closure = closure.union_all(
+        db.select(parent.parent_id, closure.c.descendant)
+        .where(parent.id == closure.c.ancestor, parent.parent_id.is_not(None))
+    )
+    descendant = aliased(Task)
+    tasks = db.session.execute(
+        db.select(closure.c.ancestor, *sums(descendant.status))
+        .join(descendant, descendant.id == closure.c.descendant)
+        .group_by(closure.c.ancestor)
+    ).all()
+
+    def as_dict(rows):
+        return {row_id: (int(total), int(done), int(archived)) for row_id, total, done, archived in rows}
+
+    return as_dict(goals), as_dict(tasks)
+
+
+def check_rollups(goal_ids=None):
+    """Rows whose stored counts are wrong, as (model, id, goal_id, stored, expected)."""
+    goals, tasks = computed_counts(goal_ids)
+    wrong = []
+    for model, expected, goal_column in ((Goal, goals, Goal.id), (Task, tasks, Task.goal_id)):
+        filters = [] if goal_ids is None else [goal_column.in_(goal_ids)]
+        rows = db.session.execute(db.select(model.id, goal_column, *(getattr(model, c) for c in COUNTS)).where(*filters))
+        for row_id, goal_id, *stored in rows:
+            want = expected.get(row_id, (0, 0, 0))
+            if tuple(stored) != want:
+                wrong.append((model, row_id, goal_id, tuple(stored), want))
+    return wrong
+
+
+def rebuild_rollups(goal_ids=None):
+    """Recompute every count (or those of the given goals) and store the ones that were wrong. Returns the number fixed."""
+    wrong = check_rollups(goal_ids)
+    for model in (Goal, Task):
+        _set_rows(model, {row_id: want for m, row_id, _, _, want in wrong if m is model})
+    goal_ids = {goal_id for _, _, goal_id, _, _ in wrong}
+    if goal_ids:
+        bump_goal(*goal_ids)
+        bump_goal_lists(goal_ids)
+    db.session.commit()
+    return len(wrong)
+
+
+def fill_rollups(goal_ids):
+    """
+    Store the counts of goals whose tasks were all inserted with zero counts
+    (bulk imports): only rows with tasks below them need writing. The caller
+    commits.
+    """
+    goals, tasks = computed_counts(goal_ids)
+    _set_rows(Task, tasks)
+    _set_rows(Goal, goals)
+
+
+def _set_rows(model, counts):
+    table = model.__table__
+    statement = table.update().where(table.c.id == bindparam("row_id")).values(
+        total_count=bindparam("n_total"),
+        done_count=bindparam("n_done"),
+        archived_count=bindparam("n_archived"),
+    )
+    items = list(counts.items())
+    for start in range(0, len(items), SET_CHUNK_SIZE):
+        db.session.execute(statement, [
+            {"row_id": row_id, "n_total": want[0], "n_done": want[1], "n_archived": want[2]}
+            for row_id, want in items[start:start + SET_CHUNK_SIZE]
+        ])
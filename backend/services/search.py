@@ -0,0 +1,223 @@
+"""
+Full-text search over a user's goals and tasks.
+
+SQLite: one FTS5 table, search_index, holds every goal title and task
+title/description. Rowids are user_id * 2**33 + 2 * id for tasks and
++ 2 * id + 1 for goals, so each user's entries form one rowid range and a
+search seeks straight to it: its cost depends on the user's own data, not
+on how often a word occurs across everyone's. Triggers on goal and task
+keep the index in sync with every write, the bulk Core inserts and
+set-based deletes included; a batch migration that recreates either
+table drops those triggers and has to create them again.
+
+Postgres: GIN indexes on the tsvector expressions of goal and task; the
+queries below repeat the same expressions so the planner can use them.
+
+Every term must occur; the last one is matched as a prefix, since that is
+the word still being typed (a prefix is looked up across the whole index,
+an exact term seeks to the user's range). Results are ordered by relevance,
+with title matches weighted above description matches.
+"""
+import re
+
+from sqlalchemy import event, literal_column, text
+
+from models import db, Goal, Task
+
+MAX_TERMS = 8
+USER_SPAN = 2 ** 33  # rowids per user: task and goal ids below 2**32
+
+SQLITE_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+        title, body, goal_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS task_search_insert AFTER INSERT ON task BEGIN
+        INSERT INTO search_index (rowid, title, body, goal_id)
+        SELECT goal.user_id * {USER_SPAN} + 2 * new.id, new.title, coalesce(new.description, ''), new.goal_id
+        FROM goal WHERE goal.id = new.goal_id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS task_search_update AFTER UPDATE OF title, description, goal_id ON task BEGIN
+        DELETE FROM search_index
+        WHERE rowid = (SELECT goal.user_id * {USER_SPAN} + 2 * old.id FROM goal WHERE goal.id = old.goal_id);
+        INSERT INTO search_index (rowid, title, body, goal_id)
+        SELECT goal.user_id * {USER_SPAN} + 2 * new.id, new.title, coalesce(new.description, ''), new.goal_id
+        FROM goal WHERE goal.id = new.goal_id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS task_search_delete AFTER DELETE ON task BEGIN
+        DELETE FROM search_index
+        WHERE rowid = (SELECT goal.user_id * {USER_SPAN} + 2 * old.id FROM goal WHERE goal.id = old.goal_id);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS goal_search_insert AFTER INSERT ON goal BEGIN
+        INSERT INTO search_index (rowid, title, body, goal_id)
+        VALUES (new.user_id * {USER_SPAN} + 2 * new.id + 1, new.title, '', new.id);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS goal_search_update AFTER UPDATE OF title ON goal BEGIN
+        UPDATE search_index SET title = new.title WHERE rowid = new.user_id * {USER_SPAN} + 2 * new.id + 1;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS goal_search_delete AFTER DELETE ON goal BEGIN
+        DELETE FROM search_index WHERE rowid = old.user_id * {USER_SPAN} + 2 * old.id + 1;
+    END""",
+]
+
+SQLITE_FILL = [
+    f"""INSERT INTO search_index (rowid, title, body, goal_id)
+       SELECT user_id * {USER_SPAN} + 2 * id + 1, title, '', id FROM goal""",
+    f"""INSERT INTO search_index (rowid, title, body, goal_id)
+       SELECT goal.user_id * {USER_SPAN} + 2 * task.id, task.title, coalesce(task.description, ''), task.goal_id
+       FROM task JOIN goal ON goal.id = task.goal_id
+       ORDER BY 1""",
+]
+
+
+# the indexed expressions; queries must spell them the same way to use the indexes
+def task_vector(table=""):
+    prefix = f"{table}." if table else ""
+    return (
+        f"setweight(to_tsvector('simple', coalesce({prefix}title, '')), 'A') || "
+        f"setweight(to_tsvector('simple', coalesce({prefix}description, '')), 'B')"
+    )
+
+
+def goal_vector(table=""):
+    prefix = f"{table}." if table else ""
+    return f"setweight(to_tsvector('simple', coalesce({prefix}title, '')), 'A')"
+
+
+POSTGRES_DDL = [
+    f"CREATE INDEX IF NOT EXISTS ix_task_search ON task USING gin (({task_vector()}))",
+    f"CREATE INDEX IF NOT EXISTS ix_goal_search ON goal USING gin (({goal_vector()}))",
+]
+
+
+def search_terms(query):
+    """The words of a search string, lowercased; at most MAX_TERMS."""
+    return re.findall(r"\w+", query.lower())[:MAX_TERMS]
+
+
+def _dialect():
+    return db.session.get_bind().dialect.name
+
+
+def search(user_id, terms, kinds=("goal", "task"), limit=20, offset=0):
+    """
+    One page of matches as dicts, best first: {"type", "id", "goal_id",
+    "title", "score"} plus "parent_id" and "status" for tasks. Goals that
+    are being deleted in the background are left out.
+    """
+    if _dialect() == "postgresql":
+        hits = _postgres_hits(user_id, terms, kinds, limit, offset)
+    else:
+        hits = _sqlite_hits(user_id, terms, kinds, limit, offset)
+    return _load_items(hits)
+
+
+def _sqlite_hits(user_id, terms, kinds, limit, offset):
+    filters = ["rowid BETWEEN :first AND :last"]
+    if tuple(kinds) == ("task",):
+        filters.append("rowid % 2 = 0")
+    elif tuple(kinds) == ("goal",):
+        filters.append("rowid % 2 = 1")
+    # reading goal_id loads each match's stored row, so only filter when there is something to filter
+    deleted = db.session.scalars(
+        db.select(Goal.id).where(Goal.user_id == user_id, Goal.deleted_at.is_not(None))
+    ).all()
+    if deleted:
+        filters.append(f"goal_id NOT IN ({', '.join(str(int(goal_id)) for goal_id in deleted)})")
+    rows = db.session.execute(text(f"""
+        SELECT rowid, bm25(search_index, 10.0, 1.0) AS score
+        FROM search_index
+        WHERE search_index MATCH :match AND {" AND ".join(filters)}
+        ORDER BY score, rowid
+        LIMIT :limit OFFSET :offset
+    """), {
+        "match": " ".join([f'"{t}"' for t in terms[:-1]] + [f'"{terms[-1]}"*']),
+        "first": user_id * USER_SPAN, "last": (user_id + 1) * USER_SPAN - 1,
+        "limit": limit, "offset": offset,
+    })
+    # bm25 is lower for better matches; flip it so scores read like ts_rank
+    return [
+        ("goal" if rowid % 2 else "task", rowid % USER_SPAN // 2, -score)
+        for rowid, score in rows
+    ]
+
+
+def _postgres_hits(user_id, terms, kinds, limit, offset):
+    tsquery = db.func.to_tsquery(literal_column("'simple'"), " & ".join(terms[:-1] + [f"{terms[-1]}:*"]))
+    selects = []
+    if "task" in kinds:
+        vector = literal_column(f"({task_vector('task')})")
+        selects.append(
+            db.select(literal_column("'task'").label("kind"), Task.id, db.func.ts_rank(vector, tsquery).label("score"))
+            .join(Goal, Goal.id == Task.goal_id)
+            .where(Goal.user_id == user_id, Goal.deleted_at.is_(None), vector.op("@@")(tsquery))
+        )
+    if "goal" in kinds:
+        vector = literal_column(f"({goal_vector('goal')})")
+        selects.append(
+            db.select(literal_column("'goal'").label("kind"), Goal.id, db.func.ts_rank(vector, tsquery).label("score"))
+            .where(Goal.user_id == user_id, Goal.deleted_at.is_(None), vector.op("@@")(tsquery))
+        )
+    query = db.union_all(*selects).subquery()
+    rows = db.session.execute(
+        db.select(query).order_by(query.c.score.desc(), query.c.kind, query.c.id).limit(limit).offset(offset)
+    )
+    return [(kind, row_id, score) for kind, row_id, score in rows]
+
+
+def _load_items(hits):
+    task_ids = [row_id for kind, row_id, _ in hits if kind == "task"]
+    goal_ids = [row_id for kind, row_id, _ in hits if kind == "goal"]
+    rows = {}
+    if task_ids:
+        for task_id, goal_id, parent_id, title, status in db.session.execute(
+            db.select(Task.id, Task.goal_id, Task.parent_id, Task.title, Task.status).where(Task.id.in_(task_ids))
+        ):
+            rows["task", task_id] = {"goal_id": goal_id, "parent_id": parent_id, "title": title, "status": status}
+    if goal_ids:
+        for goal_id, title in db.session.execute(db.select(Goal.id, Goal.title).where(Goal.id.in_(goal_ids))):
+            rows["goal", goal_id] = {"goal_id": goal_id, "title": title}
+    # a hit whose row was deleted since the match is dropped
+    return [
+        {"type": kind, "id": row_id, **rows[kind, row_id], "score": score}
+        for kind, row_id, score in hits if (kind, row_id) in rows
+    ]
+
+
+def create_search_index(connection):
+    statements = POSTGRES_DDL if connection.dialect.name == "postgresql" else SQLITE_DDL
+    for statement in statements:
+        connection.exec_driver_sql(statement)
+
+
+def rebuild_search_index():
+    """Rebuild the index from the goal and task rows. Returns the number of rows indexed."""
+    connection = db.session.connection()
+    if connection.dialect.name == "postgresql":
+        connection.exec_driver_sql("REINDEX INDEX ix_task_search")
+        connection.exec_driver_sql("REINDEX INDEX ix_goal_search")
+    else:
+        create_search_index(connection)
+        connection.exec_driver_sql("DELETE FROM search_index")
+        for statement in SQLITE_FILL:
+            connection.exec_driver_sql(statement)
+        connection.exec_driver_sql("INSERT INTO search_index (search_index) VALUES ('optimize')")
+    count = sum(db.session.scalar(db.select(db.func.count()).select_from(m)) for m in (Goal, Task))
+    db.session.commit()
+    return count
+
+
+@event.listens_for(db.metadata, "after_create")
+def _after_create(target, connection, **kw):
+    # db.create_all() (benchmarks, fresh installs) gets the same index as the migration
+    create_search_index(connection)
+
+
+@event.listens_for(db.metadata, "before_drop")
+def _before_drop(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        # triggers first: with foreign keys on, dropping task deletes its rows, which fires them
+        for table in ("task", "goal"):
+            for action in ("insert", "update", "delete"):
+                connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {table}_search_{action}")
+        connection.exec_driver_sql("DROP TABLE IF EXISTS search_index")
@@ -0,0 +1,91 @@
+"""
+Row serializers for the read endpoints.
+
+Reads select plain column tuples instead of ORM instances, so no identity
+map or attribute instrumentation is involved, and turn each row into a dict
+with a serializer generated once per field list. Datetimes are left to the
+JSON provider when it encodes them natively (orjson), otherwise they are
+converted with isoformat() as the models' to_dict() does.
+"""
+from datetime import datetime
+from functools import lru_cache
+
+from flask import current_app
+
+from models import db, Goal, Task
+
+TASK_COLUMNS = {
+    "id": Task.id,
+    "title": Task.title,
+    "description": Task.description,
+    "goal_id": Task.goal_id,
+    "parent_id": Task.parent_id,
+    "created_at": Task.created_at,
+    "order_idx": Task.order_idx,
+    "rank": Task.rank,
+    "status": Task.status,
+    "total_count": Task.total_count,
+    "done_count": Task.done_count,
+    "archived_count": Task.archived_count,
+}
+GOAL_COLUMNS = {
+    "id": Goal.id,
+    "title": Goal.title,
+    "created_at": Goal.created_at,
+    "total_count": Goal.total_count,
+    "done_count": Goal.done_count,
+    "archived_count": Goal.archived_count,
+}
+
+
+@lru_cache(maxsize=256)
+def compile_serializer(fields: tuple, datetime_fields: frozenset, offset: int = 0):
+    """
+    Build `row -> dict` for rows whose columns from `offset` on are `fields`.
+    The generated function is a single dict display, with no per-field loop.
+    """
+    items = []
+    for i, name in enumerate(fields, start=offset):
+        if name in datetime_fields:
+            items.append(f"{name!r}: _iso(row[{i}])")
+        else:
+            items.append(f"{name!r}: row[{i}]")
+    source = f"def serialize(row):\n    return {{{', '.join(items)}}}\n"
+    namespace = {"_iso": _iso}
+    exec(compile(source, f"<serializer {','.join(fields)}>", "exec"), namespace)
+    return namespace["serialize"]
+
+
+def _iso(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def datetime_fields(columns: dict, fields) -> frozenset:
+    """Fields that need converting: none when the JSON provider encodes datetimes itself."""
+    if getattr(current_app.json, "native_datetime", False):
+        return frozenset()
+    return frozenset(f for f in fields if isinstance(columns[f].type, db.DateTime))
+
+
+def serializer_for(columns: dict, fields, offset: int = 0):
+    fields = tuple(fields)
+    return compile_serializer(fields, datetime_fields(columns, fields), offset)
+
+
+def select_rows(columns: dict, fields, *filters, order_by=()):
+    """Serialized dicts for `fields`, read as plain rows."""
+    fields = list(fields)
+    query = db.select(*(columns[f] for f in fields)).where(*filters).order_by(*order_by)
+    serialize = serializer_for(columns, fields)
+    return [serialize(row) for row in db.session.execute(query)]
+
+
+def task_rows(goal_id: int) -> list[dict]:
+    """Every task of a goal in display order, shaped like Task.to_dict(recursive=False)."""
+    return select_rows(TASK_COLUMNS, TASK_COLUMNS, Task.goal_id == goal_id, order_by=(Task.rank, Task.id))
+
+
+def goal_rows(user_id: int) -> list[dict]:
+    """A user's live goals, shaped like Goal.to_dict()."""
+    return select_rows(GOAL_COLUMNS, GOAL_COLUMNS, Goal.user_id == user_id, Goal.deleted_at.is_(None),
+                       order_by=(Goal.id,))
@@ -0,0 +1,194 @@
+"""
+Serving the built frontend (STATIC_FOLDER) without touching the disk per request.
+
+The folder is walked once at startup into an in-memory manifest: URL path ->
+content type, ETag, cache policy and any precompressed siblings (name.br,
+name.gz, written by `flask compress-static` or the build), picked by the
+request's Accept-Encoding. Files up to STATIC_MEMORY_MAX bytes are held in
+memory, larger ones are streamed from disk; restart after a new build.
+
+The manifest sits in front of Flask as WSGI middleware, so a static hit never
+runs the request hooks (metrics, request logging, session, CORS). A GET for a
+path that is neither a file nor a Flask route gets index.html, for
+client-side routing; everything else, /api/ included, goes to Flask.
+
+Fingerprinted build output (main.3f2a1b4c.js) is cached by browsers for a
+year as immutable; index.html and other unhashed files are revalidated with
+their ETag on every use.
+"""
+import gzip
+import logging
+import mimetypes
+import os
+import re
+
+from werkzeug.exceptions import NotFound
+from werkzeug.http import parse_accept_header, parse_etags
+from werkzeug.utils import get_content_type
+from werkzeug.wsgi import wrap_file
+
+try:
+    import brotli
+except ImportError:  # optional dependency, only needed to write .br files
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+HASHED_NAME = re.compile(r"\.[0-9a-f]{8,}\.")  # CRA/webpack content hashes
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+COMPRESSIBLE = ("text/", "application/javascript", "application/json", "application/manifest+json",
+                "application/xml", "image/svg+xml", "application/wasm")
+COMPRESS_MIN_SIZE = 256
+
+mimetypes.add_type("application/json", ".map")
+
+
+class StaticFile:
+    __slots__ = ("path", "content_type", "etag", "cache_control", "size", "body", "variants")
+
+    def __init__(self, path, mimetype, cache_control, memory_max):
+        stat = os.stat(path)
+        self.path = path
+        self.content_type = get_content_type(mimetype, "utf-8")
+        self.etag = f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+        self.cache_control = cache_control
+        self.size = stat.st_size
+        self.body = read_file(path) if stat.st_size <= memory_max else None
+        self.variants = {}  # Content-Encoding -> StaticFile of the compressed file
+
+
+def read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def guess_mimetype(path):
+    return mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+
+def build_manifest(folder, memory_max):
+    """URL path (as in PATH_INFO, without the leading slash) -> StaticFile."""
+    manifest = {}
+    for root, dirs, files in os.walk(folder):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        names = set(files)
+        for name in files:
+            if name.startswith(".") or any(name.endswith(ext) and name[:-len(ext)] in names for _, ext in ENCODINGS):
+                continue
+            path = os.path.join(root, name)
+            mimetype = guess_mimetype(name)
+            cache_control = IMMUTABLE if HASHED_NAME.search(name) else REVALIDATE
+            entry = StaticFile(path, mimetype, cache_control, memory_max)
+            for encoding, ext in ENCODINGS:
+                # a variant older than its source is left over from a previous build
+                if name + ext in names and os.stat(path + ext).st_mtime_ns >= os.stat(path).st_mtime_ns:
+                    variant = StaticFile(path + ext, mimetype, cache_control, memory_max)
+                    variant.etag = f"{entry.etag}-{encoding}"
+                    entry.variants[encoding] = variant
+            url = os.path.relpath(path, folder).replace(os.sep, "/")
+            # PATH_INFO carries the raw UTF-8 bytes decoded as latin-1
+            manifest[url.encode().decode("latin-1")] = entry
+    return manifest
+
+
+def compress_static_files(folder):
+    """
+    Write .gz (and .br, when brotli is installed) next to every compressible
+    file that compression makes smaller. Returns the number of files written.
+    """
+    written = 0
+    for root, dirs, files in os.walk(folder):
+        for name in files:
+            if name.endswith((".gz", ".br")) or not guess_mimetype(name).startswith(COMPRESSIBLE):
+                continue
+            path = os.path.join(root, name)
+            data = read_file(path)
+            if len(data) < COMPRESS_MIN_SIZE:
+                continue
+            variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                variants[".br"] = brotli.compress(data, quality=11)
+            for ext, compressed in variants.items():
+                if len(compressed) < len(data):
+                    with open(path + ext, "wb") as f:
+                        f.write(compressed)
+                    written += 1
+    return written
+
+
+class StaticFiles:
+    def __init__(self, app=None):
+        self.folder = None
+        self.manifest = {}
+        self.index = None
+        self.url_map = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.folder = app.config["STATIC_FOLDER"]
+        self.reload(app.config["STATIC_MEMORY_MAX"])
+        self.url_map = app.url_map
+        app.wsgi_app = self.middleware(app.wsgi_app)
+        app.extensions["static_files"] = self
+
+    def reload(self, memory_max):
+        self.manifest = build_manifest(self.folder, memory_max) if os.path.isdir(self.folder) else {}
+        self.index = self.manifest.get("index.html")
+        if not self.manifest:
+            logger.debug("No frontend build in %s, static files are not served", self.folder)
+
+    def middleware(self, wsgi_app):
+        def serve(environ, start_response):
+            method = environ["REQUEST_METHOD"]
+            if method == "GET" or method == "HEAD":
+                path = environ.get("PATH_INFO", "").lstrip("/") or "index.html"
+                entry = self.manifest.get(path)
+                if entry is None and self.index is not None and not self._routed(environ):
+                    entry = self.index
+                if entry is not None:
+                    return self._respond(entry, environ, start_response, method == "HEAD")
+            return wsgi_app(environ, start_response)
+
+        return serve
+
+    def _routed(self, environ):
+        try:
+            self.url_map.bind_to_environ(environ).match()
+        except NotFound:
+            return False
+        except Exception:  # a redirect or 405 is Flask's to answer
+            return True
+        return True
+
+    def _respond(self, entry, environ, start_response, head):
+        headers = [("Cache-Control", entry.cache_control)]
+        if entry.variants:
+            headers.append(("Vary", "Accept-Encoding"))
+            accept = environ.get("HTTP_ACCEPT_ENCODING")
+            if accept:
+                accept = parse_accept_header(accept)
+                for encoding, _ in ENCODINGS:
+                    if encoding in entry.variants and accept.quality(encoding):
+                        entry = entry.variants[encoding]
+                        headers.append(("Content-Encoding", encoding))
+                        break
+        headers.append(("ETag", f'"{entry.etag}"'))
+
+        if_none_match = environ.get("HTTP_IF_NONE_MATCH")
+        if if_none_match and parse_etags(if_none_match).contains_weak(entry.etag):
+            start_response("304 Not Modified", headers)
+            return []
+        headers.append(("Content-Type", entry.content_type))
+        headers.append(("Content-Length", str(entry.size)))
+        start_response("200 OK", headers)
+        if head:
+            return []
+        if entry.body is not None:
+            return [entry.body]
+        return wrap_file(environ, open(entry.path, "rb"))
+
+
+static_files = StaticFiles()
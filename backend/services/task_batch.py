@@ -0,0 +1,83 @@
+from sqlalchemy import update
+
+from models import db, Goal, Task
+from services.rollups import add_counts, status_change
+from services.versioning import bump_goal
+
+BATCH_FIELDS = ("status", "title")
+TASK_STATUSES = ("active", "done", "archived")
+MOVED_FIELD_ERROR = "'order_idx' is no longer used for ordering, reorder with POST /api/tasks/<id>/move"
+
+
+def validate_update(entry):
+    """Return (task_id, changes, error) for one entry of a batch update."""
+    if not isinstance(entry, dict):
+        return None, None, "Update must be an object"
+    task_id = entry.get("id")
+    if not isinstance(task_id, int) or isinstance(task_id, bool):
+        return task_id, None, "Missing or invalid 'id'"
+
+    if "order_idx" in entry:
+        return task_id, None, MOVED_FIELD_ERROR
+    changes = {field: entry[field] for field in BATCH_FIELDS if field in entry}
+    if not changes:
+        return task_id, None, "No updatable fields"
+    if "status" in changes and changes["status"] not in TASK_STATUSES:
+        return task_id, None, f"'status' must be one of {', '.join(TASK_STATUSES)}"
+    if "title" in changes and not changes["title"]:
+        return task_id, None, "'title' cannot be empty"
+    return task_id, changes, None
+
+
+def apply_task_updates(updates, atomic=True, owns_goal=None):
+    """
+    Apply many task updates with one existence query and bulk UPDATEs.
+    Returns (results, updated_count, applied): one result per input item,
+    and (task_id, goal_id, changes) for every task written.
+    In atomic mode nothing is written unless every item is valid. Tasks in
+    soft-deleted goals or goals rejected by owns_goal(goal_id) are reported
+    as not found.
+    """
+    results = []
+    pending = {}  # task_id -> merged changes, later entries win
+    for entry in updates:
+        task_id, changes, error = validate_update(entry)
+        if error:
+            results.append({"id": task_id, "status": "invalid", "error": error})
+        else:
+            results.append({"id": task_id, "status": "updated"})
+            pending.setdefault(task_id, {}).update(changes)
+
+    goal_ids, current = {}, {}
+    if pending:
+        for task_id, goal_id, parent_id, status in db.session.execute(
+            db.select(Task.id, Task.goal_id, Task.parent_id, Task.status)
+            .join(Goal, Goal.id == Task.goal_id)
+            .where(Task.id.in_(pending), Goal.deleted_at.is_(None))
+        ):
+            goal_ids[task_id] = goal_id
+            current[task_id] = (parent_id, status)
+    existing = {task_id for task_id, goal_id in goal_ids.items() if owns_goal is None or owns_goal(goal_id)}
+    for result in results:
+        if result["status"] == "updated" and result["id"] not in existing:
+            result.update(status="not_found", error="Task not found")
+
+    failed = any(r["status"] != "updated" for r in results)
+    if atomic and failed:
+        for result in results:
+            if result["status"] == "updated":
+                result["status"] = "skipped"
+        return results, 0, []
+
+    rows = [dict(changes, id=task_id) for task_id, changes in pending.items() if task_id in existing]
+    if rows:
+        # ORM bulk UPDATE by primary key: executemany, grouped by the set of changed columns
+        db.session.execute(update(Task), rows)
+        add_counts([
+            (goal_ids[row["id"]], current[row["id"]][0], status_change(current[row["id"]][1], row["status"]))
+            for row in rows if "status" in row and row["status"] != current[row["id"]][1]
+        ])
+        bump_goal(*(goal_ids[row["id"]] for row in rows))
+    db.session.commit()
+    applied = [(task_id, goal_ids[task_id], changes) for task_id, changes in pending.items() if task_id in existing]
+    return results, sum(1 for r in results if r["status"] == "updated"), applied
@@ -0,0 +1,30 @@
+from services.serialization import task_rows
+
+
+def build_task_tree(rows: list[dict]) -> list[dict]:
+    """
+    Link flat task dicts into a parent/child hierarchy in a single pass.
+    Rows must already be sorted in display order; children keep that order.
+    Tasks whose parent is missing from the set are promoted to roots.
+    """
+    by_id = {}
+    for row in rows:
+        row["subtasks"] = []
+        by_id[row["id"]] = row
+
+    roots = []
+    for row in rows:
+        parent = by_id.get(row["parent_id"])
+        if parent is None:
+            roots.append(row)
+        else:
+            parent["subtasks"].append(row)
+    return roots
+
+
+def load_task_tree(goal_id: int, flat: bool = False) -> list[dict]:
+    """Fetch every task for a goal in one query and return it as a tree (or flat list)."""
+    rows = task_rows(goal_id)
+    if flat:
+        return rows
+    return build_task_tree(rows)
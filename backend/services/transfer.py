@@ -0,0 +1,283 @@
+"""
+Bulk export and import of a user's goals and task trees as NDJSON.
+
+The format is one JSON object per line: a goal ({"type": "goal", ...} with
+the fields of Goal.to_dict()) followed by its tasks ({"type": "task", ...}
+with the fields of Task.to_dict(recursive=False)), tasks in id order.
+
+Export streams both queries with yield_per, so memory stays flat however
+large the trees are. Import parses the upload line by line and inserts
+IMPORT_CHUNK_SIZE tasks per multi-row INSERT and transaction, remapping ids
+and parent_ids as it goes; memory grows only with the goal being read (its
+id map and, at the end, its recomputed counts). Rows are only written as a
+chunk fills up and committed straight away, so no transaction (or SQLite
+write lock) is held while the upload arrives. A goal is hidden
+(soft-deleted) until its last task is in and its counts are filled in, then
+revealed in one commit, so readers never see a half-imported tree and a
+failed import leaves nothing behind but a goal for the purger. Ids and
+counts in the file are not trusted: parents that appear later in the file
+are linked once the goal is complete, parent cycles are broken, and counts
+are recomputed with services/rollups.py.
+"""
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from flask import current_app
+from sqlalchemy import bindparam
+
+from models import db, Goal, Task
+from services.auth_cache import user_cache
+from services.changefeed import change, change_feed
+from services.deletion import goal_purger
+from services.ordering import DIGITS, rank_after
+from services.rollups import fill_rollups
+from services.serialization import GOAL_COLUMNS, TASK_COLUMNS, serializer_for
+from services.versioning import bump_user_goals
+
+EXPORT_CHUNK_SIZE = 1000
+IMPORT_CHUNK_SIZE = 1000
+MAX_LINE_BYTES = 1 << 20
+TASK_STATUSES = ("active", "done", "archived")
+RANK_DIGITS = frozenset(DIGITS)
+# every column an imported task row sets besides goal_id; see _insert_tasks
+ROW_KEY = ("parent_id", "title", "description", "created_at", "order_idx", "rank", "status")
+
+
+def export_lines(user_id):
+    """The user's live goals and their tasks as NDJSON text, one chunk of lines at a time."""
+    dumps = current_app.json.dumps
+    goal_dict = serializer_for(GOAL_COLUMNS, GOAL_COLUMNS)
+    task_dict = serializer_for(TASK_COLUMNS, TASK_COLUMNS)
+    goals = db.session.execute(
+        db.select(*GOAL_COLUMNS.values())
+        .where(Goal.user_id == user_id, Goal.deleted_at.is_(None))
+        .order_by(Goal.id)
+        .execution_options(yield_per=EXPORT_CHUNK_SIZE)
+    )
+    for goal in goals:
+        lines = [dumps({"type": "goal", **goal_dict(goal)})]
+        tasks = db.session.execute(
+            db.select(*TASK_COLUMNS.values())
+            .where(Task.goal_id == goal.id)
+            .order_by(Task.id)
+            .execution_options(yield_per=EXPORT_CHUNK_SIZE)
+        )
+        for rows in tasks.partitions():
+            lines.extend(dumps({"type": "task", **task_dict(row)}) for row in rows)
+            yield "\n".join(lines) + "\n"
+            lines = []
+        if lines:
+            yield "\n".join(lines) + "\n"
+
+
+def read_lines(stream, size=1 << 16):
+    """Lines (bytes, without the newline) of a binary stream, read `size` bytes at a time."""
+    pending = b""
+    while True:
+        chunk = stream.read(size)
+        if not chunk:
+            break
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        if len(pending) > MAX_LINE_BYTES:
+            raise ValueError(f"Line longer than {MAX_LINE_BYTES} bytes")
+        yield from lines
+    if pending:
+        yield pending
+
+
+def import_goals(user_id, lines):
+    """
+    Import NDJSON lines (str or bytes) as new goals of the user. Returns
+    {"goal_ids": [...], "tasks": n}. Raises ValueError naming the line on
+    bad input; goals completed before it are kept.
+    """
+    return GoalImport(user_id).run(lines)
+
+
+class GoalImport:
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.now = datetime.now(timezone.utc).replace(tzinfo=None)
+        self.goal_ids = []
+        self.tasks = 0
+        self.goal_row = None  # the goal being read, inserted hidden with its first chunk
+        self.goal_id = None  # its id once inserted
+        self.old_goal_id = None
+        self.id_map = {}  # task id in the file -> new id, for the current goal
+        self.last_rank = {}  # parent id in the file -> rank given to its last child without one
+        self.pending = []  # (old id, old parent id, row) not inserted yet
+        self.unlinked = []  # (new id, old parent id) whose parent was not inserted before them
+
+    def run(self, lines):
+        loads = current_app.json.loads
+        try:
+            for number, line in enumerate(lines, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = loads(line)
+                except ValueError:
+                    raise ValueError(f"Line {number}: invalid JSON")
+                if not isinstance(record, dict):
+                    raise ValueError(f"Line {number}: expected an object")
+                kind = record.get("type")
+                if kind == "goal":
+                    self.finish_goal()
+                    self.start_goal(record, number)
+                elif kind == "task":
+                    self.add_task(record, number)
+                else:
+                    raise ValueError(f"Line {number}: 'type' must be goal or task")
+            self.finish_goal()
+        except Exception:
+            db.session.rollback()
+            # a goal rolled back before its first commit is gone, and its id may be handed out again
+            if self.goal_id is not None and db.session.get(Goal, self.goal_id) is not None:
+                goal_purger.schedule(self.goal_id)
+            raise
+        return {"goal_ids": self.goal_ids, "tasks": self.tasks}
+
+    def start_goal(self, record, number):
+        title = record.get("title")
+        if not isinstance(title, str) or not title:
+            raise ValueError(f"Line {number}: missing goal title")
+        self.goal_row = {"title": title, "user_id": self.user_id, "deleted_at": self.now,
+                         "created_at": self.parse_time(record.get("created_at"), number)}
+        self.old_goal_id = record.get("id")
+        self.id_map = {}
+        self.last_rank = {}
+        self.unlinked = []
+
+    def add_task(self, record, number):
+        if self.goal_row is None:
+            raise ValueError(f"Line {number}: task before any goal")
+        if record.get("goal_id") not in (None, self.old_goal_id):
+            raise ValueError(f"Line {number}: task does not follow its goal")
+        title = record.get("title")
+        if not isinstance(title, str) or not title:
+            raise ValueError(f"Line {number}: missing task title")
+        description = record.get("description")
+        if description is not None and not isinstance(description, str):
+            raise ValueError(f"Line {number}: 'description' must be a string")
+        status = record.get("status") or "active"
+        if status not in TASK_STATUSES:
+            raise ValueError(f"Line {number}: 'status' must be one of {', '.join(TASK_STATUSES)}")
+        order_idx = record.get("order_idx")
+        if order_idx is not None and not isinstance(order_idx, int):
+            raise ValueError(f"Line {number}: 'order_idx' must be an integer")
+        old_id, old_parent = record.get("id"), record.get("parent_id")
+        if not all(value is None or isinstance(value, (int, str)) for value in (old_id, old_parent)):
+            raise ValueError(f"Line {number}: 'id' and 'parent_id' must be integers or strings")
+        rank = record.get("rank")
+        if rank is None:
+            rank = self.last_rank[old_parent] = rank_after(self.last_rank.get(old_parent))
+        elif not isinstance(rank, str) or not rank or rank.endswith("0") or not RANK_DIGITS.issuperset(rank):
+            raise ValueError(f"Line {number}: invalid 'rank'")
+
+        self.pending.append((old_id, old_parent, {
+            "title": title,
+            "description": description,
+            "goal_id": None,
+            "parent_id": None,
+            "created_at": self.parse_time(record.get("created_at"), number),
+            "order_idx": order_idx,
+            "rank": rank,
+            "status": status,
+        }))
+        if len(self.pending) >= IMPORT_CHUNK_SIZE:
+            self.flush()
+            db.session.commit()
+
+    def parse_time(self, value, number):
+        if value is None:
+            return self.now
+        try:
+            parsed = datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Line {number}: invalid 'created_at'")
+        # stored as naive UTC, like db.func.now()
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        return parsed
+
+    def flush(self):
+        """Insert the pending tasks, a level at a time so parents in the chunk get their ids first."""
+        # written only here and committed right after, so no transaction stays open while the upload is read
+        if self.goal_id is None:
+            self.goal_id = db.session.execute(db.insert(Goal).returning(Goal.id), self.goal_row).scalar_one()
+        remaining, self.pending = self.pending, []
+        for _, _, row in remaining:
+            row["goal_id"] = self.goal_id
+        waiting = {old_id for old_id, _, _ in remaining if old_id is not None}
+        while remaining:
+            level = [t for t in remaining if t[1] not in waiting]
+            later = [t for t in remaining if t[1] in waiting]
+            if not level:  # a parent cycle within the chunk
+                level, later = later, []
+            for _, old_parent, row in level:
+                row["parent_id"] = self.id_map.get(old_parent)
+            for (old_id, old_parent, row), new_id in zip(level, _insert_tasks(level)):
+                if old_id is not None:
+                    self.id_map[old_id] = new_id
+                    waiting.discard(old_id)
+                if old_parent is not None and row["parent_id"] is None:
+                    self.unlinked.append((new_id, old_parent))
+            self.tasks += len(level)
+            remaining = later
+
+    def finish_goal(self):
+        if self.goal_row is None:
+            return
+        self.flush()
+        self.link_late_parents()
+        fill_rollups([self.goal_id])
+        db.session.execute(db.update(Goal).where(Goal.id == self.goal_id).values(deleted_at=None))
+        bump_user_goals(self.user_id)
+        goal = db.session.get(Goal, self.goal_id).to_dict()
+        db.session.commit()
+
+        goal_id, self.goal_id, self.goal_row = self.goal_id, None, None
+        self.goal_ids.append(goal_id)
+        user_cache.update_goals(self.user_id, added=(goal_id,))
+        change_feed.publish(self.user_id, change("goal.created", goal=goal))
+
+    def link_late_parents(self):
+        """Point tasks whose parent came later in the file at it, then break any cycle that made."""
+        links = [(new_id, self.id_map[old_parent]) for new_id, old_parent in self.unlinked if old_parent in self.id_map]
+        table = Task.__table__
+        for start in range(0, len(links), IMPORT_CHUNK_SIZE):
+            chunk = links[start:start + IMPORT_CHUNK_SIZE]
+            db.session.execute(
+                table.update().where(table.c.id == bindparam("row_id")).values(parent_id=bindparam("new_parent")),
+                [{"row_id": task_id, "new_parent": parent_id} for task_id, parent_id in chunk],
+            )
+            # UNION (not UNION ALL) drops repeated pairs, so walking up a cycle ends
+            up = (
+                db.select(Task.id.label("start"), Task.parent_id.label("id"))
+                .where(Task.id.in_([task_id for task_id, _ in chunk]))
+                .cte("up", recursive=True)
+            )
+            up = up.union(
+                db.select(up.c.start, Task.parent_id).where(Task.id == up.c.id, Task.parent_id.is_not(None))
+            )
+            cyclic = db.session.scalars(db.select(up.c.start).where(up.c.id == up.c.start)).all()
+            if cyclic:
+                db.session.execute(db.update(Task).where(Task.id.in_(cyclic)).values(parent_id=None))
+
+
+def _insert_tasks(pending):
+    """Insert the rows of (old id, old parent id, row) tuples; returns their new ids in order."""
+    rows = [row for _, _, row in pending]
+    if not db.session.get_bind().dialect.insert_executemany_returning:
+        return [db.session.execute(db.insert(Task), row).inserted_primary_key[0] for row in rows]
+    # RETURNING comes back in any order, so rows are matched on every column they set.
+    # Rows equal in all of them are interchangeable: whichever gets which id, the
+    # stored trees come out the same.
+    # Core, not ORM, insert: the ORM splits the batch wherever rows differ in which values are None
+    table = Task.__table__
+    returned = db.session.execute(table.insert().returning(table.c.id, *(table.c[c] for c in ROW_KEY)), rows).all()
+    ids = defaultdict(list)
+    for task_id, *key in returned:
+        ids[tuple(key)].append(task_id)
+    return [ids[tuple(row[c] for c in ROW_KEY)].pop() for row in rows]
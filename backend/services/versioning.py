@@ -0,0 +1,93 @@
+"""
+Version counters and conditional GET for the goal and task reads.
+
+Goal.version changes whenever the goal's tasks change and User.goals_version
+whenever the user's goal list changes. Every mutating route bumps the
+matching counter in its own transaction. Reads derive a strong ETag from
+the counter and the query string, so a matching If-None-Match is answered
+with 304 after a single primary-key lookup. Serialized bodies can also be
+kept in memory under the same key (RESPONSE_CACHE_SIZE, 0 disables).
+"""
+import threading
+import zlib
+from collections import OrderedDict
+
+from flask import Response, make_response, request
+
+from models import db, Goal, User
+
+
+def bump_goal(*goal_ids):
+    """Invalidate task reads for the given goals."""
+    goal_ids = {g for g in goal_ids if g is not None}
+    if goal_ids:
+        db.session.execute(
+            db.update(Goal).where(Goal.id.in_(goal_ids)).values(version=Goal.version + 1)
+        )
+
+
+def bump_user_goals(user_id):
+    """Invalidate the goal list for a user."""
+    db.session.execute(
+        db.update(User).where(User.id == user_id).values(goals_version=User.goals_version + 1)
+    )
+
+
+class ResponseCache:
+    """LRU of serialized JSON bodies keyed by (resource, version, query string)."""
+
+    def __init__(self, app=None):
+        self.max_entries = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.max_entries = app.config["RESPONSE_CACHE_SIZE"]
+        app.extensions["response_cache"] = self
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def set(self, key, body):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+response_cache = ResponseCache()
+
+
+def conditional_json(kind, key, version, build):
+    """
+    Serve a versioned JSON read: 304 when the client already has this version,
+    otherwise the cached body or the response returned by build().
+    """
+    etag = f"{kind}-{key}-{version}-{zlib.crc32(request.query_string):08x}"
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        cache_key = (kind, key, version, request.query_string)
+        body = response_cache.get(cache_key)
+        if body is not None:
+            response = Response(body, mimetype="application/json")
+        else:
+            response = make_response(build())
+            if response.status_code != 200:
+                return response
+            response_cache.set(cache_key, response.get_data())
+
+    response.set_etag(etag)
+    # per-user data: let browsers keep it but always revalidate
+    response.headers["Cache-Control"] = "private, no-cache"
+    response.vary.add("Cookie")
+    return response
@@ -1,10 +1,31 @@
+import hmac
 from functools import wraps
-from flask import session, jsonify
+from flask import current_app, g, jsonify, request, session
+from services.auth_cache import user_cache
 
 def login_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
         if "user_id" not in session:
             return jsonify({"error": "Unauthorized"}), 401
+        # g.auth: the user and their goal ids, see services/auth_cache.py
+        if "auth" not in g:
+            auth = user_cache.get(session["user_id"])
+            if auth is None:
+                session.clear()
+                return jsonify({"error": "Unauthorized"}), 401
+            g.auth = auth
         return f(*args, **kwargs)
-    return decorated
\ No newline at end of file
+    return decorated
+
+def metrics_token_required(f):
+    """For operator endpoints (/metrics, process stats): bearer METRICS_TOKEN, and 404 when no token is set."""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        token = current_app.config.get("METRICS_TOKEN")
+        if not token:
+            return jsonify({"error": "Not found"}), 404
+        if not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+            return jsonify({"error": "Unauthorized"}), 401
+        return f(*args, **kwargs)
+    return decorated
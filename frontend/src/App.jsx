@@ -4,6 +4,7 @@ import NavBar from './components/NavBar';
 import LoginForm from './components/LoginForm';
 import SignupForm from './components/SignUpForm';
 import MainAppUI from './components/MainAppUI';
+import { fetchWithAuth } from './api';
 import { BrowserRouter as Router, Routes, Route, Navigate } from "react-router-dom";
 
 
@@ -11,15 +12,6 @@ import { BrowserRouter as Router, Routes, Route, Navigate } from "react-router-d
 function App() {
   const [isLoggedIn, setIsLoggedIn] = useState(false);
 
-  function fetchWithAuth(url, options) {
-    return fetch(url, { credentials: "include", ...options }).then(res => {
-      if (res.status === 401) {
-        return Promise.reject({ unauthorized: true });
-      }
-      return res;
-    });
-  }
-
   useEffect(() => {
     fetchWithAuth("/api/goals")
       .then(res => res.json())
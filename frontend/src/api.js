@@ -0,0 +1,10 @@
+// API calls go through here: sends the session cookie and turns a 401
+// into a rejection ({ unauthorized: true }) the caller can act on.
+export function fetchWithAuth(url, options) {
+  return fetch(url, { credentials: "include", ...options }).then(res => {
+    if (res.status === 401) {
+      return Promise.reject({ unauthorized: true });
+    }
+    return res;
+  });
+}
@@ -1,9 +1,11 @@
 import { useState, useEffect } from 'react';
 import AddTaskForm from "./AddTaskForm";
 import TaskTree from "./TaskTree";
+import { fetchWithAuth } from "../api";
+import { waitForPlanJob } from "../planJobs";
 import "../css/GoalDetailView.css";
 
-function GoalDetailView({ goal, tasks, onAddTask, onUpdateTask, onDeleteTask, refreshTasks, onDeleteGoal, onUpdateGoal, onBatchUpdateTasks }) {
+function GoalDetailView({ goal, tasks, onAddTask, onUpdateTask, onDeleteTask, refreshTasks, onDeleteGoal, onUpdateGoal, onMoveTask }) {
     const [showAddTask, setShowAddTask] = useState(false);
     const [isEditing, setIsEditing] = useState(false);
     const [editTitle, setEditTitle] = useState("");
@@ -39,13 +41,14 @@ function GoalDetailView({ goal, tasks, onAddTask, onUpdateTask, onDeleteTask, re
     async function handleGeneratePlan() {
         setIsGeneratingPlan(true);
         try {
-            const res = await fetch(`/api/goals/${goal.id}/generate-plan`, {
+            const res = await fetchWithAuth(`/api/goals/${goal.id}/generate-plan`, {
                 method: "POST",
                 headers: { "Content-Type": "application/json" },
             });
 
             if (!res.ok) throw new Error("Failed to generate plan");
 
+            await waitForPlanJob(res);
             refreshTasks();
 
         } catch (err) {
@@ -104,7 +107,7 @@ function GoalDetailView({ goal, tasks, onAddTask, onUpdateTask, onDeleteTask, re
                 onUpdateTask={onUpdateTask}
                 onDeleteTask={onDeleteTask}
                 refreshTasks={refreshTasks}
-                onBatchUpdateTasks={onBatchUpdateTasks}
+                onMoveTask={onMoveTask}
             />
         </div>
     );
@@ -25,7 +25,7 @@ export default function MainAppUI({ fetchWithAuth }) {
 
   useEffect(() => {
     if (selectedGoal) {
-      fetchWithAuth(`/api/goals/${selectedGoal.id}/tasks`)
+      fetchWithAuth(`/api/goals/${selectedGoal.id}/tasks?flat=1`)
         .then((res) => res.json())
         .then(setTasks)
         .catch(console.error);
@@ -34,7 +34,7 @@ export default function MainAppUI({ fetchWithAuth }) {
 
   const refreshTasks = () => {
     if (!selectedGoal) return;
-    fetchWithAuth(`/api/goals/${selectedGoal.id}/tasks`)
+    fetchWithAuth(`/api/goals/${selectedGoal.id}/tasks?flat=1`)
       .then((res) => res.json())
       .then(setTasks);
   };
@@ -175,29 +175,23 @@ export default function MainAppUI({ fetchWithAuth }) {
       });
   };
 
-  const handleBatchUpdateTasks = (updates) => {
-    const prevTasks = tasks;
-
-    setTasks(prev =>
-      prev.map(task => {
-        const update = updates.find(u => u.id === task.id);
-        return update ? { ...task, order_idx: update.order_idx } : task;
-      })
-    );
-
-    fetchWithAuth('/api/tasks/batch-update', {
+  const handleMoveTask = (taskId, position) => {
+    fetchWithAuth(`/api/tasks/${taskId}/move`, {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({ updates })
+      body: JSON.stringify(position)
     })
       .then((res) => {
-        if (!res.ok) throw new Error('Failed to batch update tasks');
+        if (!res.ok) throw new Error('Failed to move task');
         return res.json();
       })
-      .then(() => refreshTasks())
+      .then((serverTask) => {
+        setTasks(prev =>
+          prev.map(t => (t.id === serverTask.id ? { ...t, ...serverTask } : t))
+        );
+      })
       .catch((err) => {
-        console.error('Batch update failed:', err);
-        setTasks(prevTasks);
+        console.error('Move task failed:', err);
         alert('Failed to reorder tasks. Please try again.');
       });
   };
@@ -243,7 +237,7 @@ export default function MainAppUI({ fetchWithAuth }) {
           refreshTasks={refreshTasks}
           onDeleteGoal={handleDeleteGoal}
           onUpdateGoal={handleUpdateGoal}
-          onBatchUpdateTasks={handleBatchUpdateTasks}
+          onMoveTask={handleMoveTask}
         />
         {showAddTaskForm && (
           <AddTaskForm
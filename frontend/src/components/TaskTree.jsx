@@ -1,10 +1,18 @@
 import { useState, useCallback, useMemo } from "react";
 import '../css/Task.css';
 import AddTaskForm from "./AddTaskForm";
+import { fetchWithAuth } from "../api";
+import { waitForPlanJob } from "../planJobs";
 import { DndContext, closestCenter } from '@dnd-kit/core';
 import { useSortable, SortableContext, verticalListSortingStrategy } from '@dnd-kit/sortable';
 import { CSS } from '@dnd-kit/utilities';
 
+// rank keys are fractional strings: plain string comparison gives sibling order
+const byRank = (a, b) => {
+  if (a.rank === b.rank) return a.id - b.id;
+  return (a.rank ?? "") < (b.rank ?? "") ? -1 : 1;
+};
+
 function buildTaskTree(tasks) {
   if (!tasks || tasks.length === 0) return [];
 
@@ -27,7 +35,7 @@ function buildTaskTree(tasks) {
   });
 
   const sortByOrder = (taskList) => {
-    taskList.sort((a, b) => (a.order_idx ?? 0) - (b.order_idx ?? 0));
+    taskList.sort(byRank);
     taskList.forEach(task => sortByOrder(task.subtasks));
   };
 
@@ -35,7 +43,7 @@ function buildTaskTree(tasks) {
   return roots;
 }
 
-function TaskTree({ tasks, onAddTask, onUpdateTask, onDeleteTask, refreshTasks, onBatchUpdateTasks }) {
+function TaskTree({ tasks, onAddTask, onUpdateTask, onDeleteTask, refreshTasks, onMoveTask }) {
   const taskTree = useMemo(() => buildTaskTree(tasks), [tasks]);
 
   const handleAddTask = useCallback((taskData) => {
@@ -70,23 +78,16 @@ function TaskTree({ tasks, onAddTask, onUpdateTask, onDeleteTask, refreshTasks,
 
     const siblings = tasks
       .filter(task => task.parent_id === activeParentId)
-      .sort((a, b) => (a.order_idx ?? 0) - (b.order_idx ?? 0));
+      .sort(byRank);
 
     const activeIndex = siblings.findIndex(task => task.id === active.id);
     const overIndex = siblings.findIndex(task => task.id === over.id);
 
     if (activeIndex === overIndex) return;
 
-    const reorderedSiblings = [...siblings];
-    const [movedTask] = reorderedSiblings.splice(activeIndex, 1);
-    reorderedSiblings.splice(overIndex, 0, movedTask);
-
-    const updates = reorderedSiblings.map((task, index) => ({
-      id: task.id,
-      order_idx: index
-    }));
-
-    onBatchUpdateTasks(updates);
+    // only the dragged task changes: it lands just before or after the task it was dropped on
+    const position = activeIndex < overIndex ? { after_id: over.id } : { before_id: over.id };
+    onMoveTask(active.id, position);
   }
 
   if (!taskTree.length) {
@@ -245,7 +246,7 @@ function TaskNode({ task, onAddTask, onUpdateTask, onDeleteTask, refreshTasks, l
   const handleGeneratePlan = useCallback(async () => {
     setIsGeneratingPlan(true);
     try {
-      const response = await fetch(`/api/tasks/${task.id}/generate-plan`, {
+      const response = await fetchWithAuth(`/api/tasks/${task.id}/generate-plan`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
       });
@@ -253,7 +254,8 @@ function TaskNode({ task, onAddTask, onUpdateTask, onDeleteTask, refreshTasks, l
       if (!response.ok) {
         throw new Error(`HTTP error! status: ${response.status}`);
       }
-      
+
+      await waitForPlanJob(response);
       await refreshTasks();
     } catch (error) {
       console.error('Failed to generate plan:', error);
@@ -0,0 +1,16 @@
+import { fetchWithAuth } from "./api";
+
+// Plan generation runs as a background job on the server. The generate-plan
+// routes answer 202 with a job, which we long-poll until it finishes.
+export async function waitForPlanJob(response) {
+  let job = await response.json();
+
+  while (job.status === "queued" || job.status === "running") {
+    const res = await fetchWithAuth(`/api/ai/jobs/${job.id}?wait=25`);
+    if (!res.ok) throw new Error(`HTTP error! status: ${res.status}`);
+    job = await res.json();
+  }
+
+  if (job.status === "failed") throw new Error(job.error || "Plan generation failed");
+  return job.tasks;
+}